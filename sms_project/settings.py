@@ -42,10 +42,13 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'students.middleware.QueryProfilerMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'students.middleware.ProfileMiddleware',
+    'students.middleware.ReadYourWritesMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -77,9 +80,19 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
-    }
+    },
+    # Read replica for the analytics / reporting views (see students/routers.py).
+    # Locally this is a snapshot made by `manage.py refresh_replica`; until it
+    # exists those views read from 'default'.
+    'replica': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'db_replica.sqlite3',
+        'TEST': {'MIRROR': 'default'},
+    },
 }
 
+DATABASE_ROUTERS = ['students.routers.ReplicaRouter']
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -128,5 +141,88 @@ BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Dashboard and analytics caches. Local memory is per process; for several
+# workers use a shared backend, e.g.
+#   'BACKEND': 'django.core.cache.backends.db.DatabaseCache', 'LOCATION': 'sms_cache'
+#   (run `manage.py createcachetable`), or
+#   'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+#   'LOCATION': os.path.join(BASE_DIR, 'cache').
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'sms-default',
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    }
+}
+
 LOGIN_URL = '/login/'
-LOGIN_REDIRECT_URL = '/students/'
\ No newline at end of file
+LOGIN_REDIRECT_URL = '/students/'
+
+
+# Student Management System settings
+
+# Marks below this value count as a fail in analytics and reports.
+SMS_PASS_MARK = 35
+
+# Seconds the subject analytics page and the department overview are cached
+# (they are also invalidated when the data they read changes).
+SMS_ANALYTICS_CACHE_TIMEOUT = 60 * 60
+
+# Seconds a student / parent dashboard stays cached (entries are also dropped
+# whenever that student's marks, attendance, fees or record change).
+SMS_DASHBOARD_CACHE_TIMEOUT = 15 * 60
+
+# Seconds a user's profile version (students/roles.py) is cached. Profile edits
+# drop it at once in the process that made them; with a per-process cache
+# (LocMemCache) other processes notice within this many seconds.
+SMS_PROFILE_VERSION_TIMEOUT = 30
+
+# Worker threads (and so at most this many extra database connections) the
+# async dashboards use to run their independent queries concurrently under
+# ASGI (students/concurrency.py). Serve with e.g.
+# `uvicorn sms_project.asgi:application`; compare with `manage.py benchmark_asgi`.
+SMS_ASYNC_QUERY_WORKERS = 16
+
+# Seconds browsers may reuse the leaderboard / analytics pages without asking;
+# afterwards they revalidate with the data-version ETag (students/versions.py)
+# and usually get a 304 without the page being rebuilt.
+SMS_VERSIONED_PAGE_MAX_AGE = 0
+
+# Seconds data versions stay cached. Writes drop them at once in a shared cache;
+# with a per-process cache (LocMemCache) other processes see a write's new
+# version, and so fresh analytics and ETags, within this many seconds.
+SMS_DATA_VERSION_TIMEOUT = 5
+
+# Most students one chart-data request (/api/charts/?students=...) may ask for.
+SMS_CHART_MAX_STUDENTS = 100
+
+# Background jobs (students/jobs.py, run by `manage.py runworker`): jobs run at
+# once per worker, seconds before the first retry (doubled per attempt), and
+# seconds without a worker heartbeat after which a running job is requeued.
+SMS_JOB_WORKERS = 2
+SMS_JOB_RETRY_DELAY = 30
+SMS_JOB_STALE_AFTER = 5 * 60
+
+# Per-request SQL profiling (Server-Timing header + budget warnings on the
+# 'students.profiling' logger). Views can override the budget with
+# @query_budget(...); STRICT turns violations into errors (useful in tests).
+# The budget keys are 'queries', 'db_ms' and 'similar'; leaving one out means
+# no default limit of that kind.
+SMS_QUERY_PROFILER = DEBUG
+SMS_QUERY_BUDGET = {'queries': 50, 'db_ms': 250, 'similar': 10}
+SMS_QUERY_BUDGET_STRICT = False
+
+# Where attendance totals are read from: 'rows' (one Attendance row per day) or
+# 'bitmap' (one AttendanceMonth row per student per month, totals by popcount).
+# Both are always written; see students/bitmaps.py.
+SMS_ATTENDANCE_STORAGE = 'rows'
+
+# Student list paging: 'cursor' (keyset, constant cost per page) or 'offset'
+# (numbered pages). STUDENT_LIST_COUNT is 'estimate', 'exact' or None (no total).
+SMS_STUDENT_LIST_PAGINATION = 'cursor'
+SMS_STUDENT_LIST_COUNT = 'estimate'
+
+# Database alias @use_replica views read from (None: always the primary), and
+# how many seconds after a user's own write they keep reading the primary.
+SMS_READ_REPLICA = 'replica'
+SMS_REPLICA_READ_YOUR_WRITES = 30
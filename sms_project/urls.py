@@ -3,7 +3,10 @@
 from django.contrib import admin
 from django.urls import path
 from students.views import (
-    login_page, register, logout_page, student_report, student_profile, home_page, student_leaderboard, subject_analytics, student_dashboard ,parent_dashboard, staff_dashboard, get_attendance_chart_data
+    login_page, register, logout_page, student_report, student_profile, home_page, student_leaderboard, subject_analytics, term_trend_report, student_dashboard ,parent_dashboard, staff_dashboard, department_dashboard, get_student_attendance_chart_data,
+    chart_data_api,
+    export_csv, bulk_attendance, bulk_attendance_api, fee_report, job_list, job_status, job_result,
+    student_dashboard_async, parent_dashboard_async, staff_dashboard_async, student_attendance_chart_async,
 )
 from django.conf import settings
 from django.conf.urls.static import static
@@ -23,13 +26,39 @@ urlpatterns = [
     path('students/', student_report, name="student_report"),
     path('leaderboard/', student_leaderboard, name="student_leaderboard"),
     path('analytics/subjects/', subject_analytics, name="subject_analytics"), # 👈 NEW PATH
+    path('analytics/terms/', term_trend_report, name="term_trends"),
     path('student/profile/<str:student_id>/', student_profile, name="student_profile"),
     # --- ROLE DASHBOARDS ---
     path('dashboard/student/', student_dashboard, name="student_dashboard"),
     path('dashboard/parent/', parent_dashboard, name="parent_dashboard"),
     path('dashboard/staff/', staff_dashboard, name="staff_dashboard"),
+    path('dashboard/departments/', department_dashboard, name="department_dashboard"),
 
-    path('api/attendance/chart/<str:student_id>/', get_attendance_chart_data, name='api_attendance_chart'),
+    # --- ASYNC DASHBOARDS (concurrent aggregates, for ASGI deployments) ---
+    path('async/dashboard/student/', student_dashboard_async, name="student_dashboard_async"),
+    path('async/dashboard/parent/', parent_dashboard_async, name="parent_dashboard_async"),
+    path('async/dashboard/staff/', staff_dashboard_async, name="staff_dashboard_async"),
+    path('async/api/attendance/chart/', student_attendance_chart_async, name='api_attendance_chart_async'),
+
+    # --- ATTENDANCE ROLL CALL ---
+    path('attendance/roll-call/', bulk_attendance, name="bulk_attendance"),
+    path('api/attendance/roll-call/', bulk_attendance_api, name="api_bulk_attendance"),
+
+    # --- FEE COLLECTION ---
+    path('fees/', fee_report, name="fee_report"),
+
+    # --- CSV EXPORTS (streamed) ---
+    path('exports/<str:kind>.csv', export_csv, name="export_csv"),
+
+    # --- BACKGROUND JOBS (runworker) ---
+    path('jobs/', job_list, name="job_list"),
+    path('jobs/<int:pk>/download/', job_result, name="job_result"),
+    path('api/jobs/<int:pk>/', job_status, name="api_job_status"),
+
+    # --- CHART DATA (JSON, conditional GET) ---
+    path('api/attendance/chart/', get_student_attendance_chart_data, name='api_attendance_chart'),
+    path('api/charts/', chart_data_api, name='api_chart_data'),
+    path('api/attendance/chart/<str:student_id>/', chart_data_api, name='api_student_chart'),
 ]
 
 if settings.DEBUG:
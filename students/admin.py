@@ -1,7 +1,15 @@
-from django.contrib import admin
-from django.http import HttpResponse
-import csv
-from .models import Department, StudentID, Student, Subject, SubjectMarks, Attendance, Profile
+from django import forms
+from django.contrib import admin, messages
+from django.core.exceptions import PermissionDenied
+from django.http import StreamingHttpResponse
+from django.shortcuts import redirect
+from django.template.response import TemplateResponse
+from django.urls import path
+from .exports import export_students
+from .imports import MAX_REPORTED_ERRORS, MarksImportError, import_marks
+from .jobs import enqueue
+from .search import search_students
+from .models import Department, StudentID, Student, Subject, SubjectMarks, Attendance, Profile, Job, ExamTerm, TermRollup
 
 
 
@@ -15,6 +23,14 @@ class AttendanceInline(admin.TabularInline):
 @admin.register(Department)
 class DepartmentAdmin(admin.ModelAdmin):
     list_display = ("department",)
+    actions = ['generate_report_cards']
+
+    def generate_report_cards(self, request, queryset):
+        # Rendered by `manage.py runworker`; the ZIPs are downloaded from the jobs page.
+        jobs = [enqueue('report_cards', {'department': department.pk}, user=request.user) for department in queryset]
+        self.message_user(request, f"Queued {len(jobs)} report card job(s): #{', #'.join(str(job.pk) for job in jobs)}.")
+
+    generate_report_cards.short_description = "Generate report cards (background job)"
 
 @admin.register(StudentID)
 class StudentIDAdmin(admin.ModelAdmin):
@@ -24,12 +40,94 @@ class StudentIDAdmin(admin.ModelAdmin):
 class SubjectAdmin(admin.ModelAdmin):
     list_display = ("subject_name",)
 
+class MarksImportForm(forms.Form):
+    file = forms.FileField(help_text="CSV or XLSX: student_id,subject,marks rows, or the marks export layout.")
+    strict = forms.BooleanField(required=False, help_text="Import nothing if any row is invalid.")
+    dry_run = forms.BooleanField(required=False, label="Dry run", help_text="Only validate the file.")
+    term = forms.ModelChoiceField(
+        ExamTerm.objects.all(), required=False, empty_label="Current term", help_text="Exam term the marks belong to.",
+    )
+
+
 @admin.register(SubjectMarks)
 class SubjectMarksAdmin(admin.ModelAdmin):
-    list_display = ("student", "subject", "marks")
-    list_filter = ("subject", "student")
+    list_display = ("student", "subject", "term", "marks")
+    list_filter = ("term", "subject", "student")
     search_fields = ("student__student_name", "subject__subject_name")
-    
+    change_list_template = "admin/students/subjectmarks/change_list.html"
+
+    def get_urls(self):
+        return [
+            path("import/", self.admin_site.admin_view(self.import_marks_view), name="students_subjectmarks_import"),
+        ] + super().get_urls()
+
+    def import_marks_view(self, request):
+        # Uploads past FILE_UPLOAD_MAX_MEMORY_SIZE are spooled to disk, and the importer reads them row by row.
+        if not self.has_add_permission(request) or not self.has_change_permission(request):
+            raise PermissionDenied
+        form = MarksImportForm(request.POST or None, request.FILES or None)
+        result = None
+        if request.method == "POST" and form.is_valid():
+            upload = form.cleaned_data["file"]
+            try:
+                result = import_marks(
+                    upload, upload.name, dry_run=form.cleaned_data["dry_run"], strict=form.cleaned_data["strict"],
+                    term=form.cleaned_data["term"].pk if form.cleaned_data["term"] else None,
+                )
+            except MarksImportError as exc:
+                form.add_error("file", str(exc))
+            else:
+                if result.rolled_back:
+                    self.message_user(request, f"{result.error_count} invalid rows; nothing was imported.", messages.ERROR)
+                elif result.dry_run:
+                    # Show the validation report below the form
+                    pass
+                elif result.error_count:
+                    self.message_user(
+                        request, f"Imported {result.imported} marks; {result.error_count} invalid rows were skipped.",
+                        messages.WARNING,
+                    )
+                else:
+                    self.message_user(request, f"✅ Imported {result.imported} marks for {result.students} students.")
+                    return redirect("admin:students_subjectmarks_changelist")
+
+        context = {
+            **self.admin_site.each_context(request),
+            "opts": self.model._meta,
+            "title": "Import marks",
+            "form": form,
+            "result": result,
+            "max_reported_errors": MAX_REPORTED_ERRORS,
+        }
+        return TemplateResponse(request, "admin/students/subjectmarks/import_marks.html", context)
+
+
+@admin.register(ExamTerm)
+class ExamTermAdmin(admin.ModelAdmin):
+    # Marking a term current moves summaries, ranks and dashboards to it once the change commits.
+    list_display = ("name", "start_date", "end_date", "is_current")
+    list_editable = ("is_current",)
+
+
+@admin.register(TermRollup)
+class TermRollupAdmin(admin.ModelAdmin):
+    list_display = ("term", "department", "subject", "count", "total", "fail_count", "updated_at")
+    list_filter = ("term", "department", "subject")
+
+    def has_add_permission(self, request):
+        return False  # maintained from SubjectMarks by students/terms.py
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ("pk", "kind", "status", "attempts", "message", "created_by", "created_at", "finished_at")
+    list_filter = ("status", "kind")
+    readonly_fields = ("worker", "started_at", "finished_at", "updated_at")
+
+
 @admin.register(Profile)
 class ProfileAdmin(admin.ModelAdmin):
     list_display = ('user', 'role', 'student', 'related_student')
@@ -50,6 +148,10 @@ class StudentAdmin(admin.ModelAdmin):
     get_student_id.admin_order_field = 'student_id__student_id'
     get_student_id.short_description = 'Student ID'
 
+    def get_search_results(self, request, queryset, search_term):
+        # Same FTS5 prefix search as the student list instead of LIKE '%term%' scans
+        return search_students(queryset, search_term), False
+
     
     inlines = [AttendanceInline]
 
@@ -57,25 +159,9 @@ class StudentAdmin(admin.ModelAdmin):
     actions = ['export_as_csv']
 
     def export_as_csv(self, request, queryset):
-        meta = self.model._meta
-        
-        field_names = ['student_name', 'student_id', 'department', 'student_email', 'student_age']
-
-        response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = f'attachment; filename=students_export.csv'
-        writer = csv.writer(response)
-
-        writer.writerow(field_names)
-        for obj in queryset:
-            row = [
-                getattr(obj, 'student_name'), 
-                obj.student_id.student_id,
-                obj.department.department, 
-                getattr(obj, 'student_email'),
-                getattr(obj, 'student_age'),
-            ]
-            writer.writerow(row)
-
+        # Streamed row by row from one joined query, so memory stays flat for any selection size.
+        response = StreamingHttpResponse(export_students(queryset), content_type='text/csv')
+        response['Content-Disposition'] = 'attachment; filename=students_export.csv'
         return response
     
     export_as_csv.short_description = "Export Selected Students (CSV)"
\ No newline at end of file
@@ -0,0 +1,128 @@
+# students/analytics.py
+#
+# Per-subject statistics for the analytics page. Everything is computed in a
+# fixed number of queries regardless of how many subjects exist:
+#   1. one grouped query over Subject with conditional aggregation
+#      (avg/max/min/count/fail count/sum of squares/10 histogram buckets)
+#   2. one (subject, marks) frequency table used for the exact median and p90.
+# Only the current exam term's marks are counted (students/terms.py). Results
+# are cached per term and data version of SubjectMarks and Subject
+# (students/versions.py), so any write to either retires them.
+
+import math
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Avg, Count, F, FilteredRelation, Max, Min, Q, Sum
+
+from .models import Subject
+from .terms import current_marks, current_term_id
+from .versions import data_versions
+
+HISTOGRAM_BUCKETS = 10
+ANALYTICS_TABLES = ('subjectmarks', 'subject')
+
+
+def pass_mark():
+    return getattr(settings, 'SMS_PASS_MARK', 35)
+
+
+def _bucket_bounds(index):
+    low = index * 10
+    # The last bucket is closed so a perfect 100 is counted.
+    high = 101 if index == HISTOGRAM_BUCKETS - 1 else low + 10
+    return low, high
+
+
+def _percentile(frequencies, total, fraction):
+    """Linearly interpolated percentile over a sorted [(mark, count), ...] table."""
+    if not total:
+        return 0
+    position = (total - 1) * fraction
+    lower_index, upper_index = math.floor(position), math.ceil(position)
+
+    lower = upper = None
+    seen = 0
+    for mark, count in frequencies:
+        seen += count
+        if lower is None and seen > lower_index:
+            lower = mark
+        if seen > upper_index:
+            upper = mark
+            break
+    return round(lower + (upper - lower) * (position - lower_index), 2)
+
+
+def subject_statistics(threshold=None):
+    """Returns one stats dict per subject (see the module header), cached."""
+    threshold = pass_mark() if threshold is None else threshold
+    versions = data_versions(*ANALYTICS_TABLES)
+    term_id = current_term_id()
+    cache_key = (
+        f"subject_analytics:term{term_id}:m{versions['subjectmarks']}:s{versions['subject']}:t{threshold}"
+    )
+    analytics = cache.get(cache_key)
+    if analytics is None:
+        analytics = _compute_subject_statistics(threshold, term_id)
+        cache.set(cache_key, analytics, getattr(settings, 'SMS_ANALYTICS_CACHE_TIMEOUT', 3600))
+    return analytics
+
+
+def _compute_subject_statistics(threshold, term_id):
+    buckets = {}
+    for index in range(HISTOGRAM_BUCKETS):
+        low, high = _bucket_bounds(index)
+        buckets[f'bucket_{index}'] = Count(
+            'term_marks', filter=Q(term_marks__marks__gte=low, term_marks__marks__lt=high),
+        )
+
+    # The term goes into the LEFT JOIN itself, so subjects without marks this term still get a row
+    subjects = Subject.objects.order_by('pk').annotate(
+        term_marks=FilteredRelation('subjectmarks', condition=Q(subjectmarks__term=term_id)),
+    ).annotate(
+        avg_marks=Avg('term_marks__marks'),
+        max_marks=Max('term_marks__marks'),
+        min_marks=Min('term_marks__marks'),
+        total_count=Count('term_marks'),
+        fail_count=Count('term_marks', filter=Q(term_marks__marks__lt=threshold)),
+        sum_of_squares=Sum(F('term_marks__marks') * F('term_marks__marks')),
+        **buckets,
+    )
+
+    frequencies = {}
+    for subject_id, mark, count in (
+        current_marks().values_list('subject', 'marks')
+        .annotate(count=Count('pk'))
+        .order_by('subject', 'marks')
+    ):
+        frequencies.setdefault(subject_id, []).append((mark, count))
+
+    analytics = []
+    for subject in subjects:
+        total = subject.total_count or 0
+        avg = subject.avg_marks or 0
+        variance = (subject.sum_of_squares / total - avg * avg) if total else 0
+        histogram = []
+        for index in range(HISTOGRAM_BUCKETS):
+            low, high = _bucket_bounds(index)
+            count = getattr(subject, f'bucket_{index}')
+            histogram.append({
+                'label': f'{low}-{high - 1}',
+                'count': count,
+                'percent': round(count / total * 100, 1) if total else 0,
+            })
+
+        analytics.append({
+            'subject_name': subject.subject_name,
+            'avg_marks': round(avg, 2),
+            'max_marks': subject.max_marks or 0,
+            'min_marks': subject.min_marks or 0,
+            'total_students': total,
+            'fail_count': subject.fail_count,
+            'pass_rate': round(((total - subject.fail_count) / total * 100), 2) if total > 0 else 0,
+            'median': _percentile(frequencies.get(subject.pk, []), total, 0.5),
+            'p90': _percentile(frequencies.get(subject.pk, []), total, 0.9),
+            'std_dev': round(math.sqrt(max(variance, 0)), 2),
+            'histogram': histogram,
+        })
+    return analytics
@@ -0,0 +1,39 @@
+# students/attendance.py
+#
+# Whole-class roll call: one department, one date, everybody present except
+# the listed absentees, written as a single batched upsert on the
+# (student, date) unique key instead of one INSERT per student, plus two
+# set-based UPDATEs of the month bitmaps.
+
+from django.db import transaction
+
+from .bitmaps import record_day
+from .models import Attendance, Student
+from .signals import student_data_bulk_changed
+
+ROLL_CALL_BATCH_SIZE = 1000
+
+
+def mark_roll_call(department, date, absent_student_pks=(), batch_size=ROLL_CALL_BATCH_SIZE):
+    """
+    Records attendance for every student of `department` on `date`. Returns
+    {'marked': n, 'present': n, 'absent': n}. Existing rows for that date are
+    overwritten, so re-submitting a corrected roll call is safe.
+    """
+    student_pks = list(Student.objects.filter(department=department).values_list('pk', flat=True))
+    absent = set(absent_student_pks)
+    rows = [Attendance(student_id=pk, date=date, is_present=pk not in absent) for pk in student_pks]
+
+    with transaction.atomic():
+        Attendance.objects.bulk_create(
+            rows,
+            batch_size=batch_size,
+            update_conflicts=True,
+            unique_fields=['student', 'date'],
+            update_fields=['is_present'],
+        )
+        record_day(Student.objects.filter(department=department), date, absent)
+        transaction.on_commit(lambda: student_data_bulk_changed.send(sender=Attendance, student_ids=student_pks))
+
+    absent_count = sum(1 for pk in student_pks if pk in absent)
+    return {'marked': len(rows), 'present': len(rows) - absent_count, 'absent': absent_count}
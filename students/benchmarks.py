@@ -0,0 +1,355 @@
+# students/benchmarks.py
+#
+# Scale-tiered benchmark harness behind `manage.py benchmark`. A tier is a
+# seeded database of a fixed size (kept between runs); every scenario is one
+# request through the test Client, measured for wall time, SQL query count (on
+# every alias, the read replica included) and peak Python memory (tracemalloc). Results are plain dicts so they can be
+# dumped to JSON and compared with a stored baseline. run_throughput() (behind
+# `manage.py benchmark_asgi`) compares requests/second of the sync dashboards
+# over WSGI with their async versions over ASGI under concurrent load.
+
+import asyncio
+import os
+import statistics
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass
+
+from asgiref.sync import ThreadSensitiveContext
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, connection, connections
+from django.db.backends.signals import connection_created
+from django.test import AsyncClient, Client
+from django.test.utils import setup_test_environment
+from django.urls import reverse
+
+from .models import Profile, Student
+from .profiling import QueryProfile
+from .seeding import seed_dataset
+
+TIERS = {
+    '1k': {'students': 1_000, 'attendance_days': 365, 'fee_months': 12},
+    '50k': {'students': 50_000, 'attendance_days': 365, 'fee_months': 12},
+    '500k': {'students': 500_000, 'attendance_days': 365, 'fee_months': 12},
+}
+
+BENCH_PASSWORD = 'benchmark'
+
+
+@dataclass
+class Scenario:
+    name: str
+    role: str                 # which benchmark user issues the request
+    url: object               # callable(fixtures) -> path
+    method: str = 'get'
+    data: object = None       # callable(fixtures) -> POST data
+
+    def request(self, client, fixtures):
+        url = self.url(fixtures)
+        if self.method == 'post':
+            return client.post(url, self.data(fixtures))
+        return client.get(url)
+
+
+SCENARIOS = [
+    Scenario('student_report', 'staff', lambda f: reverse('student_report')),
+    Scenario('student_report_search', 'staff', lambda f: reverse('student_report') + f"?search={f['search']}"),
+    Scenario('student_profile', 'staff', lambda f: reverse('student_profile', args=[f['student_id']])),
+    Scenario('student_dashboard', 'student', lambda f: reverse('student_dashboard')),
+    Scenario('parent_dashboard', 'parent', lambda f: reverse('parent_dashboard')),
+    Scenario('staff_dashboard', 'staff', lambda f: reverse('staff_dashboard')),
+    Scenario('student_leaderboard', 'staff', lambda f: reverse('student_leaderboard')),
+    Scenario('student_leaderboard_jump', 'student', lambda f: reverse('student_leaderboard') + '?me=1'),
+    Scenario('subject_analytics', 'staff', lambda f: reverse('subject_analytics')),
+    Scenario(
+        'csv_export', 'staff', lambda f: reverse('admin:students_student_changelist'), method='post',
+        data=lambda f: {
+            'action': 'export_as_csv', 'select_across': '1', 'index': '0',
+            '_selected_action': [f['student_pk']],
+        },
+    ),
+]
+
+
+def prepare_tier_database(name, tier, workdir, fresh=False, log=print):
+    """
+    Switches the default connection to a per-tier SQLite test database in
+    `workdir`, seeding it only when it has fewer students than the tier asks
+    for. Returns the seeded row counts.
+    """
+    setup_test_environment()
+    path = os.path.join(workdir, f"bench-{name}.sqlite3")
+    connection.settings_dict.setdefault('TEST', {})['NAME'] = path
+    if fresh and os.path.exists(path):
+        os.remove(path)
+    connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=True)
+    for alias in connections:
+        # e.g. the read replica: point it at the tier database as well
+        if connections[alias].settings_dict.get('TEST', {}).get('MIRROR') == DEFAULT_DB_ALIAS:
+            connections[alias].close()
+            connections[alias].creation.set_as_test_mirror(connection.settings_dict)
+            # Connections opened later by other threads (the throughput benchmark) follow it too
+            connections.settings[alias] = connection.settings_dict
+
+    existing = Student.objects.count()
+    if existing >= tier['students']:
+        log(f"Reusing {path} ({existing} students).")
+        return {'students': existing}
+
+    log(f"Seeding {path} for tier {name}...")
+    return seed_dataset(
+        students=tier['students'] - existing,
+        attendance_days=tier['attendance_days'],
+        fee_months=tier['fee_months'],
+        log=log,
+    )
+
+
+def ensure_fixtures():
+    """Creates (or reuses) the staff/student/parent users the scenarios log in as."""
+    student = Student.objects.select_related('student_id').order_by('pk').first()
+    if student is None:
+        raise ValueError("The benchmark database has no students; seed it first.")
+
+    users = {}
+    for role in ('staff', 'student', 'parent'):
+        user, created = User.objects.get_or_create(
+            username=f'bench-{role}',
+            defaults={'is_staff': role == 'staff', 'is_superuser': role == 'staff'},
+        )
+        if created:
+            user.set_password(BENCH_PASSWORD)
+            user.save()
+        Profile.objects.update_or_create(user=user, defaults={
+            'role': role,
+            'student': student if role == 'student' else None,
+            'related_student': student if role == 'parent' else None,
+        })
+        users[role] = user
+
+    return {
+        'users': users,
+        'student_pk': student.pk,
+        'student_id': student.student_id.student_id,
+        'search': student.student_name.split()[0],
+    }
+
+
+def measure(scenario, client, fixtures, repeat=3):
+    """
+    Runs a scenario `repeat` times; the first run starts with an empty cache.
+    `queries` is the count of that cold run, `warm_queries` of the last one.
+    """
+    for cache in caches.all():
+        cache.clear()
+
+    timings, queries, peak = [], [], 0
+    status = None
+    for _ in range(repeat):
+        tracemalloc.start()
+        started = time.perf_counter()
+        # Every alias: inside @use_replica views most reads go to the replica mirror
+        with QueryProfile() as profile:
+            response = scenario.request(client, fixtures)
+            if response.streaming:
+                for _chunk in response.streaming_content:
+                    pass
+        timings.append((time.perf_counter() - started) * 1000)
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+        queries.append(profile.count)
+        status = response.status_code
+
+    return {
+        'status': status,
+        'cold_ms': round(timings[0], 2),
+        'wall_ms': round(statistics.median(timings[1:] or timings), 2),
+        'queries': queries[0],
+        'warm_queries': queries[-1],
+        'peak_kb': round(peak / 1024, 1),
+    }
+
+
+def run_scenarios(names=None, repeat=3):
+    fixtures = ensure_fixtures()
+    clients = {}
+    for role, user in fixtures['users'].items():
+        clients[role] = Client()
+        clients[role].force_login(user)
+
+    results = {}
+    for scenario in SCENARIOS:
+        if names and scenario.name not in names:
+            continue
+        results[scenario.name] = measure(scenario, clients[scenario.role], fixtures, repeat=repeat)
+    return results
+
+
+def compare(results, baseline, time_tolerance=0.25, memory_tolerance=0.25, min_ms=5.0):
+    """
+    Returns a list of human-readable regressions against a baseline result set.
+    Query counts (cold and warm) must not grow; time and memory may grow by the
+    given fraction (time differences under `min_ms` are treated as noise).
+    """
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        if current['status'] != previous['status']:
+            regressions.append(f"{name}: status {previous['status']} -> {current['status']}")
+        if current['queries'] > previous['queries']:
+            regressions.append(f"{name}: queries {previous['queries']} -> {current['queries']}")
+        if current['warm_queries'] > previous.get('warm_queries', current['warm_queries']):
+            regressions.append(f"{name}: warm queries {previous['warm_queries']} -> {current['warm_queries']}")
+        allowed_ms = max(previous['wall_ms'] * (1 + time_tolerance), previous['wall_ms'] + min_ms)
+        if current['wall_ms'] > allowed_ms:
+            regressions.append(f"{name}: wall time {previous['wall_ms']}ms -> {current['wall_ms']}ms")
+        if current['peak_kb'] > previous['peak_kb'] * (1 + memory_tolerance):
+            regressions.append(f"{name}: peak memory {previous['peak_kb']}KB -> {current['peak_kb']}KB")
+    return regressions
+
+
+# -------------------------------------------------------------------
+# Throughput under concurrent load: sync views over WSGI vs async views over ASGI
+# -------------------------------------------------------------------
+# Each pair is (name, role, sync url name, async url name). The WSGI side
+# sends the requests from a pool of threads, like a threaded WSGI server; the
+# ASGI side sends them as concurrent tasks on one event loop through Django's
+# ASGI handler, like uvicorn/daphne running sms_project.asgi.
+
+THROUGHPUT_PAIRS = [
+    ('staff_dashboard', 'staff', 'staff_dashboard', 'staff_dashboard_async'),
+    ('student_dashboard', 'student', 'student_dashboard', 'student_dashboard_async'),
+    ('parent_dashboard', 'parent', 'parent_dashboard', 'parent_dashboard_async'),
+]
+
+
+@contextmanager
+def simulated_latency(ms):
+    """
+    Adds `ms` milliseconds to every query on every connection opened meanwhile
+    (in any thread), to model a database across the network: that is where
+    running a page's aggregates concurrently pays off.
+    """
+    if not ms:
+        yield
+        return
+
+    wrapped = []
+
+    def delay(execute, sql, params, many, context):
+        time.sleep(ms / 1000)
+        return execute(sql, params, many, context)
+
+    def install(sender, connection, **kwargs):
+        if delay not in connection.execute_wrappers:
+            # First, as execute_wrapper() blocks (e.g. QueryProfile) pop the last entry on exit
+            connection.execute_wrappers.insert(0, delay)
+            wrapped.append(connection)
+
+    connection_created.connect(install, weak=False, dispatch_uid='sms-simulated-latency')
+    for existing in connections.all(initialized_only=True):
+        install(None, existing)
+    try:
+        yield
+    finally:
+        connection_created.disconnect(dispatch_uid='sms-simulated-latency')
+        for wrapper in wrapped:
+            if delay in wrapper.execute_wrappers:
+                wrapper.execute_wrappers.remove(delay)
+
+
+def _summary(latencies, statuses, elapsed):
+    latencies = sorted(latencies)
+    return {
+        'requests': len(latencies),
+        'errors': sum(1 for status in statuses if status != 200),
+        'elapsed_s': round(elapsed, 3),
+        'rps': round(len(latencies) / elapsed, 1) if elapsed else 0,
+        'p50_ms': round(statistics.median(latencies), 2),
+        'p95_ms': round(latencies[max(0, int(len(latencies) * 0.95) - 1)], 2),
+    }
+
+
+def _wsgi_load(user, path, concurrency, requests):
+    clients = []
+    for _ in range(concurrency):
+        client = Client()
+        client.force_login(user)
+        clients.append(client)
+    remaining = iter(range(requests))
+    lock = threading.Lock()
+    latencies, statuses = [], []
+
+    def worker(client):
+        while True:
+            with lock:
+                if next(remaining, None) is None:
+                    return
+            started = time.perf_counter()
+            response = client.get(path)
+            latencies.append((time.perf_counter() - started) * 1000)
+            statuses.append(response.status_code)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(worker, clients))
+    return _summary(latencies, statuses, time.perf_counter() - started)
+
+
+async def _asgi_load(user, path, concurrency, requests):
+    clients = []
+    for _ in range(concurrency):
+        client = AsyncClient()
+        await client.aforce_login(user)
+        clients.append(client)
+    remaining = iter(range(requests))
+    latencies, statuses = [], []
+
+    async def worker(client):
+        for _index in remaining:
+            started = time.perf_counter()
+            # Like ASGIHandler (and unlike the test AsyncClient), give each
+            # request its own thread for sync code
+            async with ThreadSensitiveContext():
+                response = await client.get(path)
+            latencies.append((time.perf_counter() - started) * 1000)
+            statuses.append(response.status_code)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(client) for client in clients))
+    return _summary(latencies, statuses, time.perf_counter() - started)
+
+
+def run_throughput(names=None, concurrency=8, requests=80, query_delay_ms=0):
+    """
+    {name: {'wsgi': stats, 'asgi': stats, 'speedup': asgi rps / wsgi rps}}.
+    Caches are cleared before each side, so both start cold.
+    """
+    fixtures = ensure_fixtures()
+    results = {}
+    with simulated_latency(query_delay_ms):
+        for name, role, sync_name, async_name in THROUGHPUT_PAIRS:
+            if names and name not in names:
+                continue
+            user = fixtures['users'][role]
+
+            for cache in caches.all():
+                cache.clear()
+            wsgi = _wsgi_load(user, reverse(sync_name), concurrency, requests)
+
+            for cache in caches.all():
+                cache.clear()
+            asgi = asyncio.run(_asgi_load(user, reverse(async_name), concurrency, requests))
+
+            results[name] = {
+                'wsgi': wsgi,
+                'asgi': asgi,
+                'speedup': round(asgi['rps'] / wsgi['rps'], 2) if wsgi['rps'] else None,
+            }
+    return results
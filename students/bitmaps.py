@@ -0,0 +1,134 @@
+# students/bitmaps.py
+#
+# Month bitmaps for attendance (AttendanceMonth). A school day is one bit, so a
+# year of attendance is 12 small rows per student instead of ~250, and
+# present/recorded totals are popcounts. Attendance rows stay the source of
+# truth: the bitmaps are rebuilt per student after single-row writes and
+# patched set-based by the roll call. settings.SMS_ATTENDANCE_STORAGE picks
+# which representation the dashboards and chart API read ('rows' or 'bitmap').
+
+import datetime
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, ExpressionWrapper, F, IntegerField, Q, Sum, Value
+
+from .models import Attendance, AttendanceMonth
+
+FULL_MASK = (1 << 31) - 1
+
+
+def use_bitmaps():
+    return getattr(settings, 'SMS_ATTENDANCE_STORAGE', 'rows') == 'bitmap'
+
+
+def month_start(date):
+    return date.replace(day=1)
+
+
+def day_bit(date):
+    return 1 << (date.day - 1)
+
+
+def popcount(field):
+    """
+    Number of set bits of a (31-bit, non-negative) integer column, or of an
+    integer expression, as a SQL expression (SWAR bit counting), so totals can
+    be summed in the database.
+    """
+    x = F(field) if isinstance(field, str) else field
+    x = x - x.bitrightshift(1).bitand(0x55555555)
+    x = x.bitand(0x33333333) + x.bitrightshift(2).bitand(0x33333333)
+    x = (x + x.bitrightshift(4)).bitand(0x0F0F0F0F)
+    return ExpressionWrapper((x * Value(0x01010101)).bitrightshift(24).bitand(0xFF), output_field=IntegerField())
+
+
+def range_masks(date_from, date_to):
+    """{first day of month: mask of the days of that month within [date_from, date_to]}."""
+    masks = {}
+    day = date_from
+    while day <= date_to:
+        masks[month_start(day)] = masks.get(month_start(day), 0) | day_bit(day)
+        day += datetime.timedelta(days=1)
+    return masks
+
+
+def attendance_totals(student_ids):
+    """{student_pk: (present_days, recorded_days)} read from whichever storage is configured."""
+    if use_bitmaps():
+        rows = (
+            AttendanceMonth.objects.filter(student__in=student_ids)
+            .values('student')
+            .annotate(present=Sum(popcount('present_mask')), total=Sum(popcount('recorded_mask')))
+            .order_by()
+        )
+    else:
+        rows = (
+            Attendance.objects.filter(student__in=student_ids)
+            .values('student')
+            .annotate(present=Count('pk', filter=Q(is_present=True)), total=Count('pk'))
+            .order_by()
+        )
+    return {row['student']: (row['present'], row['total']) for row in rows}
+
+
+def rebuild_attendance_bitmaps(student_ids=None, batch_size=5000):
+    """
+    Recomputes AttendanceMonth rows from Attendance for the given students (or
+    everyone) with one ordered scan. Returns the number of month rows written.
+    """
+    attendance = Attendance.objects.order_by('student', 'date')
+    months = AttendanceMonth.objects.all()
+    if student_ids is not None:
+        student_ids = list(student_ids)
+        attendance = attendance.filter(student__in=student_ids)
+        months = months.filter(student__in=student_ids)
+
+    written = 0
+    with transaction.atomic():
+        months.delete()
+        batch, current = [], None
+        for student_id, date, is_present in attendance.values_list('student', 'date', 'is_present').iterator(
+            chunk_size=batch_size,
+        ):
+            key = (student_id, month_start(date))
+            if current is None or (current.student_id, current.month) != key:
+                if current is not None:
+                    batch.append(current)
+                current = AttendanceMonth(student_id=student_id, month=key[1])
+            current.recorded_mask |= day_bit(date)
+            if is_present:
+                current.present_mask |= day_bit(date)
+            if len(batch) >= batch_size:
+                AttendanceMonth.objects.bulk_create(batch)
+                written += len(batch)
+                batch = []
+        if current is not None:
+            batch.append(current)
+        AttendanceMonth.objects.bulk_create(batch)
+        written += len(batch)
+    return written
+
+
+def record_day(students, date, absent_student_pks):
+    """
+    Set-based bitmap update for a roll call: marks `date` as recorded for every
+    student in the `students` queryset, present unless listed as absent.
+    """
+    month, bit = month_start(date), day_bit(date)
+    student_pks = list(students.values_list('pk', flat=True))
+    AttendanceMonth.objects.bulk_create(
+        [AttendanceMonth(student_id=pk, month=month) for pk in student_pks],
+        ignore_conflicts=True,
+    )
+    rows = AttendanceMonth.objects.filter(month=month, student__in=students)
+    absent = Q(student__in=list(absent_student_pks))
+    rows.exclude(absent).update(
+        recorded_mask=F('recorded_mask').bitor(bit),
+        present_mask=F('present_mask').bitor(bit),
+    )
+    rows.filter(absent).update(
+        recorded_mask=F('recorded_mask').bitor(bit),
+        present_mask=F('present_mask').bitand(FULL_MASK & ~bit),
+    )
+
@@ -0,0 +1,199 @@
+# students/charts.py
+#
+# Chart data for one or many students in a fixed number of queries:
+#   - attendance per day and per month over a date range, grouped in the
+#     database (Attendance rows, or the AttendanceMonth bitmaps when
+#     settings.SMS_ATTENDANCE_STORAGE = 'bitmap');
+#   - marks per subject.
+# chart_freshness() derives an ETag / Last-Modified pair from the students'
+# StudentSummary.updated_at, which the signal handlers touch after every marks,
+# attendance or fee write, and from the data versions of the tables that shape
+# the response without touching summaries (student names, subject names, the
+# current term), so clients can revalidate with a cheap read-only query and get
+# a 304 when nothing changed.
+
+import datetime
+import hashlib
+
+from django.conf import settings
+from django.db.models import Count, Max, Q
+from django.db.models.functions import TruncMonth
+
+from .bitmaps import popcount, use_bitmaps
+from .models import Attendance, AttendanceMonth, Student, StudentSummary
+from .terms import current_marks
+from .versions import data_versions
+
+BUCKETS = ('daily', 'monthly')
+CHART_TABLES = ('student', 'subject', 'examterm')
+# Summaries are built lazily: a student without one is only covered by these
+SUMMARY_TABLES = ('subjectmarks', 'attendance')
+
+
+def max_students():
+    return getattr(settings, 'SMS_CHART_MAX_STUDENTS', 100)
+
+
+def default_range(today=None):
+    """The last twelve months, from the first day of the month eleven months ago."""
+    today = today or datetime.date.today()
+    month_index = today.year * 12 + today.month - 1 - 11
+    return datetime.date(month_index // 12, month_index % 12 + 1, 1), today
+
+
+def resolve_students(student_ids, only_pk=None):
+    """
+    ([{'pk', 'student_id', 'name'}], [unknown ids]) for the given StudentID
+    strings, in request order. With `only_pk` (a student or parent account)
+    only that student can be returned, and is returned when no ids are given;
+    any other id is reported as unknown.
+    """
+    students = Student.objects.all()
+    if only_pk is not None:
+        students = students.filter(pk=only_pk)
+    if student_ids:
+        students = students.filter(student_id__student_id__in=student_ids)
+    elif only_pk is None:
+        return [], []
+
+    rows = {
+        row['student_id__student_id']: {'pk': row['pk'], 'student_id': row['student_id__student_id'],
+                                        'name': row['student_name']}
+        for row in students.values('pk', 'student_id__student_id', 'student_name')
+    }
+    if not student_ids:
+        return list(rows.values()), []
+    requested = list(dict.fromkeys(student_ids))
+    return [rows[sid] for sid in requested if sid in rows], [sid for sid in requested if sid not in rows]
+
+
+def chart_freshness(student_pks, *variant):
+    """
+    (etag, last_modified) for chart data of these students. `variant` holds
+    whatever else shapes the response (date range, buckets). Read-only: it
+    runs for conditional GETs too.
+    """
+    state = StudentSummary.objects.filter(student__in=student_pks).aggregate(
+        last_modified=Max('updated_at'), rows=Count('pk'),
+    )
+    tables = CHART_TABLES if state['rows'] == len(student_pks) else CHART_TABLES + SUMMARY_TABLES
+    versions = data_versions(*tables)
+
+    last_modified = state['last_modified']
+    fingerprint = '|'.join(str(part) for part in (
+        sorted(student_pks), last_modified and last_modified.isoformat(), state['rows'],
+        *(f'{name}{versions[name]}' for name in tables),
+        getattr(settings, 'SMS_ATTENDANCE_STORAGE', 'rows'), *variant,
+    ))
+    return hashlib.md5(fingerprint.encode()).hexdigest(), last_modified
+
+
+def _empty_attendance(buckets):
+    attendance = {'present': 0, 'total': 0}
+    if 'daily' in buckets:
+        attendance['daily'] = {'dates': [], 'present': []}
+    if 'monthly' in buckets:
+        attendance['monthly'] = {'months': [], 'present': [], 'total': [], 'percentage': []}
+    return attendance
+
+
+def _add_month(attendance, month, present, total):
+    attendance['present'] += present
+    attendance['total'] += total
+    if 'monthly' in attendance:
+        series = attendance['monthly']
+        series['months'].append(month.strftime('%Y-%m'))
+        series['present'].append(present)
+        series['total'].append(total)
+        series['percentage'].append(round(present / total * 100, 2) if total else 0)
+
+
+def _add_day(attendance, date, is_present):
+    attendance['daily']['dates'].append(date.isoformat())
+    attendance['daily']['present'].append(int(is_present))
+
+
+def _attendance_from_rows(by_student, student_pks, date_from, date_to, buckets):
+    attendance = Attendance.objects.filter(student__in=student_pks, date__range=(date_from, date_to))
+    months = (
+        attendance.annotate(month=TruncMonth('date'))
+        .values('student', 'month')
+        .annotate(present=Count('pk', filter=Q(is_present=True)), total=Count('pk'))
+        .order_by('student', 'month')
+    )
+    for row in months:
+        _add_month(by_student[row['student']], row['month'], row['present'], row['total'])
+
+    if 'daily' in buckets:
+        for student_pk, date, is_present in attendance.order_by('student', 'date').values_list(
+            'student', 'date', 'is_present',
+        ):
+            _add_day(by_student[student_pk], date, is_present)
+
+
+def _attendance_from_bitmaps(by_student, student_pks, date_from, date_to, buckets):
+    # Whole months are stored together: popcount the ones inside the range in
+    # SQL, and only decode the (at most two) partial months at the edges.
+    rows = (
+        AttendanceMonth.objects.filter(student__in=student_pks, month__range=(date_from.replace(day=1), date_to))
+        .annotate(present=popcount('present_mask'), total=popcount('recorded_mask'))
+        .order_by('student', 'month')
+        .values_list('student', 'month', 'present_mask', 'recorded_mask', 'present', 'total')
+    )
+    for student_pk, month, present_mask, recorded_mask, present, total in rows:
+        days = [
+            (month.replace(day=day), bool(present_mask >> (day - 1) & 1))
+            for day in range(1, 32)
+            if recorded_mask >> (day - 1) & 1
+        ]
+        if month < date_from or _month_end(month) > date_to:
+            days = [(date, is_present) for date, is_present in days if date_from <= date <= date_to]
+            present, total = sum(is_present for _date, is_present in days), len(days)
+        _add_month(by_student[student_pk], month, present, total)
+        if 'daily' in buckets:
+            for date, is_present in days:
+                _add_day(by_student[student_pk], date, is_present)
+
+
+def _month_end(month):
+    return (month.replace(day=28) + datetime.timedelta(days=4)).replace(day=1) - datetime.timedelta(days=1)
+
+
+def chart_data(students, date_from, date_to, buckets=BUCKETS):
+    """
+    Chart series for the students returned by resolve_students(), keyed the
+    same way and in the same order:
+
+        {'student_id': 'STU-1001', 'name': ...,
+         'attendance': {'present': 41, 'total': 50,
+                        'daily': {'dates': [...], 'present': [1, 0, ...]},
+                        'monthly': {'months': ['2025-01', ...], 'present': [...],
+                                    'total': [...], 'percentage': [...]}},
+         'marks': {'subjects': [...], 'marks': [...]}}
+    """
+    student_pks = [student['pk'] for student in students]
+    attendance = {pk: _empty_attendance(buckets) for pk in student_pks}
+    marks = {pk: {'subjects': [], 'marks': []} for pk in student_pks}
+
+    if use_bitmaps():
+        _attendance_from_bitmaps(attendance, student_pks, date_from, date_to, buckets)
+    else:
+        _attendance_from_rows(attendance, student_pks, date_from, date_to, buckets)
+
+    for student_pk, subject, mark in (
+        current_marks().filter(student__in=student_pks)
+        .order_by('student', 'subject__subject_name', 'subject')
+        .values_list('student', 'subject__subject_name', 'marks')
+    ):
+        marks[student_pk]['subjects'].append(subject)
+        marks[student_pk]['marks'].append(mark)
+
+    return [
+        {
+            'student_id': student['student_id'],
+            'name': student['name'],
+            'attendance': attendance[student['pk']],
+            'marks': marks[student['pk']],
+        }
+        for student in students
+    ]
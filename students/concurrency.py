@@ -0,0 +1,62 @@
+# students/concurrency.py
+#
+# Helpers for the async views. Django's async ORM methods (acount(),
+# aaggregate(), ...) all run on one shared thread per request, so two awaited
+# aggregates still execute one after the other. run_concurrently() instead runs
+# each independent piece of work in its own worker thread, and therefore on its
+# own database connection, so a page waits for its slowest query rather than
+# for the sum of all of them. The workers form one pool per process, sized by
+# settings.SMS_ASYNC_QUERY_WORKERS, which also caps the database connections
+# they hold; those are released like a request's (close_old_connections,
+# honouring CONN_MAX_AGE).
+#
+# The work must only read, and must not rely on uncommitted data of the calling
+# thread (e.g. inside a TestCase transaction the workers will not see it).
+
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _query_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'SMS_ASYNC_QUERY_WORKERS', 16),
+                thread_name_prefix='sms-query',
+            )
+        return _executor
+
+
+def _released(func, args, kwargs):
+    try:
+        return func(*args, **kwargs)
+    finally:
+        close_old_connections()
+
+
+async def run_in_worker(func, *args, **kwargs):
+    """Awaits `func(*args, **kwargs)` run in a worker thread with its own connection."""
+    return await sync_to_async(_released, thread_sensitive=False, executor=_query_executor())(func, args, kwargs)
+
+
+async def run_concurrently(**calls):
+    """
+    Runs each zero-argument callable in `calls` concurrently and returns
+    {name: result}:
+
+        totals = await run_concurrently(
+            students=Student.objects.count,
+            average=lambda: SubjectMarks.objects.aggregate(avg=Avg('marks'))['avg'],
+        )
+    """
+    results = await asyncio.gather(*(run_in_worker(call) for call in calls.values()))
+    return dict(zip(calls, results))
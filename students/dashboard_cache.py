@@ -0,0 +1,95 @@
+# students/dashboard_cache.py
+#
+# Cache for the computed student / parent dashboard contexts, keyed by role and
+# student. The signal receivers delete a student's entries once the writes that
+# affect them commit (SubjectMarks, Attendance, FeeRecord, Student); Subject
+# changes bump a generation number that retires every entry, and rank changes
+# bump a separate version that only the student dashboard (which shows the
+# rank) is keyed on. Only get/set/add/incr/delete are used, so any cache
+# backend works (local memory, file, database, memcached/redis).
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+
+ROLES = ('student', 'parent')
+GENERATION_KEY = 'dashboard:generation'
+RANK_VERSION_KEY = 'dashboard:rank_version'
+STATS_KEYS = {'hits': 'dashboard:stats:hits', 'misses': 'dashboard:stats:misses'}
+
+
+def _counter(key):
+    value = cache.get(key)
+    if value is None:
+        cache.add(key, 1, timeout=None)
+        value = cache.get(key, 1)
+    return value
+
+
+def _bump(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 1, timeout=None)
+
+
+def _key(role, student_pk, generation, rank_version):
+    key = f'dashboard:g{generation}:{role}:{student_pk}'
+    if role == 'student':
+        key += f':r{rank_version}'
+    return key
+
+
+def _lookup(role, student_pk):
+    """(key, cached context or None), counting the hit or miss."""
+    key = _key(role, student_pk, _counter(GENERATION_KEY), _counter(RANK_VERSION_KEY))
+    context = cache.get(key)
+    _bump(STATS_KEYS['hits' if context is not None else 'misses'])
+    return key, context
+
+
+def _store(key, context):
+    cache.set(key, context, timeout=getattr(settings, 'SMS_DASHBOARD_CACHE_TIMEOUT', 15 * 60))
+
+
+def cached_dashboard(role, student_pk, build):
+    """
+    Returns the dashboard context for `student_pk` from the cache, or calls
+    `build()` and stores its result (which must be picklable: evaluate
+    querysets into lists before returning them).
+    """
+    key, context = _lookup(role, student_pk)
+    if context is None:
+        context = build()
+        _store(key, context)
+    return context
+
+
+async def acached_dashboard(role, student_pk, build):
+    """cached_dashboard() for async views: `build` is a coroutine function."""
+    key, context = await sync_to_async(_lookup)(role, student_pk)
+    if context is None:
+        context = await build()
+        await sync_to_async(_store)(key, context)
+    return context
+
+
+def invalidate_dashboards(student_ids):
+    generation, rank_version = _counter(GENERATION_KEY), _counter(RANK_VERSION_KEY)
+    cache.delete_many([_key(role, pk, generation, rank_version) for pk in student_ids for role in ROLES])
+
+
+def invalidate_all_dashboards():
+    _bump(GENERATION_KEY)
+
+
+def invalidate_ranked_dashboards():
+    """A rank refresh can move many students, so every student dashboard is retired."""
+    _bump(RANK_VERSION_KEY)
+
+
+def dashboard_cache_stats():
+    stats = {name: cache.get(key, 0) for name, key in STATS_KEYS.items()}
+    requests = stats['hits'] + stats['misses']
+    stats['hit_rate'] = round(100 * stats['hits'] / requests, 1) if requests else 0
+    return stats
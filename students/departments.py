@@ -0,0 +1,136 @@
+# students/departments.py
+#
+# Per-department operations overview for staff: headcount, average marks and
+# pass rate (current exam term), attendance over the last ATTENDANCE_WINDOW
+# days and fees due / collected / outstanding. Four GROUP BY department
+# queries however many departments or students there are:
+#   1. Department with its student count
+#   2. TermRollup of the current term (students/terms.py), already per department
+#   3. Attendance in the window (or AttendanceMonth popcounts in bitmap mode)
+#   4. FeeRecord, through fees.fee_collection()
+# The result is cached per day and per data version of every table it reads
+# (students/versions.py), so any write to them retires it.
+
+import datetime
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Case, Count, F, Q, Sum, Value, When
+
+from .bitmaps import popcount, range_masks, use_bitmaps
+from .fees import fee_collection
+from .models import Attendance, AttendanceMonth, Department, TermRollup
+from .terms import current_term_id
+from .versions import data_versions
+
+ATTENDANCE_WINDOW = 30
+DEPARTMENT_TABLES = ('student', 'department', 'subjectmarks', 'examterm', 'attendance', 'feerecord')
+
+
+def _percent(part, whole):
+    return round(part / whole * 100, 2) if whole else 0
+
+
+def _attendance_by_department(date_from, date_to):
+    """{department_pk: (present_days, recorded_days)} within [date_from, date_to]."""
+    if use_bitmaps():
+        # Only the days of each month inside the window count: mask them in SQL.
+        masks = range_masks(date_from, date_to)
+        window = Case(*(When(month=month, then=Value(mask)) for month, mask in masks.items()), default=Value(0))
+        rows = (
+            AttendanceMonth.objects.filter(month__in=list(masks))
+            .values('student__department')
+            .annotate(
+                present=Sum(popcount(F('present_mask').bitand(window))),
+                total=Sum(popcount(F('recorded_mask').bitand(window))),
+            )
+            .order_by()
+        )
+    else:
+        rows = (
+            Attendance.objects.filter(date__range=(date_from, date_to))
+            .values('student__department')
+            .annotate(present=Count('pk', filter=Q(is_present=True)), total=Count('pk'))
+            .order_by()
+        )
+    return {row['student__department']: (row['present'] or 0, row['total'] or 0) for row in rows}
+
+
+def department_statistics(today=None):
+    """
+    {'departments': [row, ...], 'school': row} where each row has department
+    (name), pk (None for the school row), headcount, marks_recorded,
+    avg_marks, fail_count, pass_rate (%), present_days, recorded_days,
+    attendance_rate (%), fees_due, fees_collected, fees_outstanding and
+    collected_rate (%), plus the attendance window (date_from, date_to).
+    Cached; see the module header.
+    """
+    today = today or datetime.date.today()
+    versions = data_versions(*DEPARTMENT_TABLES)
+    cache_key = 'department_statistics:{}:{}'.format(
+        today.isoformat(), ':'.join(f'{name}{versions[name]}' for name in DEPARTMENT_TABLES),
+    )
+    statistics = cache.get(cache_key)
+    if statistics is None:
+        statistics = _compute_department_statistics(today)
+        cache.set(cache_key, statistics, getattr(settings, 'SMS_ANALYTICS_CACHE_TIMEOUT', 3600))
+    return statistics
+
+
+def _compute_department_statistics(today):
+    departments = Department.objects.annotate(headcount=Count('depart')).order_by('department', 'pk')
+    marks = {
+        row['department']: row
+        for row in TermRollup.objects.filter(term=current_term_id())
+        .values('department')
+        .annotate(count=Sum('count'), total=Sum('total'), fail_count=Sum('fail_count'))
+        .order_by()
+    }
+    date_from = today - datetime.timedelta(days=ATTENDANCE_WINDOW - 1)
+    attendance = _attendance_by_department(date_from, today)
+    fees = {row['department_id']: row for row in fee_collection('department_id')}
+
+    rows = []
+    for department in departments:
+        mark = marks.get(department.pk, {})
+        fee = fees.get(department.pk, {})
+        present, recorded = attendance.get(department.pk, (0, 0))
+        rows.append(_row(
+            department.department, department.pk, department.headcount,
+            mark.get('count') or 0, mark.get('total') or 0, mark.get('fail_count') or 0,
+            present, recorded,
+            fee.get('due', Decimal('0.00')), fee.get('paid', Decimal('0.00')), fee.get('outstanding', Decimal('0.00')),
+        ))
+
+    # School-wide totals re-added from the per-department sums, not averaged averages
+    school = _row(
+        'All departments', None, sum(row['headcount'] for row in rows),
+        sum(row['marks_recorded'] for row in rows), sum(row['marks_total'] for row in rows),
+        sum(row['fail_count'] for row in rows),
+        sum(row['present_days'] for row in rows), sum(row['recorded_days'] for row in rows),
+        sum((row['fees_due'] for row in rows), Decimal('0.00')),
+        sum((row['fees_collected'] for row in rows), Decimal('0.00')),
+        sum((row['fees_outstanding'] for row in rows), Decimal('0.00')),
+    )
+    return {'departments': rows, 'school': school, 'date_from': date_from, 'date_to': today}
+
+
+def _row(name, pk, headcount, mark_count, mark_total, fail_count, present, recorded, due, paid, outstanding):
+    return {
+        'department': name,
+        'pk': pk,
+        'headcount': headcount,
+        'marks_recorded': mark_count,
+        'marks_total': mark_total,
+        'fail_count': fail_count,
+        'avg_marks': round(mark_total / mark_count, 2) if mark_count else 0,
+        'pass_rate': _percent(mark_count - fail_count, mark_count),
+        'present_days': present,
+        'recorded_days': recorded,
+        'attendance_rate': _percent(present, recorded),
+        'fees_due': due,
+        'fees_collected': paid,
+        'fees_outstanding': outstanding,
+        'collected_rate': _percent(paid, due),
+    }
@@ -0,0 +1,117 @@
+# students/exports.py
+#
+# Constant-memory CSV exports. Each export is a generator over a single
+# joined values_list() query consumed with .iterator(), so rows are fetched in
+# chunks and never materialised as model instances; the CSV text is yielded in
+# ~64KB pieces for StreamingHttpResponse. The header is yielded on its own so
+# the first byte reaches the client before the query finishes.
+
+import csv
+import itertools
+
+from .models import Attendance, FeeRecord, Student, Subject, SubjectMarks
+from .terms import current_term_id
+
+CHUNK_SIZE = 2000          # rows fetched from the database per round trip
+FLUSH_BYTES = 64 * 1024    # CSV text buffered before yielding
+
+
+class _Echo:
+    """File-like object whose write() just returns the formatted line."""
+
+    def write(self, value):
+        return value
+
+
+def stream_csv(header, rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(header)
+
+    buffer, size = [], 0
+    for row in rows:
+        line = writer.writerow(row)
+        buffer.append(line)
+        size += len(line)
+        if size >= FLUSH_BYTES:
+            yield ''.join(buffer)
+            buffer, size = [], 0
+    if buffer:
+        yield ''.join(buffer)
+
+
+def _filter_dates(queryset, field, date_from=None, date_to=None):
+    if date_from:
+        queryset = queryset.filter(**{f'{field}__gte': date_from})
+    if date_to:
+        queryset = queryset.filter(**{f'{field}__lte': date_to})
+    return queryset
+
+
+def export_students(queryset=None, department=None, **_):
+    students = Student.objects.all() if queryset is None else queryset
+    if department:
+        students = students.filter(department=department)
+    rows = students.order_by('pk').values_list(
+        'student_name', 'student_id__student_id', 'department__department', 'student_email', 'student_age',
+    )
+    header = ['student_name', 'student_id', 'department', 'student_email', 'student_age']
+    return stream_csv(header, rows.iterator(chunk_size=CHUNK_SIZE))
+
+
+def export_marks(department=None, term=None, **_):
+    """Wide pivot for one term (the current one by default): one row per student, one column per subject, plus the total."""
+    subjects = list(Subject.objects.order_by('pk').values_list('pk', 'subject_name'))
+    columns = {subject_id: index for index, (subject_id, _name) in enumerate(subjects)}
+
+    marks = SubjectMarks.objects.filter(term=term or current_term_id())
+    if department:
+        marks = marks.filter(student__department=department)
+    marks = marks.order_by('student').values_list(
+        'student', 'student__student_id__student_id', 'student__student_name',
+        'student__department__department', 'subject', 'marks',
+    )
+
+    def rows():
+        for _student, group in itertools.groupby(marks.iterator(chunk_size=CHUNK_SIZE), key=lambda row: row[0]):
+            cells = [''] * len(subjects)
+            total = 0
+            for row in group:
+                cells[columns[row[4]]] = row[5]
+                total += row[5]
+            yield [row[1], row[2], row[3], *cells, total]
+
+    header = ['student_id', 'student_name', 'department', *[name for _pk, name in subjects], 'total']
+    return stream_csv(header, rows())
+
+
+def export_attendance(department=None, date_from=None, date_to=None, **_):
+    attendance = _filter_dates(Attendance.objects.all(), 'date', date_from, date_to)
+    if department:
+        attendance = attendance.filter(student__department=department)
+    rows = attendance.order_by('student', 'date').values_list(
+        'student__student_id__student_id', 'student__student_name', 'student__department__department',
+        'date', 'is_present',
+    )
+    header = ['student_id', 'student_name', 'department', 'date', 'is_present']
+    return stream_csv(header, rows.iterator(chunk_size=CHUNK_SIZE))
+
+
+def export_fees(department=None, date_from=None, date_to=None, **_):
+    fees = _filter_dates(FeeRecord.objects.all(), 'due_date', date_from, date_to)
+    if department:
+        fees = fees.filter(student__department=department)
+    rows = fees.order_by('student', 'due_date').values_list(
+        'student__student_id__student_id', 'student__student_name', 'student__department__department',
+        'due_date', 'amount_due', 'amount_paid', 'status', 'payment_date',
+    )
+    header = ['student_id', 'student_name', 'department', 'due_date', 'amount_due', 'amount_paid', 'status',
+              'payment_date']
+    return stream_csv(header, rows.iterator(chunk_size=CHUNK_SIZE))
+
+
+EXPORTS = {
+    'students': export_students,
+    'marks': export_marks,
+    'attendance': export_attendance,
+    'fees': export_fees,
+}
@@ -0,0 +1,102 @@
+# students/fees.py
+#
+# Fee lifecycle and collection reports.
+#   - mark_overdue_fees(): pending records past their due date become 'late'
+#     in one set-based UPDATE (index students_fee_status_due_idx); running it
+#     again the same day changes nothing.
+#   - fee_collection(): due / paid / outstanding totals and late ratio grouped
+#     by department (name or id), by month or by both, each in a single
+#     GROUP BY query.
+# "Outstanding" is everything not yet paid, pending or late, which is also
+# what StudentSummary.pending_fees holds, so moving a record from pending to
+# late leaves the summaries unchanged: mark_overdue_fees() only retires the
+# fee data version and the cached dashboards, without rebuilding summaries.
+
+import datetime
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, DecimalField, Q, Sum, Value
+from django.db.models.functions import Coalesce, TruncMonth
+
+from .dashboard_cache import invalidate_dashboards
+from .models import UNPAID_FEE_STATUSES, FeeRecord
+from .versions import bump_data_versions
+
+ROLLUPS = {
+    'department': ('student__department__department',),
+    'department_id': ('student__department',),
+    'month': ('month',),
+    'department_month': ('student__department__department', 'month'),
+}
+
+
+def mark_overdue_fees(today=None, dry_run=False):
+    """Moves pending fees due before `today` to 'late'. Returns the number of records changed."""
+    today = today or datetime.date.today()
+    overdue = FeeRecord.objects.filter(status='pending', due_date__lt=today)
+    if dry_run:
+        return overdue.count()
+
+    with transaction.atomic():
+        student_ids = list(overdue.order_by().values_list('student', flat=True).distinct())
+        changed = overdue.update(status='late')
+        if changed:
+            # Amounts are unchanged, but dashboards and fee reports list each record's status.
+            def refresh():
+                bump_data_versions(['feerecord'])
+                invalidate_dashboards(student_ids)
+            transaction.on_commit(refresh)
+    return changed
+
+
+def fee_collection(by='department', date_from=None, date_to=None, department=None):
+    """
+    Collection rollup rows: the grouping columns ('department' name or
+    'department_id', and/or 'month') plus records, due, paid, outstanding, late, late_ratio (%) and
+    collected_ratio (% of the amount due that has been paid).
+    """
+    money = DecimalField(max_digits=14, decimal_places=2)
+    zero = Value(Decimal('0.00'), output_field=money)
+
+    fees = FeeRecord.objects.all()
+    if date_from:
+        fees = fees.filter(due_date__gte=date_from)
+    if date_to:
+        fees = fees.filter(due_date__lte=date_to)
+    if department:
+        fees = fees.filter(student__department=department)
+
+    columns = ROLLUPS[by]
+    rows = (
+        fees.annotate(month=TruncMonth('due_date'))
+        .values(*columns)
+        .annotate(
+            records=Count('pk'),
+            due=Coalesce(Sum('amount_due'), zero, output_field=money),
+            paid=Coalesce(Sum('amount_paid'), zero, output_field=money),
+            outstanding=Coalesce(Sum('amount_due', filter=Q(status__in=UNPAID_FEE_STATUSES)), zero, output_field=money),
+            late=Count('pk', filter=Q(status='late')),
+        )
+        .order_by(*columns)
+    )
+
+    report = []
+    for row in rows:
+        if 'student__department__department' in row:
+            row['department'] = row.pop('student__department__department')
+        if 'student__department' in row:
+            row['department_id'] = row.pop('student__department')
+        row['late_ratio'] = round(row['late'] / row['records'] * 100, 2) if row['records'] else 0
+        row['collected_ratio'] = round(row['paid'] / row['due'] * 100, 2) if row['due'] else 0
+        report.append(row)
+    return report
+
+
+def fee_status_counts():
+    """{'pending': n, 'late': n, 'paid': n} in one query."""
+    return FeeRecord.objects.aggregate(
+        pending=Count('pk', filter=Q(status='pending')),
+        late=Count('pk', filter=Q(status='late')),
+        paid=Count('pk', filter=Q(status='paid')),
+    )
@@ -0,0 +1,281 @@
+# students/imports.py
+#
+# Bulk import of exam marks from CSV or XLSX. The file is read row by row
+# (csv.reader over the byte stream, openpyxl in read-only mode), StudentIDs and
+# subject names are resolved through two dicts built with one query each, and
+# valid rows are written in batches as upserts on the (student, subject, term)
+# unique key, into the current exam term unless another is given, so memory
+# grows only with the number of distinct (student, subject) pairs, not with the
+# file. Two layouts are accepted:
+#
+#   long:  student_id,subject,marks          one mark per row
+#   wide:  student_id,<subject>,<subject>...  the export_marks() layout; the
+#          student_name / department / total columns are ignored, as are
+#          empty cells
+#
+# Rows that fail validation are skipped and reported with their line number;
+# with strict=True any error rolls the whole import back. A file that cannot be
+# read at all (not UTF-8 text, not an .xlsx workbook) raises MarksImportError. Summaries, ranks and
+# cached pages are refreshed once, after the import commits.
+
+import csv
+import io
+import math
+import os
+import zipfile
+from dataclasses import dataclass, field
+
+from django.db import transaction
+
+from .models import Student, Subject, SubjectMarks
+from .signals import student_data_bulk_changed
+from .terms import current_term_id
+
+IMPORT_BATCH_SIZE = 2000
+MAX_REPORTED_ERRORS = 200
+MIN_MARK, MAX_MARK = 0, 100
+
+LONG_COLUMNS = ('student_id', 'subject', 'marks')
+IGNORED_COLUMNS = ('student_name', 'department', 'total')
+XLSX_EXTENSIONS = ('.xlsx', '.xlsm')
+
+
+class MarksImportError(Exception):
+    """The file as a whole cannot be imported (unreadable, unknown columns...)."""
+
+
+@dataclass
+class RowError:
+    line: int
+    message: str
+
+    def __str__(self):
+        return f"line {self.line}: {self.message}"
+
+
+@dataclass
+class ImportResult:
+    rows: int = 0
+    imported: int = 0
+    students: int = 0
+    error_count: int = 0
+    errors: list = field(default_factory=list)
+    dry_run: bool = False
+    rolled_back: bool = False
+
+    def add_error(self, line, message):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append(RowError(line, message))
+
+
+# ---------------------------------------------------------------------------
+# READING
+# ---------------------------------------------------------------------------
+
+def _csv_rows(fileobj):
+    text = io.TextIOWrapper(fileobj, encoding='utf-8-sig', newline='')
+    reader = csv.reader(text)
+    try:
+        yield from reader
+    except UnicodeDecodeError:
+        raise MarksImportError(
+            f"The file is not UTF-8 text (near line {reader.line_num + 1}); save it as CSV UTF-8 and try again."
+        )
+    finally:
+        # Leave the underlying file open for the caller (uploads, `with open(...)`).
+        text.detach()
+
+
+def _xlsx_rows(fileobj):
+    try:
+        from openpyxl import load_workbook
+        from openpyxl.utils.exceptions import InvalidFileException
+    except ImportError:
+        raise MarksImportError("Reading .xlsx files needs openpyxl (pip install openpyxl).")
+
+    try:
+        workbook = load_workbook(fileobj, read_only=True, data_only=True)
+    except (zipfile.BadZipFile, InvalidFileException, KeyError):
+        # KeyError: a zip archive without the workbook parts
+        raise MarksImportError("The file is not a valid .xlsx workbook.")
+    try:
+        for row in workbook.worksheets[0].iter_rows(values_only=True):
+            yield ['' if value is None else value for value in row]
+    finally:
+        workbook.close()
+
+
+def read_rows(fileobj, filename):
+    """Rows of a binary file object as lists of cells, header first."""
+    if os.path.splitext(filename)[1].lower() in XLSX_EXTENSIONS:
+        return _xlsx_rows(fileobj)
+    return _csv_rows(fileobj)
+
+
+def _clean(value):
+    return str(value).strip() if value is not None else ''
+
+
+def _subject_key(name):
+    return _clean(name).casefold()
+
+
+def _parse_mark(value):
+    """The mark as an int, or raises ValueError with a message for the row error."""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        number = value
+    else:
+        text = _clean(value)
+        if not text:
+            raise ValueError("marks missing")
+        try:
+            number = float(text)
+        except ValueError:
+            raise ValueError(f"marks {text!r} is not a number")
+    if not math.isfinite(number):
+        # int() would raise OverflowError (inf) or ValueError (nan) below
+        raise ValueError(f"marks {value!r} is not a finite number")
+    if number != int(number):
+        raise ValueError(f"marks {value!r} is not a whole number")
+    number = int(number)
+    if not MIN_MARK <= number <= MAX_MARK:
+        raise ValueError(f"marks {number} outside {MIN_MARK}-{MAX_MARK}")
+    return number
+
+
+# ---------------------------------------------------------------------------
+# LAYOUT
+# ---------------------------------------------------------------------------
+
+def _layout(header, subjects):
+    """
+    Turns the header into a row parser: row -> [(student_id, subject_pk, raw
+    mark, error)]. Raises MarksImportError for headers it cannot use.
+    """
+    columns = [_clean(name).lower() for name in header]
+    if 'student_id' not in columns:
+        raise MarksImportError("The header has no student_id column.")
+    student_col = columns.index('student_id')
+
+    if 'subject' in columns and 'marks' in columns:
+        subject_col, marks_col = columns.index('subject'), columns.index('marks')
+
+        def parse(row):
+            name = _clean(row[subject_col]) if subject_col < len(row) else ''
+            value = row[marks_col] if marks_col < len(row) else ''
+            subject_pk = subjects.get(name.casefold())
+            error = None if subject_pk else (f"unknown subject {name!r}" if name else "subject missing")
+            return [(row[student_col] if student_col < len(row) else '', subject_pk, value, error)]
+        return parse
+
+    subject_cols = []
+    unknown = []
+    for index, name in enumerate(header):
+        if index == student_col or columns[index] in IGNORED_COLUMNS or not columns[index]:
+            continue
+        subject_pk = subjects.get(_subject_key(name))
+        if subject_pk is None:
+            unknown.append(_clean(name))
+        subject_cols.append((index, subject_pk))
+    if unknown:
+        raise MarksImportError(f"Unknown subject column(s): {', '.join(unknown)}.")
+    if not subject_cols:
+        raise MarksImportError(
+            f"Expected the columns {', '.join(LONG_COLUMNS)}, or student_id followed by one column per subject."
+        )
+
+    def parse(row):
+        student_id = row[student_col] if student_col < len(row) else ''
+        return [
+            (student_id, subject_pk, row[index], None)
+            for index, subject_pk in subject_cols
+            if index < len(row) and _clean(row[index]) != ''
+        ]
+    return parse
+
+
+# ---------------------------------------------------------------------------
+# IMPORT
+# ---------------------------------------------------------------------------
+
+def _write_batch(batch, term_id, batch_size):
+    SubjectMarks.objects.bulk_create(
+        [SubjectMarks(student_id=student, subject_id=subject, term_id=term_id, marks=mark)
+         for (student, subject), mark in batch.items()],
+        batch_size=batch_size,
+        update_conflicts=True,
+        unique_fields=['student', 'term', 'subject'],
+        update_fields=['marks'],
+    )
+
+
+def import_marks(fileobj, filename='marks.csv', dry_run=False, strict=False, batch_size=IMPORT_BATCH_SIZE,
+                 term=None):
+    """
+    Imports marks from a binary file object (see the module header for the
+    layouts) into an ExamTerm (pk; the current term by default) and returns an
+    ImportResult. `dry_run` validates without writing; `strict` writes nothing
+    unless every row is valid.
+    """
+    term_id = term or current_term_id()
+    result = ImportResult(dry_run=dry_run)
+    rows = read_rows(fileobj, filename)
+    header = next(rows, None)
+    if not header:
+        raise MarksImportError("The file is empty.")
+
+    students = dict(Student.objects.values_list('student_id__student_id', 'pk').iterator())
+    subjects = {_subject_key(name): pk for pk, name in Subject.objects.values_list('pk', 'subject_name')}
+    parse = _layout(header, subjects)
+
+    touched = set()
+    seen = set()
+    batch = {}
+    with transaction.atomic():
+        for line, row in enumerate(rows, start=2):
+            if not any(_clean(value) for value in row):
+                continue
+            result.rows += 1
+            for raw_student, subject_pk, value, error in parse(row):
+                student_id = _clean(raw_student)
+                student_pk = students.get(student_id)
+                if error is None and student_pk is None:
+                    error = f"unknown student {student_id!r}" if student_id else "student_id missing"
+                if error is None:
+                    try:
+                        mark = _parse_mark(value)
+                    except ValueError as exc:
+                        error = str(exc)
+                if error is not None:
+                    result.add_error(line, error)
+                    continue
+                # A repeated (student, subject) pair within a batch: the later row wins, as it would across batches.
+                # Either way it is one mark, so it is only counted once.
+                batch[student_pk, subject_pk] = mark
+                touched.add(student_pk)
+                if (student_pk, subject_pk) not in seen:
+                    seen.add((student_pk, subject_pk))
+                    result.imported += 1
+
+            if len(batch) >= batch_size:
+                if not dry_run:
+                    _write_batch(batch, term_id, batch_size)
+                batch = {}
+
+        if batch and not dry_run:
+            _write_batch(batch, term_id, batch_size)
+
+        result.students = len(touched)
+        if dry_run:
+            return result
+        if strict and result.error_count:
+            transaction.set_rollback(True)
+            result.rolled_back = True
+            return result
+        if touched:
+            student_ids = list(touched)
+            transaction.on_commit(lambda: student_data_bulk_changed.send(
+                sender=SubjectMarks, student_ids=student_ids, terms=[term_id],
+            ))
+    return result
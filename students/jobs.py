@@ -0,0 +1,274 @@
+# students/jobs.py
+#
+# Database-backed background jobs. The staff UI (views.jobs) enqueues a Job
+# row; `manage.py runworker` claims queued rows and runs them in a thread or
+# process pool, so exports, report cards, fee sweeps and summary rebuilds no
+# longer tie up a web worker.
+#
+#   - Claiming is a conditional UPDATE (status 'queued' -> 'running'), which
+#     only one worker can win, so several workers may poll the same table.
+#   - The worker touches updated_at of the jobs it is running on every poll;
+#     a 'running' job whose heartbeat is older than SMS_JOB_STALE_AFTER
+#     seconds belonged to a worker that died and is queued again.
+#   - A job that raises is retried after SMS_JOB_RETRY_DELAY seconds, doubled
+#     on each attempt, until max_attempts; every job kind is idempotent.
+#   - Results are written to default storage (MEDIA_ROOT/jobs/...) through a
+#     temporary file, so large exports never sit in memory.
+#
+# A job kind is a function registered with @job_kind that takes the Job and
+# its params as keyword arguments and returns a one-line summary.
+
+import datetime
+import logging
+import multiprocessing
+import os
+import socket
+import tempfile
+import time
+import traceback
+from collections import namedtuple
+from contextlib import contextmanager
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+import django
+from django.conf import settings
+from django.core.files import File
+from django.db import close_old_connections
+from django.db.models import F
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from django.utils.text import get_valid_filename
+
+from .dashboard_cache import invalidate_all_dashboards
+from .exports import EXPORTS
+from .fees import mark_overdue_fees
+from .models import Department, Job, Student
+from .ranking import rebuild_ranks
+from .report_cards import write_report_cards
+from .summary import rebuild_student_summaries
+from .terms import rebuild_term_rollups
+from .versions import TRACKED, bump_data_versions
+
+logger = logging.getLogger('students.jobs')
+
+JobKind = namedtuple('JobKind', 'name label func')
+JOB_KINDS = {}
+
+
+def job_kind(name, label):
+    def decorator(func):
+        JOB_KINDS[name] = JobKind(name, label, func)
+        return func
+    return decorator
+
+
+def retry_delay():
+    return getattr(settings, 'SMS_JOB_RETRY_DELAY', 30)
+
+
+def stale_after():
+    return getattr(settings, 'SMS_JOB_STALE_AFTER', 300)
+
+
+# ---------------------------------------------------------------------------
+# QUEUE
+# ---------------------------------------------------------------------------
+
+def enqueue(kind, params=None, user=None, max_attempts=3):
+    if kind not in JOB_KINDS:
+        raise ValueError(f"Unknown job kind {kind!r}.")
+    return Job.objects.create(kind=kind, params=params or {}, created_by=user, max_attempts=max_attempts)
+
+
+def report_progress(job, done, total=None, message=None):
+    """Records progress (and a heartbeat) for a running job; call it every so often, not per row."""
+    fields = {'progress_done': done, 'updated_at': timezone.now()}
+    if total is not None:
+        fields['progress_total'] = total
+    if message is not None:
+        fields['message'] = message[:255]
+    Job.objects.filter(pk=job.pk).update(**fields)
+    for name, value in fields.items():
+        setattr(job, name, value)
+
+
+@contextmanager
+def result_file(job, filename):
+    """A binary file to write the job's result to; saved as job.result when the block exits."""
+    with tempfile.TemporaryFile() as spool:
+        yield spool
+        spool.seek(0)
+        job.result.save(filename, File(spool), save=False)
+    Job.objects.filter(pk=job.pk).update(result=job.result.name)
+
+
+def store_result(job, filename, chunks):
+    """Saves an iterable of str/bytes chunks as the job's result file."""
+    with result_file(job, filename) as spool:
+        for chunk in chunks:
+            spool.write(chunk.encode() if isinstance(chunk, str) else chunk)
+
+
+def claim_jobs(worker, limit):
+    """Marks up to `limit` due jobs as running for `worker` and returns their pks."""
+    if limit <= 0:
+        return []
+    now = timezone.now()
+    candidates = Job.objects.filter(status='queued', run_after__lte=now).order_by('run_after', 'pk')
+    claimed = []
+    for pk in candidates.values_list('pk', flat=True)[:limit]:
+        won = Job.objects.filter(pk=pk, status='queued').update(
+            status='running', worker=worker, attempts=F('attempts') + 1, started_at=now, updated_at=now,
+        )
+        if won:
+            claimed.append(pk)
+    return claimed
+
+
+def requeue_stale_jobs():
+    cutoff = timezone.now() - datetime.timedelta(seconds=stale_after())
+    stale = Job.objects.filter(status='running', updated_at__lt=cutoff)
+    # A job that keeps killing its worker stops being retried
+    stale.filter(attempts__gte=F('max_attempts')).update(
+        status='failed', error="The worker running this job stopped responding.", finished_at=timezone.now(),
+    )
+    return stale.update(status='queued', worker='', message="Requeued after the worker stopped responding.")
+
+
+def run_job(pk):
+    """Runs one claimed job to completion, recording the outcome. Returns the final status."""
+    job = Job.objects.get(pk=pk)
+    try:
+        kind = JOB_KINDS.get(job.kind)
+        if kind is None:
+            job.max_attempts = job.attempts  # retrying cannot help
+            raise LookupError(f"Unknown job kind {job.kind!r}.")
+        message = kind.func(job, **job.params)
+    except Exception:
+        logger.exception("Job %s (%s) failed on attempt %s.", job.pk, job.kind, job.attempts)
+        now = timezone.now()
+        update = {'error': traceback.format_exc(), 'updated_at': now}
+        if job.attempts < job.max_attempts:
+            run_after = now + datetime.timedelta(seconds=retry_delay() * 2 ** (job.attempts - 1))
+            update.update(status='queued', worker='', run_after=run_after,
+                          message=f"Attempt {job.attempts} failed; retrying at {run_after:%H:%M:%S}.")
+        else:
+            update.update(status='failed', finished_at=now, message=f"Failed after {job.attempts} attempts.")
+    else:
+        now = timezone.now()
+        update = {'status': 'succeeded', 'finished_at': now, 'updated_at': now, 'error': '',
+                  'message': (message or job.message)[:255]}
+    Job.objects.filter(pk=pk).update(**update)
+    # Pool threads live on between jobs; release their connection like a finished request
+    close_old_connections()
+    return update['status']
+
+
+# ---------------------------------------------------------------------------
+# WORKER
+# ---------------------------------------------------------------------------
+
+def run_worker(concurrency=2, processes=False, poll_interval=1.0, burst=False, log=print):
+    """
+    Polls for due jobs and runs up to `concurrency` at a time, in threads or
+    (processes=True) in separate processes for CPU-bound work. With `burst`
+    it returns once the queue is empty; otherwise it runs until interrupted,
+    then waits for the jobs in progress. Returns the number of jobs run.
+    """
+    worker = f'{socket.gethostname()}:{os.getpid()}'
+    if processes:
+        # Spawned, not forked, so no process inherits an open database
+        # connection; each one sets Django up before importing this module.
+        executor = ProcessPoolExecutor(
+            concurrency, mp_context=multiprocessing.get_context('spawn'), initializer=django.setup,
+        )
+    else:
+        executor = ThreadPoolExecutor(concurrency, thread_name_prefix='sms-job')
+
+    running = {}
+    finished = 0
+    try:
+        while True:
+            requeue_stale_jobs()
+            if running:
+                Job.objects.filter(pk__in=running.values(), status='running').update(updated_at=timezone.now())
+            for pk in claim_jobs(worker, concurrency - len(running)):
+                log(f"▶️  Job #{pk} started")
+                running[executor.submit(run_job, pk)] = pk
+
+            if running:
+                done, _pending = wait(running, timeout=poll_interval, return_when=FIRST_COMPLETED)
+                for future in done:
+                    pk = running.pop(future)
+                    finished += 1
+                    try:
+                        status = future.result()
+                    except Exception as exc:
+                        # The pool itself broke (e.g. a killed process); the stale check requeues the job.
+                        log(f"❌ Job #{pk} crashed the worker pool: {exc!r}")
+                    else:
+                        log(f"{'✅' if status == 'succeeded' else '⚠️ '} Job #{pk} {status}")
+            elif burst:
+                return finished
+            else:
+                time.sleep(poll_interval)
+    finally:
+        executor.shutdown(wait=True)
+
+
+# ---------------------------------------------------------------------------
+# JOB KINDS
+# ---------------------------------------------------------------------------
+
+def _with_progress(job, chunks, every=32):
+    written = 0
+    for index, chunk in enumerate(chunks, start=1):
+        written += len(chunk)
+        yield chunk
+        if index % every == 0:
+            report_progress(job, written // 1024, message=f"{written // 1024} KB written")
+
+
+@job_kind('export', "CSV export")
+def export_job(job, export, department=None, date_from=None, date_to=None):
+    if export not in EXPORTS:
+        raise ValueError(f"Unknown export {export!r}.")
+    rows = EXPORTS[export](
+        department=department,
+        date_from=parse_date(date_from) if date_from else None,
+        date_to=parse_date(date_to) if date_to else None,
+    )
+    store_result(job, f'{export}_export.csv', _with_progress(job, rows))
+    return f"{export.capitalize()} export ready ({job.result.size // 1024} KB)."
+
+
+@job_kind('mark_overdue_fees', "Mark overdue fees as late")
+def mark_overdue_fees_job(job, today=None):
+    changed = mark_overdue_fees(parse_date(today) if today else None)
+    return f"{changed} overdue fee records marked late."
+
+
+@job_kind('rebuild_summaries', "Rebuild student summaries, ranks and term rollups")
+def rebuild_summaries_job(job, batch_size=1000):
+    student_pks = list(Student.objects.order_by('pk').values_list('pk', flat=True))
+    for start in range(0, len(student_pks), batch_size):
+        rebuild_student_summaries(student_pks[start:start + batch_size], batch_size=batch_size)
+        done = min(start + batch_size, len(student_pks))
+        report_progress(job, done, len(student_pks), f"{done} of {len(student_pks)} summaries rebuilt")
+    rebuild_ranks()
+    rebuild_term_rollups()
+    bump_data_versions(TRACKED)
+    invalidate_all_dashboards()
+    return f"Rebuilt {len(student_pks)} student summaries, ranks and term rollups."
+
+
+@job_kind('report_cards', "Report cards (ZIP)")
+def report_cards_job(job, department=None, workers=None):
+    department = Department.objects.get(pk=department) if department else None
+    name = f'report_cards_{department.department if department else "school"}.zip'
+    with result_file(job, get_valid_filename(name)) as archive:
+        written = write_report_cards(
+            archive, department, workers=workers,
+            progress=lambda done, total: report_progress(job, done, total, f"{done} of {total} report cards"),
+        )
+    return f"{written} report cards ready."
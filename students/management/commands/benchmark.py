@@ -0,0 +1,91 @@
+import json
+import os
+import platform
+import time
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from students.benchmarks import SCENARIOS, TIERS, compare, prepare_tier_database, run_scenarios
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmarks every view against a seeded database of a fixed size tier and writes the "
+        "wall time, query count and peak memory per view as JSON. With --baseline, fails when "
+        "any view regresses."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tier', choices=sorted(TIERS), default='1k')
+        parser.add_argument('--scenario', action='append', dest='scenarios',
+                            choices=[scenario.name for scenario in SCENARIOS],
+                            help="Only run the given scenario (repeatable).")
+        parser.add_argument('--repeat', type=int, default=3)
+        parser.add_argument('--attendance-days', type=int,
+                            help="Override the tier's attendance history length (days).")
+        parser.add_argument('--workdir', default=os.path.join(settings.BASE_DIR, 'benchmarks'),
+                            help="Where tier databases and results are stored.")
+        parser.add_argument('--fresh', action='store_true', help="Rebuild the tier database from scratch.")
+        parser.add_argument('--output', help="Result JSON path (default: <workdir>/results-<tier>.json).")
+        parser.add_argument('--baseline', help="Baseline JSON to compare against; regressions fail the run.")
+        parser.add_argument('--save-baseline', action='store_true',
+                            help="Also write the results as <workdir>/baseline-<tier>.json.")
+        parser.add_argument('--time-tolerance', type=float, default=0.25)
+        parser.add_argument('--memory-tolerance', type=float, default=0.25)
+
+    def handle(self, *args, **options):
+        tier = dict(TIERS[options['tier']])
+        if options['attendance_days'] is not None:
+            tier['attendance_days'] = options['attendance_days']
+        os.makedirs(options['workdir'], exist_ok=True)
+
+        counts = prepare_tier_database(
+            options['tier'], tier, options['workdir'], fresh=options['fresh'], log=self.stdout.write,
+        )
+
+        self.stdout.write(f"Running {len(options['scenarios'] or SCENARIOS)} scenarios on tier {options['tier']}...")
+        results = run_scenarios(options['scenarios'], repeat=options['repeat'])
+
+        report = {
+            'tier': options['tier'],
+            'dataset': {**tier, **counts},
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'sqlite': connection.Database.sqlite_version if connection.vendor == 'sqlite' else None,
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'results': results,
+        }
+
+        self.stdout.write(f"{'scenario':28s} {'status':>6s} {'cold ms':>10s} {'wall ms':>10s} {'queries':>8s} {'warm q':>7s} {'peak KB':>10s}")
+        for name, row in results.items():
+            self.stdout.write(
+                f"{name:28s} {row['status']:>6} {row['cold_ms']:>10} {row['wall_ms']:>10} "
+                f"{row['queries']:>8} {row['warm_queries']:>7} {row['peak_kb']:>10}"
+            )
+
+        output = options['output'] or os.path.join(options['workdir'], f"results-{options['tier']}.json")
+        self._write(output, report)
+        if options['save_baseline']:
+            self._write(os.path.join(options['workdir'], f"baseline-{options['tier']}.json"), report)
+
+        if options['baseline']:
+            with open(options['baseline']) as handle:
+                baseline = json.load(handle)
+            if baseline.get('tier') != options['tier']:
+                raise CommandError(f"Baseline is for tier {baseline.get('tier')}, not {options['tier']}.")
+            regressions = compare(
+                results, baseline['results'],
+                time_tolerance=options['time_tolerance'],
+                memory_tolerance=options['memory_tolerance'],
+            )
+            if regressions:
+                raise CommandError("Benchmark regressions:\n  " + "\n  ".join(regressions))
+            self.stdout.write(self.style.SUCCESS("✅ No regressions against the baseline."))
+
+    def _write(self, path, report):
+        with open(path, 'w') as handle:
+            json.dump(report, handle, indent=2)
+        self.stdout.write(f"Results written to {path}")
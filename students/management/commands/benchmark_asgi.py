@@ -0,0 +1,64 @@
+import json
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from students.benchmarks import THROUGHPUT_PAIRS, TIERS, prepare_tier_database, run_throughput
+
+
+class Command(BaseCommand):
+    help = (
+        "Load-tests the dashboards with concurrent requests: the sync views through the WSGI "
+        "handler (a thread pool) against their async versions through the ASGI handler (one "
+        "event loop), on a seeded tier database. Reports requests/second and latency percentiles."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tier', choices=sorted(TIERS), default='1k')
+        parser.add_argument('--scenario', action='append', dest='scenarios',
+                            choices=[pair[0] for pair in THROUGHPUT_PAIRS],
+                            help="Only run the given dashboard (repeatable).")
+        parser.add_argument('--concurrency', type=int, default=8, help="Requests in flight at once.")
+        parser.add_argument('--requests', type=int, default=80, help="Requests per dashboard and side.")
+        parser.add_argument('--query-delay-ms', type=float, default=0,
+                            help="Extra latency added to every query, to model a networked database.")
+        parser.add_argument('--workdir', default=os.path.join(settings.BASE_DIR, 'benchmarks'),
+                            help="Where tier databases and results are stored.")
+        parser.add_argument('--fresh', action='store_true', help="Rebuild the tier database from scratch.")
+        parser.add_argument('--output', help="Result JSON path (default: <workdir>/throughput-<tier>.json).")
+
+    def handle(self, *args, **options):
+        os.makedirs(options['workdir'], exist_ok=True)
+        prepare_tier_database(
+            options['tier'], TIERS[options['tier']], options['workdir'],
+            fresh=options['fresh'], log=self.stdout.write,
+        )
+
+        self.stdout.write(
+            f"{options['requests']} requests per side, {options['concurrency']} concurrent, "
+            f"+{options['query_delay_ms']}ms per query..."
+        )
+        results = run_throughput(
+            options['scenarios'],
+            concurrency=options['concurrency'],
+            requests=options['requests'],
+            query_delay_ms=options['query_delay_ms'],
+        )
+
+        self.stdout.write(f"{'dashboard':20s} {'side':>5s} {'rps':>8s} {'p50 ms':>9s} {'p95 ms':>9s} {'errors':>7s}")
+        for name, row in results.items():
+            for side in ('wsgi', 'asgi'):
+                stats = row[side]
+                self.stdout.write(
+                    f"{name:20s} {side:>5s} {stats['rps']:>8} {stats['p50_ms']:>9} {stats['p95_ms']:>9} "
+                    f"{stats['errors']:>7}"
+                )
+            self.stdout.write(f"{'':20s} async/sync throughput: {row['speedup']}x")
+
+        output = options['output'] or os.path.join(options['workdir'], f"throughput-{options['tier']}.json")
+        with open(output, 'w') as handle:
+            json.dump({'tier': options['tier'], 'options': {
+                key: options[key] for key in ('concurrency', 'requests', 'query_delay_ms')
+            }, 'results': results}, handle, indent=2)
+        self.stdout.write(self.style.SUCCESS(f"✅ Results written to {output}"))
@@ -0,0 +1,53 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from students.imports import IMPORT_BATCH_SIZE, MarksImportError, import_marks
+from students.models import ExamTerm
+
+
+class Command(BaseCommand):
+    help = ("Imports exam marks from a CSV or XLSX file (student_id,subject,marks rows, or the export_marks "
+            "layout with one column per subject), upserting on (student, subject, term).")
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="The .csv or .xlsx file to import.")
+        parser.add_argument('--dry-run', action='store_true', help="Validate the file without writing anything.")
+        parser.add_argument('--strict', action='store_true', help="Import nothing if any row is invalid.")
+        parser.add_argument('--batch-size', type=int, default=IMPORT_BATCH_SIZE,
+                            help=f"Marks per INSERT ... ON CONFLICT statement (default {IMPORT_BATCH_SIZE}).")
+        parser.add_argument('--term', help="Name of the exam term to import into (default: the current term).")
+
+    def handle(self, *args, **options):
+        term = None
+        if options['term']:
+            term = ExamTerm.objects.filter(name=options['term']).values_list('pk', flat=True).first()
+            if term is None:
+                raise CommandError(f"No exam term named {options['term']!r}.")
+
+        started = time.perf_counter()
+        try:
+            with open(options['path'], 'rb') as fileobj:
+                result = import_marks(
+                    fileobj, options['path'],
+                    dry_run=options['dry_run'], strict=options['strict'], batch_size=options['batch_size'],
+                    term=term,
+                )
+        except OSError as exc:
+            raise CommandError(f"Cannot read {options['path']}: {exc}")
+        except MarksImportError as exc:
+            raise CommandError(str(exc))
+        elapsed = time.perf_counter() - started
+
+        for error in result.errors:
+            self.stderr.write(f"  {error}")
+        if result.error_count > len(result.errors):
+            self.stderr.write(f"  ... and {result.error_count - len(result.errors)} more")
+
+        if result.rolled_back:
+            raise CommandError(f"{result.error_count} invalid rows; nothing was imported (--strict).")
+        verb = "would be imported" if result.dry_run else "imported"
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {result.imported} marks for {result.students} students {verb} from {result.rows} rows "
+            f"({result.error_count} errors) in {elapsed:.1f}s."
+        ))
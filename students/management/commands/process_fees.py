@@ -0,0 +1,41 @@
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from students.fees import ROLLUPS, fee_collection, mark_overdue_fees
+
+
+class Command(BaseCommand):
+    help = "Moves overdue pending fees to 'late' (safe to run repeatedly) and prints collection rollups."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', help="Treat this date (YYYY-MM-DD) as today. Defaults to today.")
+        parser.add_argument('--dry-run', action='store_true', help="Only count the records that would change.")
+        parser.add_argument('--report', choices=sorted(ROLLUPS), action='append',
+                            help="Print a collection rollup by department, month or department_month (repeatable).")
+
+    def handle(self, *args, **options):
+        try:
+            # None for text that is not YYYY-MM-DD, ValueError for impossible dates like 2025-02-30
+            today = parse_date(options['date']) if options['date'] else datetime.date.today()
+        except ValueError:
+            today = None
+        if today is None:
+            raise CommandError(f"Invalid --date {options['date']!r}, expected a YYYY-MM-DD date.")
+
+        changed = mark_overdue_fees(today, dry_run=options['dry_run'])
+        verb = "would be marked" if options['dry_run'] else "marked"
+        self.stdout.write(self.style.SUCCESS(f"✅ {changed} overdue fee records {verb} late (due before {today})."))
+
+        for by in options['report'] or []:
+            self.stdout.write(f"\nFee collection by {by.replace('_', ' + ')}:")
+            for row in fee_collection(by):
+                label = ' / '.join(
+                    str(row[key].strftime('%Y-%m') if key == 'month' else row[key])
+                    for key in ('department', 'month') if key in row
+                )
+                self.stdout.write(
+                    f"  {label:<28} due {row['due']:>12} paid {row['paid']:>12} "
+                    f"outstanding {row['outstanding']:>12} late {row['late_ratio']:>6}%"
+                )
@@ -0,0 +1,76 @@
+import json
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from students.benchmarks import SCENARIOS, TIERS, prepare_tier_database
+from students.queryplan import audit, recommended_indexes, regressions, to_report, write_index_migration
+
+
+class Command(BaseCommand):
+    help = (
+        "Replays every view against a seeded tier database, runs EXPLAIN QUERY PLAN on its queries and "
+        "flags full table scans and temporary B-trees, with composite index suggestions."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tier', choices=sorted(TIERS), default='1k')
+        parser.add_argument('--scenario', action='append', dest='scenarios',
+                            choices=[scenario.name for scenario in SCENARIOS],
+                            help="Only audit the given scenario (repeatable).")
+        parser.add_argument('--workdir', default=os.path.join(settings.BASE_DIR, 'benchmarks'),
+                            help="Where tier databases and reports are stored (shared with `benchmark`).")
+        parser.add_argument('--min-rows', type=int, default=1000,
+                            help="Ignore scans of tables smaller than this.")
+        parser.add_argument('--baseline', help="Report JSON of accepted issues; only new ones are failures.")
+        parser.add_argument('--save-baseline', action='store_true',
+                            help="Write the current issues as <workdir>/queryplan-<tier>.json.")
+        parser.add_argument('--fail-on-scan', action='store_true',
+                            help="Exit with an error when an issue is not in the baseline.")
+        parser.add_argument('--write-migration', action='store_true',
+                            help="Generate a students migration adding the suggested indexes.")
+
+    def handle(self, *args, **options):
+        os.makedirs(options['workdir'], exist_ok=True)
+        prepare_tier_database(options['tier'], TIERS[options['tier']], options['workdir'], log=self.stdout.write)
+
+        issues = audit(options['scenarios'], min_rows=options['min_rows'])
+        baseline = None
+        if options['baseline']:
+            with open(options['baseline']) as handle:
+                baseline = json.load(handle)
+        new = {issue.key for issue in regressions(issues, baseline)}
+
+        for issue in issues:
+            marker = self.style.ERROR('NEW ') if baseline is not None and issue.key in new else ''
+            self.stdout.write(f"{marker}{issue.scenario:28s} {issue.kind:10s} {issue.detail}")
+            self.stdout.write(f"    {issue.query[:160]}")
+            if issue.suggestion:
+                self.stdout.write(f"    suggested index on {issue.table}: {issue.suggestion}")
+        if not issues:
+            self.stdout.write(self.style.SUCCESS("✅ No table scans or temp B-trees on large tables."))
+
+        recommended = recommended_indexes(issues)
+        for (_app, model), field_lists in recommended.items():
+            for fields in field_lists:
+                self.stdout.write(f"Recommend {model}: models.Index(fields={fields!r})")
+
+        if options['save_baseline']:
+            path = os.path.join(options['workdir'], f"queryplan-{options['tier']}.json")
+            with open(path, 'w') as handle:
+                json.dump(to_report(issues), handle, indent=2)
+            self.stdout.write(f"Baseline written to {path}")
+
+        if options['write_migration']:
+            path, added = write_index_migration(recommended)
+            if path:
+                self.stdout.write(self.style.SUCCESS(f"✅ Wrote {path}"))
+                self.stdout.write("Add the same entries to each model's Meta.indexes:")
+                for model, index in added:
+                    self.stdout.write(f"    {model.__name__}: {index.deconstruct()[2]}")
+            else:
+                self.stdout.write("No index suggestions to write.")
+
+        if options['fail_on_scan'] and new:
+            raise CommandError(f"{len(new)} query plan regression(s): table scans or temp B-trees not in the baseline.")
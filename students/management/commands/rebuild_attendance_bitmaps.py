@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from students.bitmaps import rebuild_attendance_bitmaps
+from students.summary import rebuild_student_summaries
+
+
+class Command(BaseCommand):
+    help = "Recomputes the AttendanceMonth bitmaps from the daily Attendance rows."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--student', type=int, action='append', dest='student_ids',
+                            help="Only rebuild the given Student primary key (repeatable).")
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        written = rebuild_attendance_bitmaps(options['student_ids'], batch_size=options['batch_size'])
+        rebuild_student_summaries(options['student_ids'])
+        self.stdout.write(self.style.SUCCESS(f"✅ Rebuilt {written} attendance months."))
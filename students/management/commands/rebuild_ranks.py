@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from students.ranking import rebuild_ranks
+
+
+class Command(BaseCommand):
+    help = "Recomputes the persisted StudentRank table (overall and per-department ranks) from SubjectMarks."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        written = rebuild_ranks(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"✅ Ranked {written} students."))
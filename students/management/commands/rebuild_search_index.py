@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from students.search import rebuild_search_index
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the full-text student search index (SQLite FTS5)."
+
+    def handle(self, *args, **options):
+        if not rebuild_search_index():
+            raise CommandError("No FTS5 search index on this database; student search uses LIKE filters.")
+        self.stdout.write(self.style.SUCCESS("✅ Student search index rebuilt."))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from students.summary import rebuild_student_summaries
+
+
+class Command(BaseCommand):
+    help = "Recomputes the denormalized StudentSummary table from marks, attendance and fee records."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--student', type=int, action='append', dest='student_ids',
+                            help="Only rebuild the given Student primary key (repeatable).")
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        written = rebuild_student_summaries(options['student_ids'], batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"✅ Rebuilt {written} student summaries."))
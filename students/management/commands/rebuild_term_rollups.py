@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from students.models import ExamTerm
+from students.terms import rebuild_term_rollups
+
+
+class Command(BaseCommand):
+    help = "Recomputes the TermRollup table (marks statistics per term, department and subject) from SubjectMarks."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--term', action='append', help="Only this exam term (by name); may be repeated.")
+
+    def handle(self, *args, **options):
+        terms = None
+        if options['term']:
+            terms = list(ExamTerm.objects.filter(name__in=options['term']))
+            missing = set(options['term']) - {term.name for term in terms}
+            if missing:
+                raise CommandError(f"No exam term named {', '.join(sorted(missing))}.")
+        written = rebuild_term_rollups(terms)
+        self.stdout.write(self.style.SUCCESS(f"✅ Rebuilt {written} term rollup cells."))
@@ -0,0 +1,48 @@
+import os
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from students.versions import forget_data_versions
+
+
+class Command(BaseCommand):
+    help = (
+        "Snapshots the primary SQLite database into the read-replica file (settings.SMS_READ_REPLICA) "
+        "with SQLite's online backup API, then swaps it in atomically."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--replica', default=getattr(settings, 'SMS_READ_REPLICA', None) or 'replica',
+                            help="Database alias of the replica (default: settings.SMS_READ_REPLICA).")
+        parser.add_argument('--pages', type=int, default=1024,
+                            help="Pages copied per backup step, so writers are not blocked for the whole copy.")
+
+    def handle(self, *args, **options):
+        primary, alias = connections[DEFAULT_DB_ALIAS], options['replica']
+        if alias not in connections.databases:
+            raise CommandError(f"No database alias {alias!r} in settings.DATABASES.")
+        replica = connections[alias]
+        if primary.vendor != 'sqlite' or replica.vendor != 'sqlite':
+            raise CommandError("refresh_replica copies SQLite files; a server replica is kept current by the server.")
+
+        target = str(replica.settings_dict['NAME'])
+        partial = f"{target}.tmp"
+        started = time.perf_counter()
+
+        primary.ensure_connection()
+        destination = sqlite3.connect(partial)
+        try:
+            primary.connection.backup(destination, pages=options['pages'])
+        finally:
+            destination.close()
+
+        replica.close()
+        os.replace(partial, target)
+        forget_data_versions(alias)
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Replica {target} refreshed in {time.perf_counter() - started:.1f}s."
+        ))
@@ -0,0 +1,40 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from students.models import Department
+from students.report_cards import REPORT_CHUNK_SIZE, write_report_cards
+
+
+class Command(BaseCommand):
+    help = ("Writes a ZIP of HTML report cards (marks, rank, attendance, fee status), one per student, "
+            "for one department or the whole school.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--department', help="Department name or primary key (default: every student).")
+        parser.add_argument('--output', help="ZIP file to write (default report_cards_<department|school>.zip).")
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help="Rendering processes; 1 renders in this process (default: CPU count).")
+        parser.add_argument('--chunk-size', type=int, default=REPORT_CHUNK_SIZE,
+                            help=f"Students loaded and rendered per batch (default {REPORT_CHUNK_SIZE}).")
+
+    def handle(self, *args, **options):
+        department = None
+        if options['department']:
+            lookup = {'pk': options['department']} if options['department'].isdigit() else {'department': options['department']}
+            department = Department.objects.filter(**lookup).first()
+            if department is None:
+                raise CommandError(f"No department {options['department']!r}.")
+        output = options['output'] or f"report_cards_{department.department if department else 'school'}.zip"
+
+        started = time.perf_counter()
+        with open(output, 'wb') as archive:
+            written = write_report_cards(
+                archive, department, workers=options['workers'], chunk_size=options['chunk_size'],
+                progress=lambda done, total: self.stdout.write(f"  {done}/{total}", ending='\r'),
+            )
+        self.stdout.write('')
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {written} report cards written to {output} in {time.perf_counter() - started:.1f}s."
+        ))
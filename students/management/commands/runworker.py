@@ -0,0 +1,30 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from students.jobs import run_worker
+
+
+class Command(BaseCommand):
+    help = ("Runs queued background jobs (exports, fee sweeps, summary rebuilds) until interrupted. "
+            "Ctrl+C stops polling and waits for the jobs in progress.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=getattr(settings, 'SMS_JOB_WORKERS', 2),
+                            help="Jobs run at the same time (default settings.SMS_JOB_WORKERS).")
+        parser.add_argument('--processes', action='store_true',
+                            help="Run jobs in a process pool instead of threads (for CPU-bound jobs).")
+        parser.add_argument('--poll-interval', type=float, default=1.0, help="Seconds between queue polls.")
+        parser.add_argument('--burst', action='store_true', help="Exit once the queue is empty.")
+
+    def handle(self, *args, **options):
+        pool = 'processes' if options['processes'] else 'threads'
+        self.stdout.write(f"Worker polling for jobs with {options['concurrency']} {pool}...")
+        try:
+            finished = run_worker(
+                concurrency=options['concurrency'], processes=options['processes'],
+                poll_interval=options['poll_interval'], burst=options['burst'], log=self.stdout.write,
+            )
+        except KeyboardInterrupt:
+            self.stdout.write("Stopped.")
+            return
+        self.stdout.write(self.style.SUCCESS(f"✅ Queue empty after {finished} jobs."))
@@ -0,0 +1,139 @@
+# students/middleware.py
+
+import logging
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.utils.functional import SimpleLazyObject
+
+from .profiling import QueryProfile, budget_violations
+from .roles import load_profile, resolve_role
+from .routers import SAFE_METHODS, record_write
+
+logger = logging.getLogger('students.profiling')
+
+
+class _HybridMiddleware:
+    """
+    Base for middleware usable under WSGI and ASGI: with an async view chain
+    Django calls __acall__ directly instead of running the whole chain in a
+    thread, so async views keep running concurrently.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        return self.call(request)
+
+    async def __acall__(self, request):
+        return await self.get_response(request)
+
+
+class QueryProfilerMiddleware(_HybridMiddleware):
+    """
+    Profiles the SQL of every request: adds a Server-Timing header
+    (db / app durations and the query count) and logs requests that exceed
+    their query budget, listing the repeated query shapes (likely N+1 loops).
+
+    Enabled by settings.SMS_QUERY_PROFILER. The budget comes from
+    settings.SMS_QUERY_BUDGET, overridden per view with @query_budget(...).
+    Queries issued while a StreamingHttpResponse is consumed are not counted.
+    Under ASGI the queries run in worker threads, so only the total duration
+    is reported there.
+    """
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.enabled = getattr(settings, 'SMS_QUERY_PROFILER', settings.DEBUG)
+        self.budget = dict(getattr(settings, 'SMS_QUERY_BUDGET', {}))
+        self.strict = getattr(settings, 'SMS_QUERY_BUDGET_STRICT', False)
+
+    def call(self, request):
+        if not self.enabled:
+            return self.get_response(request)
+
+        started = time.perf_counter()
+        with QueryProfile() as profile:
+            response = self.get_response(request)
+        app_ms = (time.perf_counter() - started) * 1000 - profile.total_ms
+
+        response['Server-Timing'] = (
+            f'db;dur={profile.total_ms:.1f};desc="{profile.count} queries", app;dur={app_ms:.1f}'
+        )
+
+        budget = {**self.budget, **getattr(request, 'query_budget', {})}
+        violations = budget_violations(profile, budget)
+        if violations:
+            message = f"{request.method} {request.path} over query budget: {'; '.join(violations)}"
+            if self.strict:
+                raise AssertionError(message + "\n" + profile.describe())
+            logger.warning("%s\n%s", message, profile.describe())
+        return response
+
+    async def __acall__(self, request):
+        if not self.enabled:
+            return await self.get_response(request)
+
+        started = time.perf_counter()
+        response = await self.get_response(request)
+        response['Server-Timing'] = f'total;dur={(time.perf_counter() - started) * 1000:.1f}'
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        budget = getattr(view_func, 'query_budget', None)
+        if budget:
+            request.query_budget = budget
+
+
+class ProfileMiddleware(_HybridMiddleware):
+    """
+    Adds request.profile (the user's Profile with its students select_related,
+    loaded lazily, once) and request.role_info (role and linked student ids,
+    cached in the session). Must come after AuthenticationMiddleware.
+    """
+
+    def _attach(self, request):
+        request.profile = SimpleLazyObject(lambda: load_profile(request.user))
+        request.role_info = SimpleLazyObject(lambda: resolve_role(request))
+
+    def call(self, request):
+        self._attach(request)
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        # request.user and request.auser() cache the user separately; load it
+        # once so @login_required and the role lookups share one query.
+        request.user = await request.auser()
+        self._attach(request)
+        return await self.get_response(request)
+
+
+class ReadYourWritesMiddleware(_HybridMiddleware):
+    """
+    Remembers in the session when a user last made a successful write request,
+    so @use_replica views read from the primary until the replica has caught
+    up (settings.SMS_REPLICA_READ_YOUR_WRITES). Must come after
+    AuthenticationMiddleware.
+    """
+
+    def call(self, request):
+        response = self.get_response(request)
+        if request.method not in SAFE_METHODS and response.status_code < 400:
+            record_write(request)
+        return response
+
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+        if request.method not in SAFE_METHODS and response.status_code < 400:
+            await sync_to_async(record_write)(request)
+        return response
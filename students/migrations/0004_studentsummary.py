@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:36
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('students', '0003_feerecord_profile'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StudentSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_marks', models.IntegerField(default=0)),
+                ('subject_count', models.IntegerField(default=0)),
+                ('present_days', models.IntegerField(default=0)),
+                ('total_days', models.IntegerField(default=0)),
+                ('pending_fees', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('student', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='summary', to='students.student')),
+            ],
+        ),
+    ]
@@ -0,0 +1,65 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:38
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import F, Sum, Window
+from django.db.models.functions import Rank
+
+
+def backfill_ranks(apps, schema_editor):
+    """Ranks every student with marks, as ranking.rebuild_ranks() does (window functions)."""
+    SubjectMarks = apps.get_model('students', 'SubjectMarks')
+    StudentRank = apps.get_model('students', 'StudentRank')
+
+    ranked = (
+        SubjectMarks.objects.values('student', 'student__department')
+        .annotate(total_marks=Sum('marks'))
+        .annotate(
+            rank=Window(Rank(), order_by=F('total_marks').desc()),
+            department_rank=Window(
+                Rank(),
+                partition_by=F('student__department'),
+                order_by=F('total_marks').desc(),
+            ),
+        )
+        .order_by()
+    )
+    batch = []
+    for row in ranked.iterator(chunk_size=1000):
+        batch.append(StudentRank(
+            student_id=row['student'],
+            department_id=row['student__department'],
+            total_marks=row['total_marks'],
+            rank=row['rank'],
+            department_rank=row['department_rank'],
+        ))
+        if len(batch) >= 1000:
+            StudentRank.objects.bulk_create(batch)
+            batch = []
+    StudentRank.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('students', '0004_studentsummary'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StudentRank',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_marks', models.IntegerField(default=0)),
+                ('rank', models.IntegerField(default=1)),
+                ('department_rank', models.IntegerField(default=1)),
+                ('department', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ranks', to='students.department')),
+                ('student', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='rank', to='students.student')),
+            ],
+            options={
+                'ordering': ['rank'],
+                'indexes': [models.Index(fields=['total_marks'], name='students_st_total_m_1b2b5a_idx'), models.Index(fields=['department', 'total_marks'], name='students_st_departm_d19941_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_ranks, migrations.RunPython.noop),
+    ]
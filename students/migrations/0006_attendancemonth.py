@@ -0,0 +1,54 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:45
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_attendance_months(apps, schema_editor):
+    """Folds the existing daily Attendance rows into month bitmaps (one ordered scan)."""
+    Attendance = apps.get_model('students', 'Attendance')
+    AttendanceMonth = apps.get_model('students', 'AttendanceMonth')
+
+    batch, current = [], None
+    rows = Attendance.objects.order_by('student', 'date').values_list('student', 'date', 'is_present')
+    for student_id, date, is_present in rows.iterator(chunk_size=5000):
+        month = date.replace(day=1)
+        if current is None or (current.student_id, current.month) != (student_id, month):
+            if current is not None:
+                batch.append(current)
+            current = AttendanceMonth(student_id=student_id, month=month, present_mask=0, recorded_mask=0)
+        bit = 1 << (date.day - 1)
+        current.recorded_mask |= bit
+        if is_present:
+            current.present_mask |= bit
+        if len(batch) >= 5000:
+            AttendanceMonth.objects.bulk_create(batch)
+            batch = []
+    if current is not None:
+        batch.append(current)
+    AttendanceMonth.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('students', '0005_studentrank'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttendanceMonth',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField()),
+                ('present_mask', models.IntegerField(default=0)),
+                ('recorded_mask', models.IntegerField(default=0)),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attendance_months', to='students.student')),
+            ],
+            options={
+                'ordering': ['-month'],
+                'unique_together': {('student', 'month')},
+            },
+        ),
+        migrations.RunPython(backfill_attendance_months, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,42 @@
+# Full-text search index over students (SQLite FTS5 only).
+
+from django.db import OperationalError, migrations
+
+FTS_TABLE = 'students_student_fts'
+
+
+def create_search_index(apps, schema_editor):
+    """Creates and fills the FTS5 table; other databases (or SQLite builds without FTS5) use LIKE search."""
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    try:
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+            "student_name, student_id, student_email, department, "
+            "tokenize = 'unicode61 remove_diacritics 2', prefix = '1 2 3')"
+        )
+    except OperationalError:
+        return
+    schema_editor.execute(
+        f"INSERT INTO {FTS_TABLE} (rowid, student_name, student_id, student_email, department) "
+        "SELECT s.id, s.student_name, sid.student_id, s.student_email, d.department "
+        "FROM students_student s "
+        "JOIN students_studentid sid ON sid.id = s.student_id_id "
+        "JOIN students_department d ON d.id = s.department_id"
+    )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('students', '0006_attendancemonth'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('students', '0007_student_search_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(fields=['student_name', 'id'], name='students_name_id_idx'),
+        ),
+    ]
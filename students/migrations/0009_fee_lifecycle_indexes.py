@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:55
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import DecimalField, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def count_late_fees_as_outstanding(apps, schema_editor):
+    """StudentSummary.pending_fees now covers pending and late records: recompute it in one UPDATE."""
+    FeeRecord = apps.get_model('students', 'FeeRecord')
+    StudentSummary = apps.get_model('students', 'StudentSummary')
+    money = DecimalField(max_digits=12, decimal_places=2)
+    unpaid = (
+        FeeRecord.objects.filter(student=OuterRef('student'), status__in=['pending', 'late'])
+        .order_by()
+        .values('student')
+        .annotate(total=Sum('amount_due'))
+        .values('total')
+    )
+    StudentSummary.objects.update(
+        pending_fees=Coalesce(Subquery(unpaid, output_field=money), Decimal('0.00'), output_field=money),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('students', '0008_student_name_id_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='feerecord',
+            index=models.Index(fields=['status', 'due_date'], name='students_fee_status_due_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='feerecord',
+            index=models.Index(fields=['student', 'status'], name='students_fee_student_st_idx'),
+        ),
+        migrations.RunPython(count_late_fees_as_outstanding, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('students', '0009_fee_lifecycle_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='feerecord',
+            index=models.Index(fields=['student', 'due_date'], name='students_fee_student_due_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='subjectmarks',
+            index=models.Index(fields=['subject', 'marks'], name='students_marks_subject_idx'),
+        ),
+    ]
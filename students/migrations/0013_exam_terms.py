@@ -0,0 +1,144 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:35
+
+import datetime
+import django.db.models.deletion
+import students.models
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, F, Max, Min, Q, Sum
+
+
+def assign_initial_term(apps, schema_editor):
+    """Marks recorded before terms existed all belong to one initial, current term."""
+    ExamTerm = apps.get_model('students', 'ExamTerm')
+    SubjectMarks = apps.get_model('students', 'SubjectMarks')
+    if not SubjectMarks.objects.exists():
+        return
+    today = datetime.date.today()
+    term = ExamTerm.objects.create(name=f'{today.year} Term', start_date=today, is_current=True)
+    SubjectMarks.objects.update(term=term)
+
+
+def backfill_term_rollups(apps, schema_editor):
+    """One TermRollup per (term, department, subject), as terms.rebuild_term_rollups() writes them."""
+    SubjectMarks = apps.get_model('students', 'SubjectMarks')
+    TermRollup = apps.get_model('students', 'TermRollup')
+    pass_mark = getattr(settings, 'SMS_PASS_MARK', 35)
+
+    rows = (
+        SubjectMarks.objects.values('term', 'student__department', 'subject')
+        .annotate(
+            count=Count('pk'),
+            total=Sum('marks'),
+            sum_squares=Sum(F('marks') * F('marks')),
+            min_marks=Min('marks'),
+            max_marks=Max('marks'),
+            fail_count=Count('pk', filter=Q(marks__lt=pass_mark)),
+        )
+        .order_by()
+    )
+    TermRollup.objects.bulk_create(
+        [
+            TermRollup(
+                term_id=row['term'], department_id=row['student__department'], subject_id=row['subject'],
+                count=row['count'], total=row['total'], sum_squares=row['sum_squares'],
+                min_marks=row['min_marks'], max_marks=row['max_marks'], fail_count=row['fail_count'],
+            )
+            for row in rows
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('students', '0012_job'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExamTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('start_date', models.DateField(default=datetime.date.today)),
+                ('end_date', models.DateField(blank=True, null=True)),
+                ('is_current', models.BooleanField(default=False)),
+            ],
+            options={
+                'ordering': ['start_date', 'pk'],
+            },
+        ),
+        migrations.CreateModel(
+            name='TermRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('total', models.BigIntegerField(default=0)),
+                ('sum_squares', models.BigIntegerField(default=0)),
+                ('min_marks', models.IntegerField(null=True)),
+                ('max_marks', models.IntegerField(null=True)),
+                ('fail_count', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RemoveIndex(
+            model_name='subjectmarks',
+            name='students_marks_subject_idx',
+        ),
+        migrations.AddConstraint(
+            model_name='examterm',
+            constraint=models.UniqueConstraint(condition=models.Q(('is_current', True)), fields=('is_current',), name='students_one_current_term'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='subjectmarks',
+            unique_together=set(),
+        ),
+        migrations.AddField(
+            model_name='subjectmarks',
+            name='term',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, related_name='marks', to='students.examterm'),
+        ),
+        migrations.RunPython(assign_initial_term, migrations.RunPython.noop),
+        # NOT NULL without a default: every existing row has its term by now, and
+        # the schema editor would otherwise call current_term_id() to fill NULLs.
+        migrations.AlterField(
+            model_name='subjectmarks',
+            name='term',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='marks', to='students.examterm'),
+        ),
+        migrations.AlterField(
+            model_name='subjectmarks',
+            name='term',
+            field=models.ForeignKey(default=students.models.current_term_id, on_delete=django.db.models.deletion.PROTECT, related_name='marks', to='students.examterm'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='subjectmarks',
+            unique_together={('student', 'term', 'subject')},
+        ),
+        migrations.AddIndex(
+            model_name='subjectmarks',
+            index=models.Index(fields=['term', 'subject', 'marks'], name='students_marks_term_subj_idx'),
+        ),
+        migrations.AddField(
+            model_name='termrollup',
+            name='department',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='term_rollups', to='students.department'),
+        ),
+        migrations.AddField(
+            model_name='termrollup',
+            name='subject',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='term_rollups', to='students.subject'),
+        ),
+        migrations.AddField(
+            model_name='termrollup',
+            name='term',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rollups', to='students.examterm'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='termrollup',
+            unique_together={('term', 'department', 'subject')},
+        ),
+        migrations.RunPython(backfill_term_rollups, migrations.RunPython.noop),
+    ]
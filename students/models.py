@@ -2,6 +2,7 @@
 
 from django.db import models
 from django.contrib.auth.models import User 
+from django.utils import timezone
 import datetime
 USER_ROLES = (
     ('staff', 'Staff/Admin'),
@@ -22,6 +23,15 @@ class Profile(models.Model):
     related_student = models.ForeignKey('Student', on_delete=models.SET_NULL, 
                                         null=True, blank=True, related_name='parent_profiles')
 
+    # Bumped on every save; sessions caching the role compare against it (students/roles.py)
+    version = models.PositiveIntegerField(default=0, editable=False)
+
+    def save(self, *args, **kwargs):
+        self.version += 1
+        if kwargs.get('update_fields') is not None:
+            kwargs['update_fields'] = {*kwargs['update_fields'], 'version'}
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return f'{self.user.username} ({self.get_role_display()})'
 
@@ -62,17 +72,60 @@ class Student(models.Model):
     class Meta:
         ordering = ['student_name']
         verbose_name = "Student"
+        indexes = [
+            # Keyset pagination of the student list (students/pagination.py)
+            models.Index(fields=['student_name', 'id'], name='students_name_id_idx'),
+        ]
+
+class ExamTerm(models.Model):
+    """
+    An exam session marks belong to. Exactly one term is current: new marks go
+    to it, and summaries, ranks, analytics and dashboards are computed from
+    its marks (see students/terms.py). Older terms are kept for trends.
+    """
+    name = models.CharField(max_length=100, unique=True)
+    start_date = models.DateField(default=datetime.date.today)
+    end_date = models.DateField(null=True, blank=True)
+    is_current = models.BooleanField(default=False)
+
+    def __str__(self):
+        return self.name
+
+    def save(self, *args, **kwargs):
+        if self.is_current:
+            ExamTerm.objects.filter(is_current=True).exclude(pk=self.pk).update(is_current=False)
+        super().save(*args, **kwargs)
+
+    class Meta:
+        ordering = ['start_date', 'pk']
+        constraints = [
+            models.UniqueConstraint(fields=['is_current'], condition=models.Q(is_current=True),
+                                    name='students_one_current_term'),
+        ]
+
+
+def current_term_id():
+    """Default term of new SubjectMarks rows."""
+    from .terms import current_term_id as _current_term_id
+    return _current_term_id()
+
 
 class SubjectMarks(models.Model):
     student = models.ForeignKey(Student, related_name="studentmarks", on_delete=models.CASCADE)
     subject = models.ForeignKey(Subject, related_name="subjectmarks", on_delete=models.CASCADE)
+    term = models.ForeignKey(ExamTerm, related_name="marks", on_delete=models.PROTECT, default=current_term_id)
     marks = models.IntegerField()
 
     def __str__(self):
         return f'{self.student.student_name} - {self.subject.subject_name} ({self.marks})'
 
     class Meta:
-        unique_together = ['student', 'subject']
+        # Student first, then term: per-student lookups within a term (summaries, ranks) use both columns
+        unique_together = ['student', 'term', 'subject']
+        indexes = [
+            # Subject analytics (term = ? GROUP BY subject, marks), pass/fail filters and term rollups
+            models.Index(fields=['term', 'subject', 'marks'], name='students_marks_term_subj_idx'),
+        ]
 
 # students/models.py (Add new model)
 
@@ -88,14 +141,48 @@ class Attendance(models.Model):
     class Meta:
         unique_together = ['student', 'date']
         ordering = ['-date']
+        indexes = [
+            # Date-range totals across students (department statistics: date BETWEEN ? AND ?), index-only
+            models.Index(fields=['date', 'student', 'is_present'], name='students_att_date_idx'),
+        ]
 
 
 
+class AttendanceMonth(models.Model):
+    """
+    Compact attendance: one row per student per month instead of one per day.
+    Bit (day - 1) of recorded_mask is set when attendance was taken that day,
+    and the same bit of present_mask when the student was present, so totals
+    are popcounts (see students/bitmaps.py). Kept in sync with Attendance.
+    """
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='attendance_months')
+    month = models.DateField()  # first day of the month
+    present_mask = models.IntegerField(default=0)
+    recorded_mask = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f'{self.student.student_name} - {self.month:%Y-%m} ({self.present_days}/{self.recorded_days})'
+
+    @property
+    def present_days(self):
+        return self.present_mask.bit_count()
+
+    @property
+    def recorded_days(self):
+        return self.recorded_mask.bit_count()
+
+    class Meta:
+        unique_together = ['student', 'month']
+        ordering = ['-month']
+
+
 FEE_STATUS = (
     ('paid', 'Paid'),
     ('pending', 'Pending'),
     ('late', 'Late'),
 )
+# Still owed: counted as outstanding in StudentSummary.pending_fees and the fee reports.
+UNPAID_FEE_STATUSES = ('pending', 'late')
 
 class FeeRecord(models.Model):
     student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='fees')
@@ -106,4 +193,157 @@ class FeeRecord(models.Model):
     payment_date = models.DateField(null=True, blank=True)
     
     def __str__(self):
-        return f'{self.student.student_name} - {self.amount_due} ({self.status})'        
\ No newline at end of file
+        return f'{self.student.student_name} - {self.amount_due} ({self.status})'
+
+    class Meta:
+        indexes = [
+            # Overdue sweep (status='pending' AND due_date < today) and per-student fee lookups
+            models.Index(fields=['status', 'due_date'], name='students_fee_status_due_idx'),
+            models.Index(fields=['student', 'status'], name='students_fee_student_st_idx'),
+            # Recent fees on the dashboards (student = ? ORDER BY due_date DESC), from `manage.py queryplan`
+            models.Index(fields=['student', 'due_date'], name='students_fee_student_due_idx'),
+        ]
+
+
+class StudentSummary(models.Model):
+    """
+    Denormalized per-student totals, kept current by the signal handlers in
+    students/signals.py so dashboards can read one row instead of aggregating.
+    """
+    student = models.OneToOneField(Student, on_delete=models.CASCADE, related_name='summary')
+    total_marks = models.IntegerField(default=0)
+    subject_count = models.IntegerField(default=0)
+    present_days = models.IntegerField(default=0)
+    total_days = models.IntegerField(default=0)
+    pending_fees = models.DecimalField(max_digits=12, decimal_places=2, default=0)  # pending + late
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f'{self.student} summary ({self.total_marks} marks)'
+
+    def percentage(self, total_subjects):
+        total_marks_possible = total_subjects * 100
+        return round((self.total_marks / total_marks_possible * 100), 2) if total_marks_possible > 0 else 0
+
+    @property
+    def attendance_percentage(self):
+        return round((self.present_days / self.total_days * 100), 2) if self.total_days > 0 else 0
+
+
+class StudentRank(models.Model):
+    """
+    Persisted overall and per-department competition ranks ("1224" ranking),
+    adjusted incrementally by students/ranking.py whenever a student's marks change.
+    Only students with at least one SubjectMarks row are ranked.
+    """
+    student = models.OneToOneField(Student, on_delete=models.CASCADE, related_name='rank')
+    department = models.ForeignKey(Department, on_delete=models.CASCADE, related_name='ranks')
+    total_marks = models.IntegerField(default=0)
+    rank = models.IntegerField(default=1)
+    department_rank = models.IntegerField(default=1)
+
+    def __str__(self):
+        return f'#{self.rank} {self.student} ({self.total_marks})'
+
+    class Meta:
+        ordering = ['rank']
+        indexes = [
+            models.Index(fields=['total_marks']),
+            models.Index(fields=['department', 'total_marks']),
+        ]
+
+
+class DataVersion(models.Model):
+    """
+    Change counters: one row per tracked table plus 'global', incremented
+    (once per transaction) by students/versions.py after writes to that table.
+    Pages that only depend on those tables derive their ETag from them.
+    """
+    name = models.CharField(max_length=50, unique=True)
+    version = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f'{self.name} v{self.version}'
+
+
+class Job(models.Model):
+    """
+    A unit of background work (an export, a fee sweep, a summary rebuild)
+    queued by the staff UI and executed by `manage.py runworker`; see
+    students/jobs.py for the job kinds and the worker loop.
+    """
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('succeeded', 'Succeeded'),
+        ('failed', 'Failed'),
+    ]
+
+    kind = models.CharField(max_length=50)
+    params = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued')
+    run_after = models.DateTimeField(default=timezone.now)  # pushed back between retries
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=3)
+    progress_done = models.PositiveIntegerField(default=0)
+    progress_total = models.PositiveIntegerField(null=True, blank=True)
+    message = models.CharField(max_length=255, blank=True)
+    error = models.TextField(blank=True)
+    result = models.FileField(upload_to='jobs/%Y/%m/', blank=True)
+    worker = models.CharField(max_length=100, blank=True)
+    created_by = models.ForeignKey(User, null=True, blank=True, on_delete=models.SET_NULL, related_name='jobs')
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)  # heartbeat while running
+
+    def __str__(self):
+        return f'{self.kind} #{self.pk} ({self.status})'
+
+    @property
+    def percentage(self):
+        if self.status == 'succeeded':
+            return 100
+        return min(round(self.progress_done / self.progress_total * 100), 100) if self.progress_total else 0
+
+    @property
+    def is_active(self):
+        return self.status in ('queued', 'running')
+
+    @property
+    def error_summary(self):
+        # The exception line at the end of the stored traceback
+        return self.error.strip().splitlines()[-1] if self.error.strip() else ''
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            # Worker poll: status = 'queued' AND run_after <= now ORDER BY run_after
+            models.Index(fields=['status', 'run_after'], name='students_job_status_run_idx'),
+        ]
+
+
+class TermRollup(models.Model):
+    """
+    Marks statistics per (term, department, subject), kept current by
+    students/terms.py: the cells a write touches are recomputed when it
+    commits. Count, sum and sum of squares add up across cells, so averages
+    and standard deviations for any grouping come from these rows alone.
+    """
+    term = models.ForeignKey(ExamTerm, on_delete=models.CASCADE, related_name='rollups')
+    department = models.ForeignKey(Department, on_delete=models.CASCADE, related_name='term_rollups')
+    subject = models.ForeignKey(Subject, on_delete=models.CASCADE, related_name='term_rollups')
+    count = models.PositiveIntegerField(default=0)
+    total = models.BigIntegerField(default=0)
+    sum_squares = models.BigIntegerField(default=0)
+    min_marks = models.IntegerField(null=True)
+    max_marks = models.IntegerField(null=True)
+    fail_count = models.PositiveIntegerField(default=0)  # below settings.SMS_PASS_MARK when computed
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f'{self.term} / {self.department} / {self.subject} ({self.count} marks)'
+
+    class Meta:
+        unique_together = ['term', 'department', 'subject']
@@ -0,0 +1,145 @@
+# students/pagination.py
+#
+# Keyset (cursor) pagination for the student list. Pages are ordered by
+# (student_name, id) and fetched with "WHERE (name, id) > last seen" instead of
+# OFFSET, so page 5000 costs the same as page 1 (index students_name_id_idx).
+# Search results (students/search.py) keep their relevance order instead: they
+# are paged by (search_rank, id), the bm25 score. Cursors are opaque URL-safe
+# tokens. Instead of an exact COUNT(*), the total
+# can be estimated from the primary key range or capped at a few pages.
+
+import base64
+import binascii
+import json
+
+from django.db.models import Max, Min, Q
+
+DIRECTIONS = ('next', 'prev')
+
+
+def encode_cursor(key, direction):
+    payload = json.dumps([direction, *key], separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Returns (direction, (value, pk)), or None for a missing or malformed token."""
+    if not token:
+        return None
+    try:
+        direction, value, pk = json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+    except (binascii.Error, UnicodeDecodeError, ValueError, TypeError):
+        return None
+    if direction not in DIRECTIONS or isinstance(value, bool) or not isinstance(pk, int):
+        return None
+    if not isinstance(value, (str, int, float)):
+        return None
+    return direction, (value, pk)
+
+
+class CursorPage:
+    """One page of a keyset-paginated queryset; iterable like a Paginator page."""
+
+    def __init__(self, object_list, next_cursor, previous_cursor, total=None, total_kind='exact'):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+        self.total = total
+        self.total_kind = total_kind    # 'exact', 'estimate' (≈ total) or 'at_least' (total+)
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    @property
+    def total_display(self):
+        if self.total is None:
+            return ''
+        if self.total_kind == 'estimate':
+            return f'≈ {self.total}'
+        if self.total_kind == 'at_least':
+            return f'{self.total}+'
+        return str(self.total)
+
+
+def _ordering(queryset):
+    """The keyset: relevance for search results, else the name."""
+    if 'search_rank' in queryset.query.annotations:
+        return 'search_rank', (int, float)
+    return 'student_name', str
+
+
+def _beyond(field, key, direction):
+    value, pk = key
+    lookup = 'gt' if direction == 'next' else 'lt'
+    return Q(**{f'{field}__{lookup}': value}) | Q(**{field: value, f'pk__{lookup}': pk})
+
+
+def cursor_paginate(queryset, cursor=None, per_page=10, count='estimate'):
+    """
+    Returns the CursorPage after/before `cursor` (a token from a previous page,
+    or None for the first page). `count` is 'exact', 'estimate' or None.
+    """
+    field, value_type = _ordering(queryset)
+    position = decode_cursor(cursor)
+    if position is not None and not isinstance(position[1][0], value_type):
+        position = None   # a cursor from the other ordering (e.g. before a search): start over
+    if position is None:
+        rows = list(queryset.order_by(field, 'pk')[:per_page + 1])
+        more, came_from = len(rows) > per_page, None
+        rows = rows[:per_page]
+    else:
+        direction, key = position
+        if direction == 'next':
+            rows = list(queryset.filter(_beyond(field, key, direction)).order_by(field, 'pk')[:per_page + 1])
+            more = len(rows) > per_page
+            rows = rows[:per_page]
+        else:
+            rows = list(queryset.filter(_beyond(field, key, direction)).order_by(f'-{field}', '-pk')[:per_page + 1])
+            more = len(rows) > per_page
+            rows = rows[:per_page][::-1]
+        came_from = direction
+
+    if came_from == 'prev':
+        has_next, has_previous = True, more
+    else:
+        has_next, has_previous = more, came_from == 'next'
+
+    def key(student):
+        return getattr(student, field), student.pk
+
+    total, total_kind = _count(queryset, count, per_page)
+    return CursorPage(
+        rows,
+        next_cursor=encode_cursor(key(rows[-1]), 'next') if rows and has_next else None,
+        previous_cursor=encode_cursor(key(rows[0]), 'prev') if rows and has_previous else None,
+        total=total,
+        total_kind=total_kind,
+    )
+
+
+def _count(queryset, mode, per_page, cap_pages=10):
+    if mode == 'exact':
+        return queryset.count(), 'exact'
+    if mode != 'estimate':
+        return None, 'exact'
+    if not queryset.query.has_filters() and not queryset.query.extra_tables:
+        # Both ends of the primary key index: O(1) however large the table is.
+        bounds = queryset.order_by().aggregate(low=Min('pk'), high=Max('pk'))
+        if bounds['high'] is None:
+            return 0, 'exact'
+        return bounds['high'] - bounds['low'] + 1, 'estimate'
+    # Filtered lists (search results) are counted up to a cap: "100+".
+    cap = per_page * cap_pages
+    total = queryset.order_by()[:cap + 1].count()
+    return min(total, cap), 'at_least' if total > cap else 'exact'
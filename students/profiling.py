@@ -0,0 +1,154 @@
+# students/profiling.py
+#
+# SQL profiling shared by the QueryProfilerMiddleware and by tests:
+#   - QueryProfile: context manager recording every query on every connection
+#     (SQL, params, duration) through connection.execute_wrapper();
+#   - query_budget: view decorator declaring how many queries a view may run;
+#   - assert_max_queries: assertNumQueries-style helper that fails when a block
+#     or function exceeds a query budget and reports the repeated SQL.
+
+import functools
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from django.db import connections
+
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER_LISTS = re.compile(r"\((?:\s*(?:%s|\?)\s*,)+\s*(?:%s|\?)\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def fingerprint(sql):
+    """
+    Normalises SQL so that queries differing only in literal values or IN-list
+    length compare equal. Several queries with the same fingerprint in one
+    request are the signature of an N+1 loop.
+    """
+    sql = _LITERALS.sub('?', sql)
+    sql = sql.replace('%s', '?')
+    sql = _PLACEHOLDER_LISTS.sub('(...)', sql)
+    return _WHITESPACE.sub(' ', sql).strip()
+
+
+class QueryProfile:
+    """Records the queries executed on all database connections inside a `with` block."""
+
+    def __init__(self):
+        self.queries = []
+        self._stack = None
+
+    def __enter__(self):
+        self._stack = ExitStack()
+        for connection in connections.all():
+            self._stack.enter_context(connection.execute_wrapper(self._record(connection.alias)))
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stack.close()
+
+    def _record(self, alias):
+        def wrapper(execute, sql, params, many, context):
+            started = time.perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                self.queries.append({
+                    'alias': alias,
+                    'sql': sql,
+                    'params': params,
+                    'ms': (time.perf_counter() - started) * 1000,
+                })
+        return wrapper
+
+    @property
+    def count(self):
+        return len(self.queries)
+
+    @property
+    def total_ms(self):
+        return sum(query['ms'] for query in self.queries)
+
+    def duplicates(self):
+        """[(sql, times)] for identical SQL + params executed more than once."""
+        counts = Counter((query['sql'], repr(query['params'])) for query in self.queries)
+        return [(sql, times) for (sql, _params), times in counts.most_common() if times > 1]
+
+    def similar(self, threshold=2):
+        """[(fingerprint, times)] for query shapes executed at least `threshold` times."""
+        counts = Counter(fingerprint(query['sql']) for query in self.queries)
+        return [(shape, times) for shape, times in counts.most_common() if times >= threshold]
+
+    def describe(self, limit=5):
+        lines = [f"{self.count} queries, {self.total_ms:.1f}ms in the database"]
+        for shape, times in self.similar()[:limit]:
+            lines.append(f"  {times}x {shape[:200]}")
+        return "\n".join(lines)
+
+
+def query_budget(max_queries=None, max_db_ms=None, max_similar=None):
+    """
+    Declares a per-view budget that overrides settings.SMS_QUERY_BUDGET for
+    that view. The QueryProfilerMiddleware logs requests that exceed it (or
+    raises, with settings.SMS_QUERY_BUDGET_STRICT = True, e.g. in tests).
+    """
+    budget = {key: value for key, value in (
+        ('queries', max_queries), ('db_ms', max_db_ms), ('similar', max_similar),
+    ) if value is not None}
+
+    def decorator(view_func):
+        view_func.query_budget = budget
+        return view_func
+    return decorator
+
+
+def budget_violations(profile, budget):
+    violations = []
+    if 'queries' in budget and profile.count > budget['queries']:
+        violations.append(f"{profile.count} queries (budget {budget['queries']})")
+    if 'db_ms' in budget and profile.total_ms > budget['db_ms']:
+        violations.append(f"{profile.total_ms:.1f}ms in the database (budget {budget['db_ms']}ms)")
+    if 'similar' in budget:
+        worst = profile.similar(threshold=budget['similar'] + 1)
+        if worst:
+            violations.append(f"{worst[0][1]} similar queries (budget {budget['similar']}): {worst[0][0][:200]}")
+    return violations
+
+
+class assert_max_queries:
+    """
+    Fails when the wrapped block or function runs more than `max_queries`
+    queries, or (optionally) repeats one query shape more than `max_similar`
+    times. Usable as a context manager or a decorator:
+
+        with assert_max_queries(5):
+            client.get('/dashboard/student/')
+
+        @assert_max_queries(3, max_similar=1)
+        def test_leaderboard(self): ...
+    """
+
+    def __init__(self, max_queries, max_similar=None):
+        self.budget = {'queries': max_queries}
+        if max_similar is not None:
+            self.budget['similar'] = max_similar
+        self.profile = None
+
+    def __enter__(self):
+        self.profile = QueryProfile().__enter__()
+        return self.profile
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.profile.__exit__(exc_type, exc_value, traceback)
+        if exc_type is None:
+            violations = budget_violations(self.profile, self.budget)
+            if violations:
+                raise AssertionError("; ".join(violations) + "\n" + self.profile.describe())
+
+    def __call__(self, func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with assert_max_queries(self.budget['queries'], self.budget.get('similar')):
+                return func(*args, **kwargs)
+        return wrapper
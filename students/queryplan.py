@@ -0,0 +1,290 @@
+# students/queryplan.py
+#
+# Query-plan audit behind `manage.py queryplan`. Every benchmark scenario
+# (students/benchmarks.py) is replayed through the test Client while its SQL is
+# recorded; each distinct query shape is then run through SQLite's
+# EXPLAIN QUERY PLAN and flagged when it
+#   - scans a whole table ("SCAN students_feerecord"), or
+#   - sorts/groups through a temporary B-tree ("USE TEMP B-TREE FOR ORDER BY").
+# Small tables (below `min_rows`) are ignored: scanning them is the right plan.
+# For flagged queries a composite index is suggested from the columns the
+# query filters (equalities first, then one range) and orders by, and
+# write_index_migration() turns the suggestions into a migration.
+# Reports can be saved as a baseline; regressions() lists the flags that are
+# new since then, which is what --fail-on-scan checks, and what
+# SeededViewsTests checks against students/testdata/queryplan-tests.json.
+
+import re
+from dataclasses import asdict, dataclass, field
+
+from django.apps import apps
+from django.db import connection, models
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from .benchmarks import SCENARIOS, ensure_fixtures
+from .profiling import QueryProfile, fingerprint
+
+_SCAN = re.compile(r'^SCAN (\w+)(?: AS \w+)?$')
+_TEMP_BTREE = re.compile(r'USE TEMP B-TREE FOR (ORDER BY|GROUP BY|DISTINCT|RIGHT PART OF ORDER BY)')
+_PREDICATE = r'"{table}"\."(\w+)"\s*(=|IN\b|IS\b|<=|>=|<|>|BETWEEN\b|LIKE\b)'
+_ORDER_COLUMN = r'"{table}"\."(\w+)"'
+_CLAUSE_END = re.compile(r'\b(GROUP BY|ORDER BY|LIMIT|HAVING)\b')
+_EQUALITY = {'=', 'IN', 'IS'}
+_IGNORED_TABLES = ('django_', 'auth_', 'sqlite_', 'students_student_fts')
+
+
+@dataclass
+class PlanIssue:
+    scenario: str
+    kind: str            # 'scan' or 'temp_btree'
+    table: str
+    detail: str
+    query: str           # fingerprint of the offending SQL
+    suggestion: list = field(default_factory=list)   # model field names for a composite index
+
+    @property
+    def key(self):
+        return f"{self.scenario}|{self.kind}|{self.table}|{self.query}"
+
+
+def explain(sql, params=()):
+    """EXPLAIN QUERY PLAN detail lines for one statement (SQLite only)."""
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+        return [row[-1] for row in cursor.fetchall()]
+
+
+def capture_scenarios(names=None):
+    """{scenario name: [(sql, params), ...]} of the SELECTs each scenario runs, one per query shape."""
+    fixtures = ensure_fixtures()
+    captured = {}
+    for scenario in SCENARIOS:
+        if names and scenario.name not in names:
+            continue
+        # The replay is not a real request: keep the query profiler from
+        # reporting it against the view budgets
+        with override_settings(SMS_QUERY_PROFILER=False):
+            client = Client()
+            client.force_login(fixtures['users'][scenario.role])
+            client.get(reverse('home'))   # stores the role in the session, as on any later visit
+            with QueryProfile() as profile:
+                response = scenario.request(client, fixtures)
+                if response.streaming:
+                    for _chunk in response.streaming_content:
+                        pass
+        shapes = {}
+        for query in profile.queries:
+            if query['sql'].lstrip().upper().startswith(('SELECT', 'WITH')):
+                shapes.setdefault(fingerprint(query['sql']), (query['sql'], query['params']))
+        captured[scenario.name] = list(shapes.values())
+    return captured
+
+
+class _Tables:
+    """Row counts, models and existing indexes of the tables named in plans."""
+
+    def __init__(self):
+        self.models = {model._meta.db_table: model for model in apps.get_models()}
+        self._rows = {}
+        self._indexes = {}
+
+    def rows(self, table):
+        if table not in self._rows:
+            with connection.cursor() as cursor:
+                cursor.execute(f'SELECT COUNT(*) FROM "{table}"')
+                self._rows[table] = cursor.fetchone()[0]
+        return self._rows[table]
+
+    def indexed_prefixes(self, table):
+        if table not in self._indexes:
+            with connection.cursor() as cursor:
+                constraints = connection.introspection.get_constraints(cursor, table)
+            self._indexes[table] = [tuple(info['columns']) for info in constraints.values() if info['columns']]
+        return self._indexes[table]
+
+
+def _where_clause(sql):
+    where = sql.upper().rfind(' WHERE ')
+    if where < 0:
+        return ''
+    tail = sql[where + 7:]
+    end = _CLAUSE_END.search(tail)
+    return tail[:end.start()] if end else tail
+
+
+def _order_clause(sql):
+    """The GROUP BY clause (or else ORDER BY) of the outermost query."""
+    upper = sql.upper()
+    start = upper.rfind(' GROUP BY ')
+    if start < 0:
+        start = upper.rfind(' ORDER BY ')
+    if start < 0:
+        return ''
+    tail = sql[start + 10:]
+    end = re.search(r'\b(ORDER BY|LIMIT|HAVING|OFFSET)\b', tail)
+    return tail[:end.start()] if end else tail
+
+
+def _select_list(sql):
+    """Top-level expressions between SELECT and FROM."""
+    start = sql.upper().find('SELECT') + 6
+    expressions, depth, current = [], 0, ''
+    for position in range(start, len(sql)):
+        char = sql[position]
+        if depth == 0 and sql[position:position + 6].upper() == ' FROM ':
+            break
+        depth += {'(': 1, ')': -1}.get(char, 0)
+        if char == ',' and depth == 0:
+            expressions.append(current)
+            current = ''
+        else:
+            current += char
+    return expressions + [current]
+
+
+def _resolve_positions(sql, clause):
+    """Replaces "GROUP BY 1, 2" style positions with the selected expressions."""
+    select = None
+    parts = []
+    for part in clause.split(','):
+        number = re.match(r'\s*(\d+)\b', part)
+        if number:
+            select = select or _select_list(sql)
+            index = int(number.group(1)) - 1
+            parts.append(select[index] if index < len(select) else part)
+        else:
+            parts.append(part)
+    return ','.join(parts)
+
+
+def suggest_index(sql, table, tables):
+    """Columns (as model field names) for a composite index serving `sql` on `table`, or []."""
+    model = tables.models.get(table)
+    if model is None:
+        return []
+
+    equalities, ranges = [], []
+    for column, operator in re.findall(_PREDICATE.format(table=table), _where_clause(sql)):
+        target = equalities if operator.strip().upper() in _EQUALITY else ranges
+        if column not in equalities + ranges:
+            target.append(column)
+    ordering = re.findall(_ORDER_COLUMN.format(table=table), _resolve_positions(sql, _order_clause(sql)))
+
+    columns = []
+    for column in equalities + ranges[:1] + ordering:
+        if column not in columns:
+            columns.append(column)
+    columns = columns[:3]
+    if not columns:
+        return []
+    if any(prefix[:len(columns)] == tuple(columns) for prefix in tables.indexed_prefixes(table)):
+        return []
+
+    by_column = {model_field.column: model_field.name for model_field in model._meta.concrete_fields}
+    by_column['id'] = 'id'
+    return [by_column.get(column, column) for column in columns]
+
+
+def audit(names=None, min_rows=1000):
+    """Returns the list of PlanIssue found for the given scenarios (default: all)."""
+    if connection.vendor != 'sqlite':
+        raise RuntimeError("The query-plan audit reads SQLite's EXPLAIN QUERY PLAN output.")
+
+    tables = _Tables()
+    issues = []
+    for scenario, queries in capture_scenarios(names).items():
+        for sql, params in queries:
+            shape = fingerprint(sql)
+            for detail in explain(sql, params):
+                scan = _SCAN.match(detail)
+                temp = _TEMP_BTREE.search(detail)
+                if scan:
+                    kind, table = 'scan', scan.group(1)
+                elif temp:
+                    kind, table = 'temp_btree', _main_table(sql)
+                else:
+                    continue
+                if table is None or table.startswith(_IGNORED_TABLES) or table not in tables.models:
+                    continue
+                if tables.rows(table) < min_rows:
+                    continue
+                issues.append(PlanIssue(
+                    scenario, kind, table, detail, shape,
+                    suggestion=suggest_index(sql, table, tables),
+                ))
+    return _dedupe(issues)
+
+
+def _main_table(sql):
+    match = re.search(r'\bFROM "(\w+)"', sql)
+    return match.group(1) if match else None
+
+
+def _dedupe(issues):
+    seen, unique = set(), []
+    for issue in issues:
+        if issue.key not in seen:
+            seen.add(issue.key)
+            unique.append(issue)
+    return unique
+
+
+def to_report(issues):
+    return {'issues': [{**asdict(issue), 'key': issue.key} for issue in issues]}
+
+
+def regressions(issues, baseline):
+    """Issues whose key is not in a baseline report (every issue when there is no baseline)."""
+    known = {issue['key'] for issue in (baseline or {}).get('issues', [])}
+    return [issue for issue in issues if issue.key not in known]
+
+
+def recommended_indexes(issues):
+    """{(app_label, model_name): [field lists]} without duplicates."""
+    tables = _Tables()
+    recommended = {}
+    for issue in issues:
+        model = tables.models.get(issue.table)
+        if not issue.suggestion or model is None:
+            continue
+        fields = recommended.setdefault((model._meta.app_label, model._meta.model_name), [])
+        if issue.suggestion not in fields:
+            fields.append(issue.suggestion)
+    return recommended
+
+
+def write_index_migration(recommended, app_label='students', name='queryplan_indexes'):
+    """
+    Writes a migration adding the recommended indexes to `app_label` and
+    returns (path, [(model, Index)]). Add the same Index entries to each model's
+    Meta.indexes, or the next makemigrations will try to remove them.
+    """
+    from django.db.migrations import AddIndex, Migration
+    from django.db.migrations.loader import MigrationLoader
+    from django.db.migrations.writer import MigrationWriter
+
+    loader = MigrationLoader(None, ignore_no_migrations=True)
+    leaf = loader.graph.leaf_nodes(app_label)[0]
+    number = int(leaf[1].split('_')[0]) + 1
+
+    operations, added = [], []
+    for (label, model_name), field_lists in sorted(recommended.items()):
+        if label != app_label:
+            continue
+        model = apps.get_model(label, model_name)
+        for fields in field_lists:
+            index = models.Index(fields=fields)
+            index.set_name_with_model(model)
+            operations.append(AddIndex(model_name=model_name, index=index))
+            added.append((model, index))
+    if not operations:
+        return None, []
+
+    migration = Migration(f'{number:04d}_{name}', app_label)
+    migration.dependencies = [leaf]
+    migration.operations = operations
+    writer = MigrationWriter(migration)
+    with open(writer.path, 'w') as handle:
+        handle.write(writer.as_string())
+    return writer.path, added
@@ -0,0 +1,190 @@
+# students/ranking.py
+#
+# Leaderboard ranking done in the database. leaderboard_queryset() ranks with
+# RANK()/DENSE_RANK() window functions so pages can be sliced without pulling
+# the whole school into Python; the StudentRank table keeps a persisted
+# competition rank that is shifted incrementally when one student's total moves.
+
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum, Window
+from django.db.models.functions import DenseRank, Rank
+
+from .models import Student, StudentRank
+from .terms import current_marks
+
+FULL_REBUILD_THRESHOLD = 200
+
+RANK_MODES = {
+    'competition': Rank,   # 1, 2, 2, 4
+    'dense': DenseRank,    # 1, 2, 2, 3
+}
+
+
+def _marks(department=None, subject=None):
+    marks = current_marks()
+    if department is not None:
+        marks = marks.filter(student__department=department)
+    if subject is not None:
+        marks = marks.filter(subject=subject)
+    return marks
+
+
+def _totals(department=None, subject=None):
+    return (
+        _marks(department, subject)
+        .values('student')
+        .annotate(total_marks=Sum('marks'), subject_count=Count('subject'))
+    )
+
+
+def leaderboard_queryset(department=None, subject=None, mode='competition'):
+    """
+    Per-student totals ranked by the database, optionally restricted to one
+    department and/or one subject. Slicing the result keeps the ranks computed
+    over the full (filtered) population.
+    """
+    rank_function = RANK_MODES.get(mode, Rank)
+    return (
+        _totals(department, subject)
+        .values(
+            'student',
+            'student__student_id__student_id',
+            'student__student_name',
+            'student__department__department',
+            'total_marks',
+            'subject_count',
+        )
+        .annotate(rank=Window(rank_function(), order_by=F('total_marks').desc()))
+        .order_by('-total_marks', 'student__student_name', 'student')
+    )
+
+
+def leaderboard_position(student, department=None, subject=None):
+    """
+    1-based row position of a student in leaderboard_queryset() ordering, or
+    None if the student has no marks in scope. Used for "jump to my rank".
+    """
+    mine = _marks(department, subject).filter(student=student).aggregate(total=Sum('marks'))['total']
+    if mine is None:
+        return None
+
+    totals = _totals(department, subject)
+    ahead = totals.filter(total_marks__gt=mine).count()
+    tied_ahead = totals.filter(total_marks=mine).filter(
+        Q(student__student_name__lt=student.student_name)
+        | Q(student__student_name=student.student_name, student__lt=student.pk)
+    ).count()
+    return ahead + tied_ahead + 1
+
+
+# -------------------------------------------------------------------
+# --- PERSISTED RANKS ---
+# -------------------------------------------------------------------
+
+def rebuild_ranks(batch_size=1000):
+    """Recomputes every StudentRank row from the current term's marks with window functions."""
+    ranked = (
+        current_marks().values('student', 'student__department')
+        .annotate(total_marks=Sum('marks'))
+        .annotate(
+            rank=Window(Rank(), order_by=F('total_marks').desc()),
+            department_rank=Window(
+                Rank(),
+                partition_by=F('student__department'),
+                order_by=F('total_marks').desc(),
+            ),
+        )
+        .order_by()
+    )
+
+    with transaction.atomic():
+        StudentRank.objects.all().delete()
+        batch = []
+        written = 0
+        for row in ranked.iterator(chunk_size=batch_size):
+            batch.append(StudentRank(
+                student_id=row['student'],
+                department_id=row['student__department'],
+                total_marks=row['total_marks'],
+                rank=row['rank'],
+                department_rank=row['department_rank'],
+            ))
+            if len(batch) >= batch_size:
+                StudentRank.objects.bulk_create(batch)
+                written += len(batch)
+                batch = []
+        if batch:
+            StudentRank.objects.bulk_create(batch)
+            written += len(batch)
+    return written
+
+
+def refresh_student_ranks(student_ids):
+    student_ids = list(student_ids)
+    if len(student_ids) > FULL_REBUILD_THRESHOLD:
+        # Past this many students one window-function pass beats shifting ranks student by student
+        rebuild_ranks()
+        return
+    for student_id in student_ids:
+        refresh_student_rank(student_id)
+
+
+@transaction.atomic
+def refresh_student_rank(student_id):
+    """
+    Moves one student to their current total. Competition rank is
+    1 + (number of students with a strictly higher total), so only the students
+    whose totals lie between the old and new value need their rank shifted.
+    """
+    current = StudentRank.objects.select_for_update().filter(student_id=student_id).first()
+    stats = current_marks().filter(student_id=student_id).aggregate(
+        total=Sum('marks'), count=Count('pk'),
+    )
+    department_id = Student.objects.filter(pk=student_id).values_list('department', flat=True).first()
+
+    if current is not None and stats['count'] and current.department_id == department_id:
+        _shift(StudentRank.objects.exclude(student_id=student_id), 'rank', current.total_marks, stats['total'])
+        _shift(
+            StudentRank.objects.filter(department_id=department_id).exclude(student_id=student_id),
+            'department_rank', current.total_marks, stats['total'],
+        )
+    else:
+        if current is not None:
+            remove_rank_contribution(current)
+        if department_id is None or not stats['count']:
+            return
+        _add_contribution(student_id, department_id, stats['total'])
+
+    others = StudentRank.objects.exclude(student_id=student_id)
+    StudentRank.objects.update_or_create(
+        student_id=student_id,
+        defaults={
+            'department_id': department_id,
+            'total_marks': stats['total'],
+            'rank': others.filter(total_marks__gt=stats['total']).count() + 1,
+            'department_rank': others.filter(
+                department_id=department_id, total_marks__gt=stats['total'],
+            ).count() + 1,
+        },
+    )
+
+
+def _shift(queryset, field, old_total, new_total):
+    if new_total > old_total:
+        queryset.filter(total_marks__gte=old_total, total_marks__lt=new_total).update(**{field: F(field) + 1})
+    elif new_total < old_total:
+        queryset.filter(total_marks__gte=new_total, total_marks__lt=old_total).update(**{field: F(field) - 1})
+
+
+def _add_contribution(student_id, department_id, total):
+    others = StudentRank.objects.exclude(student_id=student_id).filter(total_marks__lt=total)
+    others.update(rank=F('rank') + 1)
+    others.filter(department_id=department_id).update(department_rank=F('department_rank') + 1)
+
+
+def remove_rank_contribution(current):
+    """Undoes the rank shift a StudentRank row imposes on the students below it."""
+    below = StudentRank.objects.exclude(pk=current.pk).filter(total_marks__lt=current.total_marks)
+    below.update(rank=F('rank') - 1)
+    below.filter(department_id=current.department_id).update(department_rank=F('department_rank') - 1)
+    current.delete()
@@ -0,0 +1,145 @@
+# students/report_cards.py
+#
+# Printable report cards (marks, rank, attendance, fee status) for one
+# department or the whole school, written into a ZIP archive with one HTML
+# file per student.
+#
+#   - Students are read in chunks of REPORT_CHUNK_SIZE, each chunk in three
+#     queries (student_overviews() plus one for the marks), and turned into
+#     plain dicts.
+#   - The dicts are rendered in a process pool; each process compiles the
+#     template once and reuses it, as the cached loader would.
+#   - The archive is written as chunks come back, in order, with only a few
+#     chunks in flight, so memory stays flat however many students there are,
+#     and the next chunk is read while the previous ones render.
+
+import datetime
+import functools
+import multiprocessing
+import os
+import zipfile
+from collections import defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.template.loader import get_template
+from django.utils.text import get_valid_filename
+
+from .analytics import pass_mark
+from .models import Student
+from .services import student_overviews
+from .terms import current_marks
+
+REPORT_CHUNK_SIZE = 250
+TEMPLATE_NAME = 'report_card.html'
+
+
+def report_card_students(department=None):
+    students = Student.objects.order_by('department__department', 'student_name', 'pk')
+    if department is not None:
+        students = students.filter(department=department)
+    return students
+
+
+def _fee_status(overview):
+    if not overview.outstanding_fees:
+        return 'Cleared'
+    return 'Late' if overview.late_fees else 'Pending'
+
+
+def report_card_rows(student_pks, passing=None):
+    """Picklable report-card contexts for these students, in the given order (three queries)."""
+    passing = pass_mark() if passing is None else passing
+    overviews = student_overviews(Student.objects.filter(pk__in=student_pks))
+    marks = defaultdict(list)
+    for student_pk, subject, mark in (
+        current_marks().filter(student__in=student_pks)
+        .order_by('student', 'subject__subject_name')
+        .values_list('student', 'subject__subject_name', 'marks')
+    ):
+        marks[student_pk].append({'subject': subject, 'marks': mark, 'passed': mark >= passing})
+
+    rows = []
+    for pk in student_pks:
+        overview = overviews.get(pk)
+        if overview is None:
+            continue  # deleted since the ids were read
+        student, rank = overview.student, overview.rank
+        rows.append({
+            'student_id': student.student_id.student_id,
+            'name': student.student_name,
+            'email': student.student_email,
+            'department': student.department.department,
+            'marks': marks[pk],
+            'total_marks': overview.total_marks,
+            'percentage': overview.percentage,
+            'failed_subjects': sum(1 for row in marks[pk] if not row['passed']),
+            'rank': rank.rank if rank else None,
+            'department_rank': rank.department_rank if rank else None,
+            'present_days': overview.present_days,
+            'total_days': overview.total_days,
+            'attendance_percentage': overview.attendance_percentage,
+            'outstanding_fees': overview.outstanding_fees,
+            'paid_fees': overview.paid_fees,
+            'fee_status': _fee_status(overview),
+        })
+    return rows
+
+
+@functools.lru_cache(maxsize=None)
+def _template():
+    # Compiled once per process even when DEBUG turns the cached loader off.
+    return get_template(TEMPLATE_NAME)
+
+
+def _entry_name(row):
+    return f"{get_valid_filename(row['department']) or 'department'}/{get_valid_filename(row['student_id'])}.html"
+
+
+def render_report_cards(rows, context):
+    """[(archive path, html)] for report_card_rows() output; runs in the pool processes."""
+    template = _template()
+    return [(_entry_name(row), template.render({**context, 'card': row})) for row in rows]
+
+
+def _rendered_chunks(chunks, context, workers):
+    if workers <= 1:
+        for chunk in chunks:
+            yield render_report_cards(report_card_rows(chunk, context['pass_mark']), context)
+        return
+
+    # Spawned so no process inherits the database connection; they only render.
+    with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('spawn'),
+                             initializer=django.setup) as executor:
+        in_flight = deque()
+        for chunk in chunks:
+            in_flight.append(executor.submit(
+                render_report_cards, report_card_rows(chunk, context['pass_mark']), context,
+            ))
+            if len(in_flight) >= workers * 2:
+                yield in_flight.popleft().result()
+        while in_flight:
+            yield in_flight.popleft().result()
+
+
+def write_report_cards(fileobj, department=None, workers=None, chunk_size=REPORT_CHUNK_SIZE, progress=None):
+    """
+    Writes a ZIP of report cards (one HTML file per student, in a folder per
+    department) to a binary file object and returns the number written.
+    `progress(done, total)` is called after every chunk.
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    student_pks = list(report_card_students(department).values_list('pk', flat=True))
+    chunks = (student_pks[start:start + chunk_size] for start in range(0, len(student_pks), chunk_size))
+    context = {'pass_mark': pass_mark(), 'generated_on': datetime.date.today()}
+
+    written = 0
+    with zipfile.ZipFile(fileobj, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for cards in _rendered_chunks(chunks, context, workers):
+            for name, html in cards:
+                archive.writestr(name, html)
+            written += len(cards)
+            if progress:
+                progress(written, len(student_pks))
+    return written
@@ -0,0 +1,152 @@
+# students/roles.py
+#
+# Request-scoped role resolution. ProfileMiddleware attaches to every request:
+#   - request.role_info: RoleInfo(role, student_id, related_student_id), read
+#     from the session, where it is stored at login, so role checks cost no
+#     query;
+#   - request.profile: the Profile with its linked students select_related,
+#     loaded at most once per request and only when a view touches it.
+# The session copy is tagged with the profile's pk and Profile.version (bumped
+# on every save, and when a linked student is deleted). The current tag is read
+# from the cache, reloaded from the Profile table on a miss and dropped when
+# the profile changes, so an admin edit takes effect on the user's next request
+# (at most SMS_PROFILE_VERSION_TIMEOUT seconds later in other processes when
+# the cache is per process). Both always read the primary, also inside
+# @use_replica views. role_required() replaces the per-view role checks.
+
+import functools
+from dataclasses import asdict, dataclass
+from typing import Optional
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib import messages
+from django.contrib.auth import logout
+from django.contrib.auth.signals import user_logged_in
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.dispatch import receiver
+from django.http import JsonResponse
+from django.shortcuts import redirect
+
+from .models import Profile
+
+SESSION_KEY = '_sms_role'
+
+
+@dataclass(frozen=True)
+class RoleInfo:
+    role: Optional[str] = None
+    student_id: Optional[int] = None
+    related_student_id: Optional[int] = None
+
+    @property
+    def linked_student_id(self):
+        """The student a student/parent account looks at."""
+        return self.related_student_id if self.role == 'parent' else self.student_id
+
+
+NO_ROLE = RoleInfo()
+
+
+def _version_key(user_pk):
+    return f'profile:version:{user_pk}'
+
+
+def _version_tag(profile):
+    return [profile.pk, profile.version] if profile else []
+
+
+def profile_version(user_pk):
+    """[profile pk, version] of the user's profile ([] without one): cache first, the Profile table on a miss."""
+    tag = cache.get(_version_key(user_pk))
+    if tag is None:
+        row = Profile.objects.using(DEFAULT_DB_ALIAS).filter(user_id=user_pk).values_list('pk', 'version').first()
+        tag = list(row) if row else []
+        cache.set(_version_key(user_pk), tag, getattr(settings, 'SMS_PROFILE_VERSION_TIMEOUT', 30))
+    return tag
+
+
+def expire_profile_versions(user_pks):
+    """Drops the cached tags once Profile.version has changed (signals.py, on commit)."""
+    cache.delete_many([_version_key(user_pk) for user_pk in user_pks])
+
+
+def load_profile(user):
+    if not user.is_authenticated:
+        return None
+    return (
+        Profile.objects.using(DEFAULT_DB_ALIAS)
+        .select_related('student__department', 'student__student_id', 'related_student')
+        .filter(user=user)
+        .first()
+    )
+
+
+def remember_role(request, profile, user=None):
+    """Stores the role and linked student ids of `profile` (of `user`, request.user by default) in the session."""
+    user = user or request.user
+    info = RoleInfo(profile.role, profile.student_id, profile.related_student_id) if profile else NO_ROLE
+    tag = _version_tag(profile)
+    cache.add(_version_key(user.pk), tag, getattr(settings, 'SMS_PROFILE_VERSION_TIMEOUT', 30))
+    request.session[SESSION_KEY] = {'user': user.pk, 'version': tag, **asdict(info)}
+    return info
+
+
+@receiver(user_logged_in, dispatch_uid='sms-remember-role')
+def remember_role_at_login(sender, request, user, **kwargs):
+    """
+    Every login (the login page, the admin, Client.force_login) stores the role
+    in the new session, so the first request after it does not look it up.
+    """
+    if request is not None and hasattr(request, 'session'):
+        request.profile = load_profile(user)
+        remember_role(request, request.profile, user=user)
+
+
+def resolve_role(request):
+    if not request.user.is_authenticated:
+        return NO_ROLE
+    stored = request.session.get(SESSION_KEY)
+    if stored and stored['user'] == request.user.pk and stored['version'] == profile_version(request.user.pk):
+        return RoleInfo(stored['role'], stored['student_id'], stored['related_student_id'])
+    return remember_role(request, request.profile)
+
+
+def _allowed(request, roles, linked):
+    info = request.role_info
+    return info.role in roles and bool(not linked or info.linked_student_id)
+
+
+def role_required(*roles, linked=False, message="Access denied.", logout_user=False, json=False):
+    """
+    Lets the view run only for users whose role is in `roles` (and, with
+    linked=True, whose profile is linked to a student). Otherwise: a JSON 403
+    (json=True), or an error message and a redirect home, logging the user
+    out first with logout_user=True. Use below @login_required. Works on
+    async views too; the session/profile lookups then run in a worker thread.
+    """
+    def deny(request):
+        if json:
+            return JsonResponse({'error': message}, status=403)
+        messages.error(request, message)
+        if logout_user:
+            logout(request)
+        return redirect('home')
+
+    def decorator(view_func):
+        if iscoroutinefunction(view_func):
+            @functools.wraps(view_func)
+            async def async_wrapper(request, *args, **kwargs):
+                if await sync_to_async(_allowed)(request, roles, linked):
+                    return await view_func(request, *args, **kwargs)
+                return await sync_to_async(deny)(request)
+            return async_wrapper
+
+        @functools.wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            if _allowed(request, roles, linked):
+                return view_func(request, *args, **kwargs)
+            return deny(request)
+        return wrapper
+    return decorator
@@ -0,0 +1,130 @@
+# students/routers.py
+#
+# Read-replica routing for the heavy read-only pages. Views opt in with
+# @use_replica; while such a view (or the streaming response it returns) runs,
+# ReplicaRouter sends reads of the students app's models to the
+# settings.SMS_READ_REPLICA alias. Everything else keeps using 'default':
+# writes, sessions/auth, every other view, and any request from a user who
+# wrote something in the last SMS_REPLICA_READ_YOUR_WRITES seconds (recorded
+# by ReadYourWritesMiddleware). A missing or unreachable replica falls back to
+# the primary. `manage.py refresh_replica` snapshots db.sqlite3 into the
+# replica file for local use.
+
+import functools
+import logging
+import os
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import DatabaseError, connections
+
+logger = logging.getLogger('students.routers')
+
+LAST_WRITE_SESSION_KEY = '_sms_last_write'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+_read_alias = ContextVar('sms_read_alias', default=None)
+
+
+def replica_alias():
+    """The configured replica alias if it can be used right now, else None."""
+    alias = getattr(settings, 'SMS_READ_REPLICA', None)
+    if not alias or alias not in connections.databases:
+        return None
+    connection = connections[alias]
+    if connection.vendor == 'sqlite':
+        # Connecting to a missing SQLite file creates an empty database, so
+        # only use a file that holds a snapshot.
+        name = str(connection.settings_dict['NAME'])
+        return alias if os.path.exists(name) and os.path.getsize(name) > 0 else None
+    try:
+        connection.ensure_connection()
+    except DatabaseError:
+        logger.warning("Read replica %r is unreachable; reading from the primary.", alias)
+        return None
+    return alias
+
+
+def wrote_recently(request):
+    window = getattr(settings, 'SMS_REPLICA_READ_YOUR_WRITES', 30)
+    last_write = request.session.get(LAST_WRITE_SESSION_KEY) if hasattr(request, 'session') else None
+    return last_write is not None and time.time() - last_write < window
+
+
+def record_write(request):
+    if hasattr(request, 'session') and request.user.is_authenticated:
+        request.session[LAST_WRITE_SESSION_KEY] = time.time()
+
+
+def _stream_from(alias, iterable):
+    """Re-applies the replica choice around every chunk a streaming response produces."""
+    iterator = iter(iterable)
+    while True:
+        token = _read_alias.set(alias)
+        try:
+            chunk = next(iterator)
+        except StopIteration:
+            return
+        finally:
+            _read_alias.reset(token)
+        yield chunk
+
+
+def _alias_for(request):
+    if request.method in SAFE_METHODS and not wrote_recently(request):
+        return replica_alias()
+    return None
+
+
+def use_replica(view_func):
+    """Routes the view's model reads to the read replica (GET/HEAD only, see module docstring)."""
+    if iscoroutinefunction(view_func):
+        @functools.wraps(view_func)
+        async def async_wrapper(request, *args, **kwargs):
+            # The context variable is copied into the threads sync_to_async runs queries in
+            alias = await sync_to_async(_alias_for)(request)
+            token = _read_alias.set(alias)
+            try:
+                return await view_func(request, *args, **kwargs)
+            finally:
+                _read_alias.reset(token)
+        return async_wrapper
+
+    @functools.wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        alias = _alias_for(request)
+        if alias is None:
+            return view_func(request, *args, **kwargs)
+
+        token = _read_alias.set(alias)
+        try:
+            response = view_func(request, *args, **kwargs)
+        finally:
+            _read_alias.reset(token)
+        if getattr(response, 'streaming', False):
+            response.streaming_content = _stream_from(alias, response.streaming_content)
+        return response
+    return wrapper
+
+
+class ReplicaRouter:
+    """Reads go to the replica inside @use_replica views; all writes and migrations go to the primary."""
+
+    route_app_labels = {'students'}
+
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label in self.route_app_labels:
+            return _read_alias.get()
+        return None
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replica is a copy of the primary, so objects from either may be related.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == 'default'
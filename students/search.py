@@ -0,0 +1,107 @@
+# students/search.py
+#
+# Student search backed by an SQLite FTS5 index (students_student_fts, created
+# by migration 0007) over name, student ID, e-mail and department. The index
+# is kept in sync by the Student / StudentID / Department signal receivers and
+# rebuilt by `manage.py rebuild_search_index`. Each search term is matched as a
+# prefix, so "ali stu-12" finds "Alice ..." with ID "STU-1234"; results are
+# ordered by bm25 relevance. Databases without FTS5 fall back to LIKE filters.
+
+import re
+
+from django.db import OperationalError, connection, connections
+from django.db.models import FloatField, Q
+from django.db.models.expressions import RawSQL
+
+from .models import Student
+
+FTS_TABLE = 'students_student_fts'
+_TOKENS = re.compile(r'\w+', re.UNICODE)
+
+_INDEX_SQL = f"""
+    INSERT INTO {FTS_TABLE} (rowid, student_name, student_id, student_email, department)
+    SELECT s.id, s.student_name, sid.student_id, s.student_email, d.department
+    FROM students_student s
+    JOIN students_studentid sid ON sid.id = s.student_id_id
+    JOIN students_department d ON d.id = s.department_id
+"""
+
+_available = {}
+
+
+def fts_available(using=None):
+    alias = using or connection.alias
+    if alias not in _available:
+        conn = connections[alias]
+        if conn.vendor != 'sqlite':
+            _available[alias] = False
+        else:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [FTS_TABLE])
+                _available[alias] = cursor.fetchone() is not None
+    return _available[alias]
+
+
+def match_expression(query):
+    """Turns free text into an FTS5 MATCH string: every token must match as a prefix."""
+    tokens = _TOKENS.findall(query.lower())
+    return ' '.join(f'"{token}"*' for token in tokens) or None
+
+
+def search_students(queryset, query):
+    """Filters a Student queryset by `query`, ordered by relevance when FTS5 is available."""
+    match = match_expression(query or '')
+    if match is None:
+        return queryset
+    if not fts_available(queryset.db):
+        return queryset.filter(
+            Q(student_name__icontains=query) | Q(student_id__student_id__icontains=query)
+            | Q(student_email__icontains=query) | Q(department__department__icontains=query)
+        )
+
+    # A join against the virtual table is the one thing the ORM cannot express,
+    # hence extra(). FTS5's hidden `rank` column is the bm25 score (lower is
+    # better); as an annotation it can be filtered on too, which the keyset
+    # pages of the student list do (students/pagination.py).
+    return queryset.extra(
+        tables=[FTS_TABLE],
+        where=[f'{FTS_TABLE}.rowid = {Student._meta.db_table}.id', f'{FTS_TABLE} MATCH %s'],
+        params=[match],
+    ).annotate(
+        search_rank=RawSQL(f'{FTS_TABLE}.rank', [], output_field=FloatField()),
+    ).order_by('search_rank', 'pk')
+
+
+# -------------------------------------------------------------------
+# --- INDEX MAINTENANCE ---
+# -------------------------------------------------------------------
+
+def _execute(sql, params=()):
+    if not fts_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+
+
+def index_students(where, params=()):
+    """(Re)indexes the students matched by an SQL condition on `s` (students_student)."""
+    _execute(f"DELETE FROM {FTS_TABLE} WHERE rowid IN (SELECT s.id FROM students_student s WHERE {where})", params)
+    _execute(f"{_INDEX_SQL} WHERE {where}", params)
+
+
+def unindex_student(student_pk):
+    _execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [student_pk])
+
+
+def rebuild_search_index():
+    """Re-creates every index row from the Student table. Returns False without FTS5."""
+    if not fts_available():
+        return False
+    try:
+        _execute(f"DELETE FROM {FTS_TABLE}")
+        _execute(_INDEX_SQL)
+        _execute(f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('optimize')")
+    except OperationalError:
+        _available.pop(connection.alias, None)
+        raise
+    return True
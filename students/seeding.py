@@ -0,0 +1,217 @@
+# students/seeding.py
+#
+# Bulk data generation for development, demos and benchmarks. Lives outside
+# views.py so web workers never import Faker. Everything is written with
+# batched bulk_create() calls inside one transaction; signal-maintained tables
+# (attendance bitmaps, summaries, ranks, term rollups, cached analytics) are rebuilt once at the end because
+# bulk_create() does not send post_save.
+
+import datetime
+import random
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models.functions import Length
+
+from .models import Attendance, Department, FeeRecord, Student, StudentID, Subject, SubjectMarks
+from .terms import current_term_id
+
+DEFAULT_DEPARTMENTS = ["Computer Science", "Information Technology", "Electronics", "Mechanical", "Civil"]
+DEFAULT_SUBJECTS = [
+    "Data Structures and Algorithm", "Database Management System", "Object Oriented Programming",
+    "Operating Systems", "Computer Networks", "Software Engineering",
+]
+MONTHLY_FEE = Decimal('2500.00')
+
+
+def _faker(seed=None):
+    from faker import Faker  # imported lazily: only seeding needs it
+
+    fake = Faker()
+    if seed is not None:
+        fake.seed_instance(seed)
+    return fake
+
+
+def _batched(objects, model, batch_size):
+    """bulk_create()s a lazy stream of instances without materialising it. Returns the row count."""
+    created = 0
+    batch = []
+    for obj in objects:
+        batch.append(obj)
+        if len(batch) >= batch_size:
+            model.objects.bulk_create(batch, batch_size=batch_size)
+            created += len(batch)
+            batch = []
+    if batch:
+        model.objects.bulk_create(batch, batch_size=batch_size)
+        created += len(batch)
+    return created
+
+
+def _school_days(days, today):
+    """Weekdays in the `days` calendar days ending today (oldest first)."""
+    start = today - datetime.timedelta(days=days - 1)
+    for offset in range(days):
+        day = start + datetime.timedelta(days=offset)
+        if day.weekday() < 5:
+            yield day
+
+
+def _next_seed_number(start=100000):
+    """The number after the highest 'STU-<number>' ID (a longer number is larger, then compare as text)."""
+    highest = (
+        StudentID.objects.filter(student_id__regex=r'^STU-[0-9]+$')
+        .annotate(length=Length('student_id'))
+        .order_by('-length', '-student_id')
+        .values_list('student_id', flat=True)
+        .first()
+    )
+    return max(start, int(highest[4:]) + 1) if highest else start
+
+
+def rebuild_derived_data():
+    """Recomputes everything the signal receivers would normally keep current."""
+    from .bitmaps import rebuild_attendance_bitmaps
+    from .ranking import rebuild_ranks
+    from .search import rebuild_search_index
+    from .summary import rebuild_student_summaries
+    from .terms import rebuild_term_rollups
+    from .versions import TRACKED, bump_data_versions
+
+    rebuild_attendance_bitmaps()
+    rebuild_student_summaries()
+    rebuild_ranks()
+    rebuild_term_rollups()
+    bump_data_versions(TRACKED)
+    rebuild_search_index()
+
+
+def seed_dataset(students=1000, departments=None, subjects=None, attendance_days=365, fee_months=12,
+                 seed=42, batch_size=5000, log=print, rebuild=True):
+    """
+    Generates a reproducible school: departments, subjects, `students` students
+    with one mark per subject, weekday attendance for the last `attendance_days`
+    days and monthly fee records for the last `fee_months` months.
+    Returns a dict of row counts per model.
+    """
+    rng = random.Random(seed)
+    fake = _faker(seed)
+    today = datetime.date.today()
+    counts = {}
+
+    with transaction.atomic():
+        department_objs = [
+            Department.objects.get_or_create(department=name)[0]
+            for name in (DEFAULT_DEPARTMENTS if departments is None else departments)
+        ]
+        subject_objs = [
+            Subject.objects.get_or_create(subject_name=name)[0]
+            for name in (DEFAULT_SUBJECTS if subjects is None else subjects)
+        ]
+
+        # Student IDs and e-mails are derived from a running number, so no
+        # uniqueness round trips are needed. Numbering continues after the
+        # highest seeded number (at least six digits, so never one of the
+        # four-digit IDs created by hand or by seed_db()).
+        offset = _next_seed_number()
+        student_pks = []
+        for start in range(0, students, batch_size):
+            numbers = range(offset + start, offset + min(start + batch_size, students))
+            student_ids = StudentID.objects.bulk_create(
+                [StudentID(student_id=f"STU-{number}") for number in numbers]
+            )
+            student_pks.extend(student.pk for student in Student.objects.bulk_create([
+                Student(
+                    department=rng.choice(department_objs),
+                    student_id=student_id,
+                    student_name=fake.name(),
+                    student_email=f"student{number}@example.edu",
+                    student_age=rng.randint(18, 25),
+                    student_address=fake.address(),
+                )
+                for number, student_id in zip(numbers, student_ids)
+            ]))
+        counts['students'] = len(student_pks)
+        log(f"✅ {counts['students']} students created.")
+
+        term_id = current_term_id()
+        counts['marks'] = _batched((
+            SubjectMarks(student_id=student_pk, subject=subject, term_id=term_id,
+                         marks=max(0, min(100, round(rng.gauss(62, 18)))))
+            for student_pk in student_pks
+            for subject in subject_objs
+        ), SubjectMarks, batch_size)
+        log(f"✅ {counts['marks']} subject marks created.")
+
+        days = list(_school_days(attendance_days, today))
+        attendance_rates = {student_pk: rng.uniform(0.6, 0.99) for student_pk in student_pks}
+        counts['attendance'] = _batched((
+            Attendance(student_id=student_pk, date=day, is_present=rng.random() < attendance_rates[student_pk])
+            for student_pk in student_pks
+            for day in days
+        ), Attendance, batch_size)
+        log(f"✅ {counts['attendance']} attendance records created.")
+
+        counts['fees'] = _batched(
+            _fee_records(student_pks, fee_months, today, rng), FeeRecord, batch_size,
+        )
+        log(f"✅ {counts['fees']} fee records created.")
+
+    if rebuild:
+        rebuild_derived_data()
+        log("✅ Attendance bitmaps, summaries, ranks, term rollups, analytics and search index rebuilt.")
+    return counts
+
+
+def _fee_records(student_pks, months, today, rng):
+    for student_pk in student_pks:
+        for back in range(months - 1, -1, -1):
+            month = (today.month - back - 1) % 12 + 1
+            year = today.year + (today.month - back - 1) // 12
+            due_date = datetime.date(year, month, 10)
+            roll = rng.random()
+            if due_date > today or roll < 0.1:
+                yield FeeRecord(student_id=student_pk, due_date=due_date, amount_due=MONTHLY_FEE, status='pending')
+            elif roll < 0.2:
+                yield FeeRecord(student_id=student_pk, due_date=due_date, amount_due=MONTHLY_FEE, status='late')
+            else:
+                yield FeeRecord(
+                    student_id=student_pk, due_date=due_date, amount_due=MONTHLY_FEE, amount_paid=MONTHLY_FEE,
+                    status='paid', payment_date=due_date - datetime.timedelta(days=rng.randint(0, 9)),
+                )
+
+
+# -------------------------------------------------------------------
+# --- LEGACY HELPERS (moved from views.py) ---
+# -------------------------------------------------------------------
+
+def seed_subjects():
+    for sub in DEFAULT_SUBJECTS:
+        Subject.objects.get_or_create(subject_name=sub)
+    print("✅ Technical Subjects created successfully.")
+
+
+def seed_db(n=10) -> None:
+    """Adds `n` random students to the existing departments."""
+    if not Department.objects.exists():
+        print("⚠️ No departments found. Please add departments via /admin/ before seeding.")
+        return
+    seed_dataset(students=n, departments=list(Department.objects.values_list('department', flat=True)),
+                 subjects=[], attendance_days=0, fee_months=0, seed=None)
+
+
+def create_subject_marks(n=None):
+    """Gives the first `n` (or all) students a random mark for every subject they are missing."""
+    student_ids = Student.objects.values_list('pk', flat=True)
+    if n:
+        student_ids = student_ids[:n]
+    subject_ids = list(Subject.objects.values_list('pk', flat=True))
+    term_id = current_term_id()
+    SubjectMarks.objects.bulk_create(
+        [SubjectMarks(student_id=student_id, subject_id=subject_id, term_id=term_id, marks=random.randint(0, 100))
+         for student_id in student_ids for subject_id in subject_ids],
+        batch_size=5000,
+        ignore_conflicts=True,
+    )
+    rebuild_derived_data()
@@ -0,0 +1,112 @@
+# students/services.py
+#
+# One place to read a student's academic, attendance and fee summary. The
+# dashboards, the profile page and the bulk report cards all go through
+# student_overviews(), which loads any number of students with their
+# StudentSummary / StudentRank rows joined in and the fee breakdown computed by
+# conditional-aggregate subqueries: two queries whatever the batch size (plus a
+# one-off rebuild for students whose summary row does not exist yet).
+
+from dataclasses import dataclass
+from decimal import Decimal
+from typing import Optional
+
+from django.db.models import DecimalField, Q, Sum
+
+from .models import FeeRecord, Student, StudentRank, StudentSummary, Subject
+from .summary import _per_student, rebuild_student_summaries
+
+
+@dataclass
+class StudentOverview:
+    student: Student
+    summary: StudentSummary
+    rank: Optional[StudentRank]
+    total_subjects: int
+    paid_fees: Decimal
+    late_fees: Decimal
+
+    @property
+    def total_marks(self):
+        return self.summary.total_marks
+
+    @property
+    def subject_count(self):
+        return self.summary.subject_count
+
+    @property
+    def percentage(self):
+        return self.summary.percentage(self.total_subjects)
+
+    @property
+    def present_days(self):
+        return self.summary.present_days
+
+    @property
+    def total_days(self):
+        return self.summary.total_days
+
+    @property
+    def attendance_percentage(self):
+        return self.summary.attendance_percentage
+
+    @property
+    def pending_fees(self):
+        return self.summary.pending_fees
+
+    @property
+    def outstanding_fees(self):
+        # StudentSummary.pending_fees already includes late records
+        return self.summary.pending_fees
+
+
+def _overview_queryset(students):
+    money = DecimalField(max_digits=12, decimal_places=2)
+    fees = FeeRecord.objects.all()
+    return students.select_related('department', 'student_id', 'summary', 'rank').annotate(
+        overview_paid_fees=_per_student(fees, Sum('amount_paid'), money),
+        overview_late_fees=_per_student(fees, Sum('amount_due', filter=Q(status='late')), money),
+    )
+
+
+def _related(student, name):
+    try:
+        return getattr(student, name)
+    except (StudentSummary.DoesNotExist, StudentRank.DoesNotExist):
+        return None
+
+
+def student_overviews(students):
+    """
+    {student_pk: StudentOverview} for a Student queryset (e.g. one department),
+    in the queryset's order.
+    """
+    total_subjects = Subject.objects.count()
+    rows = list(_overview_queryset(students))
+
+    missing = [student.pk for student in rows if _related(student, 'summary') is None]
+    if missing:
+        rebuild_student_summaries(missing)
+        rebuilt = {student.pk: student for student in _overview_queryset(Student.objects.filter(pk__in=missing))}
+        rows = [rebuilt.get(student.pk, student) for student in rows]
+
+    return {
+        student.pk: StudentOverview(
+            student=student,
+            summary=student.summary,
+            rank=_related(student, 'rank'),
+            total_subjects=total_subjects,
+            paid_fees=student.overview_paid_fees,
+            late_fees=student.overview_late_fees,
+        )
+        for student in rows
+    }
+
+
+def student_overview(student):
+    """StudentOverview for one Student (instance or primary key)."""
+    pk = getattr(student, 'pk', student)
+    overviews = student_overviews(Student.objects.filter(pk=pk))
+    if pk not in overviews:
+        raise Student.DoesNotExist(f"No student with pk={pk}")
+    return overviews[pk]
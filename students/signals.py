@@ -0,0 +1,273 @@
+# students/signals.py
+#
+# Keeps denormalized tables in step with the raw SubjectMarks / Attendance /
+# FeeRecord rows (and the student search index in step with Student).
+# Refreshes are deferred until the surrounding transaction commits and
+# de-duplicated per student, so a cascade that deletes hundreds of attendance
+# rows triggers one recompute rather than hundreds.
+
+from django.db import transaction
+from django.db.models import F, Q
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import Signal, receiver
+
+from .bitmaps import rebuild_attendance_bitmaps, use_bitmaps
+from .dashboard_cache import invalidate_all_dashboards, invalidate_dashboards, invalidate_ranked_dashboards
+from .models import (
+    Attendance, Department, ExamTerm, FeeRecord, Profile, Student, StudentID, StudentRank, Subject, SubjectMarks,
+)
+from .ranking import refresh_student_ranks, remove_rank_contribution
+from .roles import expire_profile_versions
+from .search import index_students, unindex_student
+from .summary import rebuild_student_summaries
+from .terms import (
+    current_term_id, rebuild_term_rollups, refresh_rollups_for_department_move, refresh_rollups_for_marks,
+    switch_current_term,
+)
+from .versions import TRACKED, bump_data_versions
+
+
+# Sent by bulk writers (bulk_create / queryset.update bypass post_save) with
+# sender=<model written> and student_ids=<iterable of Student pks touched>.
+student_data_bulk_changed = Signal()
+
+
+class _RefreshBatch:
+    """Student ids (or, for data versions, table names) waiting for the current transaction to commit."""
+
+    def __init__(self, refresh):
+        self.refresh = refresh
+        self.student_ids = set()
+        self.done = False
+
+    def __call__(self):
+        self.done = True
+        self.refresh(self.student_ids)
+
+
+def _schedule(refresh, student_id):
+    connection = transaction.get_connection()
+    if not connection.in_atomic_block:
+        refresh([student_id])
+        return
+
+    # A rolled-back transaction drops its on_commit callbacks, so only reuse a
+    # batch while it is still registered on this connection and has not run
+    # (callbacks run by TestCase.captureOnCommitCallbacks stay registered).
+    batches = connection.__dict__.setdefault('_student_refresh_batches', {})
+    batch = batches.get(refresh)
+    if batch is None or batch.done or not any(func is batch for _, func, _ in connection.run_on_commit):
+        batch = batches[refresh] = _RefreshBatch(refresh)
+        transaction.on_commit(batch)
+    batch.student_ids.add(student_id)
+
+
+def refresh_attendance_bitmaps(student_ids):
+    rebuild_attendance_bitmaps(student_ids)
+    if use_bitmaps():
+        # Summaries read attendance from the bitmaps in this mode, and their
+        # own refresh may have run first in the same commit.
+        rebuild_student_summaries(student_ids)
+        invalidate_dashboards(student_ids)
+
+
+def refresh_ranks(student_ids):
+    refresh_student_ranks(student_ids)
+    invalidate_ranked_dashboards()
+
+
+def schedule_summary_refresh(student_id):
+    _schedule(rebuild_student_summaries, student_id)
+
+
+def schedule_rank_refresh(student_id):
+    _schedule(refresh_ranks, student_id)
+
+
+@receiver(post_save, sender=SubjectMarks)
+@receiver(post_delete, sender=SubjectMarks)
+@receiver(post_save, sender=Attendance)
+@receiver(post_delete, sender=Attendance)
+@receiver(post_save, sender=FeeRecord)
+@receiver(post_delete, sender=FeeRecord)
+def refresh_summary_on_change(sender, instance, **kwargs):
+    schedule_summary_refresh(instance.student_id)
+
+
+@receiver(post_save, sender=Attendance)
+@receiver(post_delete, sender=Attendance)
+def refresh_bitmaps_on_attendance_change(sender, instance, **kwargs):
+    _schedule(refresh_attendance_bitmaps, instance.student_id)
+
+
+@receiver(post_save, sender=SubjectMarks)
+@receiver(post_delete, sender=SubjectMarks)
+def refresh_rank_on_marks_change(sender, instance, **kwargs):
+    schedule_rank_refresh(instance.student_id)
+
+
+@receiver(post_save, sender=Student)
+def refresh_rank_on_department_change(sender, instance, created, **kwargs):
+    if not created:
+        schedule_rank_refresh(instance.pk)
+
+
+@receiver(pre_delete, sender=Student)
+def release_rank_on_student_delete(sender, instance, **kwargs):
+    # The StudentRank row disappears with the cascade, so shift the students
+    # ranked below it now, while its total is still known.
+    current = StudentRank.objects.filter(student=instance).first()
+    if current is not None:
+        remove_rank_contribution(current)
+        transaction.on_commit(invalidate_ranked_dashboards)
+
+
+# The search index lives in the same database, so it is written inside the
+# current transaction rather than on commit.
+@receiver(post_save, sender=Student)
+def index_student_on_save(sender, instance, **kwargs):
+    index_students("s.id = %s", [instance.pk])
+
+
+@receiver(post_delete, sender=Student)
+def unindex_student_on_delete(sender, instance, **kwargs):
+    unindex_student(instance.pk)
+
+
+@receiver(post_save, sender=StudentID)
+def reindex_on_student_id_change(sender, instance, created, **kwargs):
+    if not created:
+        index_students("s.student_id_id = %s", [instance.pk])
+
+
+@receiver(post_save, sender=Department)
+def reindex_on_department_rename(sender, instance, created, **kwargs):
+    if not created:
+        index_students("s.department_id = %s", [instance.pk])
+
+
+# Term rollups: the (term, subject, student) of every changed mark is batched
+# and the cells it falls in are recomputed on commit.
+@receiver(post_save, sender=SubjectMarks)
+@receiver(post_delete, sender=SubjectMarks)
+def refresh_rollups_on_marks_change(sender, instance, **kwargs):
+    _schedule(refresh_rollups_for_marks, (instance.term_id, instance.subject_id, instance.student_id))
+
+
+@receiver(pre_save, sender=Student)
+def remember_department_before_save(sender, instance, **kwargs):
+    if instance.pk is not None:
+        instance._department_before_save = (
+            Student.objects.filter(pk=instance.pk).values_list('department', flat=True).first()
+        )
+
+
+@receiver(post_save, sender=Student)
+def refresh_rollups_on_department_change(sender, instance, created, **kwargs):
+    before = getattr(instance, '_department_before_save', None)
+    if not created and before is not None and before != instance.department_id:
+        moved = {before, instance.department_id}
+        transaction.on_commit(lambda: refresh_rollups_for_department_move(instance.pk, moved))
+
+
+@receiver(pre_save, sender=ExamTerm)
+def remember_current_flag_before_save(sender, instance, **kwargs):
+    instance._was_current = (
+        instance.pk is not None
+        and ExamTerm.objects.filter(pk=instance.pk, is_current=True).exists()
+    )
+
+
+@receiver(post_save, sender=ExamTerm)
+def switch_term_on_change(sender, instance, created, **kwargs):
+    if created and not ExamTerm.objects.exclude(pk=instance.pk).exists():
+        return  # the first term: no marks can have been counted under another one
+    if instance.is_current != instance._was_current:
+        transaction.on_commit(switch_current_term)
+
+
+@receiver(post_delete, sender=ExamTerm)
+def switch_term_on_delete(sender, instance, **kwargs):
+    if instance.is_current:
+        transaction.on_commit(switch_current_term)
+
+
+# Data versions (ETags of the leaderboard / analytics pages, the analytics and
+# department statistics cache keys) move once per committed transaction that
+# wrote these tables.
+@receiver(post_save, sender=SubjectMarks)
+@receiver(post_delete, sender=SubjectMarks)
+@receiver(post_save, sender=Subject)
+@receiver(post_delete, sender=Subject)
+@receiver(post_save, sender=Student)
+@receiver(post_delete, sender=Student)
+@receiver(post_save, sender=Department)
+@receiver(post_delete, sender=Department)
+@receiver(post_save, sender=ExamTerm)
+@receiver(post_delete, sender=ExamTerm)
+@receiver(post_save, sender=Attendance)
+@receiver(post_delete, sender=Attendance)
+@receiver(post_save, sender=FeeRecord)
+@receiver(post_delete, sender=FeeRecord)
+def bump_data_version_on_change(sender, **kwargs):
+    _schedule(bump_data_versions, sender._meta.model_name)
+
+
+# Cached dashboards are dropped after the refreshes above have committed, so a
+# request in between cannot cache the old numbers again.
+@receiver(post_save, sender=SubjectMarks)
+@receiver(post_delete, sender=SubjectMarks)
+@receiver(post_save, sender=Attendance)
+@receiver(post_delete, sender=Attendance)
+@receiver(post_save, sender=FeeRecord)
+@receiver(post_delete, sender=FeeRecord)
+def invalidate_dashboard_on_change(sender, instance, **kwargs):
+    _schedule(invalidate_dashboards, instance.student_id)
+
+
+@receiver(post_save, sender=Student)
+@receiver(post_delete, sender=Student)
+def invalidate_dashboard_on_student_change(sender, instance, **kwargs):
+    _schedule(invalidate_dashboards, instance.pk)
+
+
+@receiver(post_save, sender=StudentID)
+@receiver(post_save, sender=Department)
+@receiver(post_save, sender=Subject)
+@receiver(post_delete, sender=Subject)
+def invalidate_all_dashboards_on_change(sender, created=False, **kwargs):
+    # Subject counts feed every percentage; ID / department renames are rare.
+    if sender is Subject or not created:
+        transaction.on_commit(invalidate_all_dashboards)
+
+
+# Role / linked student ids cached in sessions (students/roles.py) are
+# re-read on the user's next request.
+@receiver(post_save, sender=Profile)
+@receiver(post_delete, sender=Profile)
+def expire_session_role_on_profile_change(sender, instance, **kwargs):
+    transaction.on_commit(lambda: expire_profile_versions([instance.user_id]))
+
+
+@receiver(pre_delete, sender=Student)
+def expire_session_role_on_student_delete(sender, instance, **kwargs):
+    # Profiles are unlinked by SET_NULL, an UPDATE that sends no signals.
+    profiles = Profile.objects.filter(Q(student=instance) | Q(related_student=instance))
+    user_ids = list(profiles.values_list('user_id', flat=True))
+    if user_ids:
+        profiles.update(version=F('version') + 1)
+        transaction.on_commit(lambda: expire_profile_versions(user_ids))
+
+
+@receiver(student_data_bulk_changed)
+def refresh_after_bulk_change(sender, student_ids, **kwargs):
+    student_ids = list(student_ids)
+    rebuild_student_summaries(student_ids)
+    if sender is SubjectMarks:
+        # Bulk writers name the terms they wrote (default: the current one)
+        rebuild_term_rollups(kwargs.get('terms') or [current_term_id()])
+        refresh_student_ranks(student_ids)
+        invalidate_ranked_dashboards()
+    if sender._meta.model_name in TRACKED:
+        bump_data_versions([sender._meta.model_name])
+    invalidate_dashboards(student_ids)
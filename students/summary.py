@@ -0,0 +1,111 @@
+# students/summary.py
+#
+# Maintenance of the denormalized StudentSummary table. The signal handlers in
+# signals.py refresh a single student after each write; the rebuild_summaries
+# management command recomputes everything (e.g. after bulk loads that bypass
+# signals).
+
+from decimal import Decimal
+
+from django.db.models import Count, DecimalField, IntegerField, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+from .bitmaps import popcount, use_bitmaps
+from .models import (
+    UNPAID_FEE_STATUSES, Attendance, AttendanceMonth, FeeRecord, Student, StudentSummary,
+)
+from .terms import current_marks
+
+SUMMARY_FIELDS = ['total_marks', 'subject_count', 'present_days', 'total_days', 'pending_fees']
+
+
+def _per_student(queryset, expression, output_field):
+    """Correlated subquery returning one aggregate for the outer Student row."""
+    subquery = (
+        queryset.filter(student=OuterRef('pk'))
+        .order_by()
+        .values('student')
+        .annotate(value=expression)
+        .values('value')
+    )
+    default = Decimal('0.00') if isinstance(output_field, DecimalField) else 0
+    return Coalesce(Subquery(subquery, output_field=output_field), default, output_field=output_field)
+
+
+def annotate_summary(students):
+    """Annotates a Student queryset with every StudentSummary field in a single query."""
+    integer = IntegerField()
+    money = DecimalField(max_digits=12, decimal_places=2)
+    return students.annotate(
+        summary_total_marks=_per_student(current_marks(), Sum('marks'), integer),
+        summary_subject_count=_per_student(current_marks(), Count('pk'), integer),
+        **_attendance_annotations(integer),
+        summary_pending_fees=_per_student(
+            FeeRecord.objects.filter(status__in=UNPAID_FEE_STATUSES), Sum('amount_due'), money,
+        ),
+    )
+
+
+def _attendance_annotations(integer):
+    if use_bitmaps():
+        months = AttendanceMonth.objects.all()
+        return {
+            'summary_present_days': _per_student(months, Sum(popcount('present_mask')), integer),
+            'summary_total_days': _per_student(months, Sum(popcount('recorded_mask')), integer),
+        }
+    return {
+        'summary_present_days': _per_student(Attendance.objects.all(), Count('pk', filter=Q(is_present=True)), integer),
+        'summary_total_days': _per_student(Attendance.objects.all(), Count('pk'), integer),
+    }
+
+
+def rebuild_student_summaries(student_ids=None, batch_size=1000):
+    """
+    Recomputes StudentSummary rows for the given students (or all students) and
+    upserts them in batches. Returns the number of rows written.
+    """
+    students = Student.objects.order_by('pk')
+    if student_ids is not None:
+        student_ids = list(student_ids)
+        if len(student_ids) > batch_size:
+            # Keeps each IN (...) list well under the database's parameter limit
+            return sum(
+                rebuild_student_summaries(student_ids[start:start + batch_size], batch_size)
+                for start in range(0, len(student_ids), batch_size)
+            )
+        students = students.filter(pk__in=student_ids)
+
+    rows = annotate_summary(students).values('pk', *[f'summary_{name}' for name in SUMMARY_FIELDS])
+
+    written = 0
+    batch = []
+    for row in rows.iterator(chunk_size=batch_size):
+        batch.append(StudentSummary(
+            student_id=row['pk'],
+            **{name: row[f'summary_{name}'] for name in SUMMARY_FIELDS},
+        ))
+        if len(batch) >= batch_size:
+            written += _upsert(batch)
+            batch = []
+    if batch:
+        written += _upsert(batch)
+    return written
+
+
+def _upsert(summaries):
+    StudentSummary.objects.bulk_create(
+        summaries,
+        update_conflicts=True,
+        unique_fields=['student'],
+        update_fields=SUMMARY_FIELDS + ['updated_at'],
+    )
+    return len(summaries)
+
+
+def get_student_summary(student):
+    """Returns the StudentSummary for a student, building it on first access."""
+    summary = StudentSummary.objects.filter(student=student).first()
+    if summary is None:
+        rebuild_student_summaries([student.pk])
+        summary = StudentSummary.objects.get(student=student)
+    return summary
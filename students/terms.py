@@ -0,0 +1,213 @@
+# students/terms.py
+#
+# Exam terms and term rollups.
+#
+#   - current_term_id(): the term new marks go to and every "current" figure
+#     (summaries, ranks, analytics, charts, exports, report cards) is computed
+#     from; current_marks() is SubjectMarks restricted to it. The id is cached
+#     briefly and dropped when terms change; when the current term moves, the
+#     derived tables are rebuilt for the new term (switch_current_term()).
+#   - TermRollup holds count / sum / sum of squares / min / max / fails per
+#     (term, department, subject). Writes schedule the cells they touch and
+#     those cells are recomputed with one GROUP BY per term when the
+#     transaction commits; bulk writers rebuild whole terms. term_trends()
+#     then answers term-over-term questions from a few hundred rollup rows.
+
+import datetime
+import math
+from collections import defaultdict
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, F, Max, Min, Q, Sum
+
+from .models import ExamTerm, Student, SubjectMarks, TermRollup
+
+CURRENT_TERM_KEY = 'exam_term:current'
+CURRENT_TERM_TIMEOUT = 60   # other processes notice a new current term within a minute
+ROLLUP_FIELDS = ['count', 'total', 'sum_squares', 'min_marks', 'max_marks', 'fail_count']
+
+
+# ---------------------------------------------------------------------------
+# CURRENT TERM
+# ---------------------------------------------------------------------------
+
+def current_term_id():
+    """Primary key of the current ExamTerm (the latest one if none is flagged; created if there are none)."""
+    pk = cache.get(CURRENT_TERM_KEY)
+    if pk is None:
+        terms = ExamTerm.objects.order_by('-is_current', '-start_date', '-pk').values_list('pk', flat=True)
+        pk = terms.first()
+        if pk is None:
+            today = datetime.date.today()
+            pk = ExamTerm.objects.get_or_create(
+                name=f'{today.year} Term', defaults={'start_date': today, 'is_current': True},
+            )[0].pk
+        cache.set(CURRENT_TERM_KEY, pk, CURRENT_TERM_TIMEOUT)
+    return pk
+
+
+def current_term():
+    return ExamTerm.objects.get(pk=current_term_id())
+
+
+def current_marks():
+    return SubjectMarks.objects.filter(term_id=current_term_id())
+
+
+def switch_current_term():
+    """Drops the cached current term and rebuilds what is computed from it (after a term change commits)."""
+    from .dashboard_cache import invalidate_all_dashboards
+    from .ranking import rebuild_ranks
+    from .summary import rebuild_student_summaries
+    from .versions import bump_data_versions
+
+    cache.delete(CURRENT_TERM_KEY)
+    rebuild_student_summaries()
+    rebuild_ranks()
+    bump_data_versions(['subjectmarks', 'examterm'])
+    invalidate_all_dashboards()
+
+
+# ---------------------------------------------------------------------------
+# ROLLUPS
+# ---------------------------------------------------------------------------
+
+def _write_rollups(marks, scope):
+    """Recomputes every rollup cell of `marks` and removes the cells in `scope` that no longer have marks."""
+    from .analytics import pass_mark  # analytics reads the current term from this module
+
+    rows = (
+        marks.values('term', 'student__department', 'subject')
+        .annotate(
+            count=Count('pk'),
+            total=Sum('marks'),
+            sum_squares=Sum(F('marks') * F('marks')),
+            min_marks=Min('marks'),
+            max_marks=Max('marks'),
+            fail_count=Count('pk', filter=Q(marks__lt=pass_mark())),
+        )
+        .order_by()
+    )
+    rollups = [
+        TermRollup(term_id=row['term'], department_id=row['student__department'], subject_id=row['subject'],
+                   **{name: row[name] for name in ROLLUP_FIELDS})
+        for row in rows
+    ]
+    with transaction.atomic():
+        TermRollup.objects.bulk_create(
+            rollups,
+            update_conflicts=True,
+            unique_fields=['term', 'department', 'subject'],
+            update_fields=ROLLUP_FIELDS + ['updated_at'],
+        )
+        kept = {(rollup.term_id, rollup.department_id, rollup.subject_id) for rollup in rollups}
+        stale = [
+            pk for pk, *cell in scope.values_list('pk', 'term', 'department', 'subject')
+            if tuple(cell) not in kept
+        ]
+        if stale:
+            TermRollup.objects.filter(pk__in=stale).delete()
+    return len(rollups)
+
+
+def rebuild_term_rollups(terms=None):
+    """Recomputes the rollups of the given terms (all terms by default). Returns the number of cells."""
+    marks, scope = SubjectMarks.objects.all(), TermRollup.objects.all()
+    if terms is not None:
+        marks, scope = marks.filter(term__in=terms), scope.filter(term__in=terms)
+    return _write_rollups(marks, scope)
+
+
+def refresh_term_rollups(cells):
+    """
+    Recomputes the given (term, department, subject) cells, one query per
+    term; a department of None means every department of that term and subject.
+    """
+    by_term = defaultdict(lambda: (set(), set()))
+    for term_id, department_id, subject_id in cells:
+        by_term[term_id][0].add(department_id)
+        by_term[term_id][1].add(subject_id)
+
+    for term_id, (departments, subjects) in by_term.items():
+        marks = SubjectMarks.objects.filter(term_id=term_id, subject__in=subjects)
+        scope = TermRollup.objects.filter(term_id=term_id, subject__in=subjects)
+        if None not in departments:
+            marks = marks.filter(student__department__in=departments)
+            scope = scope.filter(department__in=departments)
+        _write_rollups(marks, scope)
+
+
+def refresh_rollups_for_marks(keys):
+    """Refresh for changed marks given as (term, subject, student) keys (what the signal handlers know)."""
+    keys = list(keys)
+    departments = dict(
+        Student.objects.filter(pk__in={student for _term, _subject, student in keys}).values_list('pk', 'department')
+    )
+    # A student deleted since (cascading to their marks) no longer says which department they were in
+    refresh_term_rollups({(term, departments.get(student), subject) for term, subject, student in keys})
+
+
+def refresh_rollups_for_department_move(student_id, departments):
+    """A student changed department: recompute their cells in both the old and the new one."""
+    pairs = SubjectMarks.objects.filter(student_id=student_id).values_list('term', 'subject').distinct()
+    refresh_term_rollups({(term, department, subject) for term, subject in pairs for department in departments})
+
+
+# ---------------------------------------------------------------------------
+# TRENDS
+# ---------------------------------------------------------------------------
+
+def _statistics(row):
+    count = row['count'] or 0
+    average = row['total'] / count if count else 0
+    variance = row['sum_squares'] / count - average * average if count else 0
+    return {
+        'count': count,
+        'avg_marks': round(average, 2),
+        'std_dev': round(math.sqrt(max(variance, 0)), 2),
+        'min_marks': row['min_marks'],
+        'max_marks': row['max_marks'],
+        'fail_count': row['fail_count'] or 0,
+        'pass_rate': round((count - row['fail_count']) / count * 100, 2) if count else 0,
+    }
+
+
+def term_trends(department=None, subject=None):
+    """
+    Term-over-term statistics from TermRollup, oldest term first:
+
+        {'terms': [ExamTerm, ...],
+         'overall': [stats per term],
+         'subjects': [{'subject': name, 'terms': [stats or None per term]}, ...]}
+
+    where stats = {count, avg_marks, std_dev, min_marks, max_marks,
+    fail_count, pass_rate}. Optionally limited to one department / subject.
+    """
+    rollups = TermRollup.objects.all()
+    if department is not None:
+        rollups = rollups.filter(department=department)
+    if subject is not None:
+        rollups = rollups.filter(subject=subject)
+    aggregates = {
+        'count': Sum('count'), 'total': Sum('total'), 'sum_squares': Sum('sum_squares'),
+        'min_marks': Min('min_marks'), 'max_marks': Max('max_marks'), 'fail_count': Sum('fail_count'),
+    }
+
+    terms = list(ExamTerm.objects.filter(pk__in=rollups.values('term')).order_by('start_date', 'pk'))
+    position = {term.pk: index for index, term in enumerate(terms)}
+
+    overall = [None] * len(terms)
+    for row in rollups.values('term').annotate(**aggregates).order_by():
+        overall[position[row['term']]] = _statistics(row)
+
+    subjects = {}
+    for row in rollups.values('term', 'subject', 'subject__subject_name').annotate(**aggregates).order_by():
+        series = subjects.setdefault(row['subject__subject_name'], [None] * len(terms))
+        series[position[row['term']]] = _statistics(row)
+
+    return {
+        'terms': terms,
+        'overall': overall,
+        'subjects': [{'subject': name, 'terms': series} for name, series in sorted(subjects.items())],
+    }
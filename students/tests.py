@@ -1,3 +1,1156 @@
-from django.test import TestCase
+# students/tests.py
 
-# Create your tests here.
+import csv
+import datetime
+import io
+import json
+import os
+import random
+import statistics
+import tempfile
+import threading
+import time
+import zipfile
+from decimal import Decimal
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.db.models import F
+from django.test import AsyncClient, Client, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from .analytics import pass_mark
+from .attendance import mark_roll_call
+from .benchmarks import SCENARIOS, compare, ensure_fixtures, measure
+from .bitmaps import FULL_MASK, attendance_totals, day_bit, popcount, rebuild_attendance_bitmaps, record_day
+from .concurrency import run_concurrently
+from .dashboard_cache import dashboard_cache_stats
+from .departments import department_statistics
+from .fees import mark_overdue_fees
+from .imports import MarksImportError, import_marks
+from .jobs import JOB_KINDS, JobKind, claim_jobs, enqueue, requeue_stale_jobs, run_job
+from .pagination import cursor_paginate
+from .profiling import QueryProfile, assert_max_queries
+from .models import (
+    Attendance, AttendanceMonth, DataVersion, Department, ExamTerm, FeeRecord, Job, Profile, Student, StudentID,
+    StudentRank, StudentSummary, Subject, SubjectMarks, TermRollup,
+)
+from .queryplan import audit, regressions, to_report
+from .ranking import leaderboard_position, leaderboard_queryset, rebuild_ranks
+from .search import FTS_TABLE, fts_available, rebuild_search_index, search_students
+from .seeding import _next_seed_number, seed_dataset
+from .services import student_overview, student_overviews
+from .summary import SUMMARY_FIELDS, rebuild_student_summaries
+from .terms import current_marks, rebuild_term_rollups, term_trends
+from .report_cards import report_card_rows, report_card_students, write_report_cards
+from .routers import _read_alias
+from .versions import _key, bump_data_versions, data_versions
+
+
+class SessionRoleTests(TestCase):
+    """The role cached in the session follows Profile edits (students/roles.py)."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('staff', password='pw')
+        self.profile = Profile.objects.create(user=self.user, role='staff')
+        self.client.force_login(self.user)
+
+    def test_demotion_applies_after_cache_loss(self):
+        self.assertEqual(self.client.get('/fees/').status_code, 200)
+        self.profile.role = 'student'
+        self.profile.save()
+        cache.clear()
+        self.assertEqual(self.client.get('/fees/').status_code, 302)
+
+    def test_recreated_profile_is_not_mistaken_for_the_old_one(self):
+        self.assertEqual(self.client.get('/fees/').status_code, 200)
+        self.profile.delete()
+        Profile.objects.create(user=self.user, role='student')
+        cache.clear()
+        self.assertEqual(self.client.get('/fees/').status_code, 302)
+
+
+class DataVersionTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def test_bump_is_seen_at_once_by_this_process(self):
+        before = data_versions('subjectmarks')['subjectmarks']
+        bump_data_versions(['subjectmarks'])
+        self.assertEqual(data_versions('subjectmarks')['subjectmarks'], before + 1)
+
+    def test_bump_by_another_process_is_seen_after_the_timeout(self):
+        bump_data_versions(['subjectmarks'])
+        data_versions('subjectmarks')
+        # Another process bumps the table; this process's cache is not told
+        DataVersion.objects.filter(name='subjectmarks').update(version=10)
+        self.assertEqual(data_versions('subjectmarks')['subjectmarks'], 1)
+        with mock.patch('django.core.cache.backends.locmem.time.time', return_value=time.time() + 60):
+            self.assertEqual(data_versions('subjectmarks')['subjectmarks'], 10)
+
+
+    def test_replica_counters_are_cached_apart(self):
+        bump_data_versions(['subjectmarks'])
+        cache.set(_key('subjectmarks', 'replica'), 0)   # a replica that has not caught up
+        token = _read_alias.set('replica')
+        try:
+            self.assertEqual(data_versions('subjectmarks')['subjectmarks'], 0)
+        finally:
+            _read_alias.reset(token)
+        self.assertEqual(data_versions('subjectmarks')['subjectmarks'], 1)
+
+
+def make_school(students=30, seed=1):
+    """Three departments, three subjects and `students` students with marks, attendance and fees."""
+    rnd = random.Random(seed)
+    departments = [Department.objects.create(department=name) for name in ('CS', 'EE', 'ME')]
+    subjects = [Subject.objects.create(subject_name=name) for name in ('Maths', 'Physics', 'English')]
+    for index in range(students):
+        student = Student.objects.create(
+            department=departments[index % 3],
+            student_id=StudentID.objects.create(student_id=f'STU-{1000 + index}'),
+            student_name=f'Student {index:03d}', student_email=f's{index}@example.com', student_address='Pune',
+        )
+        for subject in subjects:
+            SubjectMarks.objects.create(student=student, subject=subject, marks=rnd.randint(0, 100))
+        for day in range(3):
+            Attendance.objects.create(
+                student=student, date=datetime.date(2025, 1, 1) + datetime.timedelta(days=day),
+                is_present=rnd.random() > 0.3,
+            )
+        FeeRecord.objects.create(
+            student=student, amount_due=Decimal('100.00'), status='pending', due_date=datetime.date(2025, 1, 1),
+        )
+    return departments, subjects
+
+
+class DerivedTablesTests(TestCase):
+    """
+    StudentSummary, StudentRank and TermRollup are maintained incrementally by
+    the signal receivers; after any write they must equal a full rebuild.
+    """
+
+    def setUp(self):
+        cache.clear()   # the current term id is cached; each test rolls its term back
+        with self.captureOnCommitCallbacks(execute=True):
+            self.departments, self.subjects = make_school()
+
+    def snapshot(self):
+        return {
+            'summaries': sorted(StudentSummary.objects.values_list('student', *SUMMARY_FIELDS)),
+            'ranks': sorted(StudentRank.objects.values_list(
+                'student', 'department', 'total_marks', 'rank', 'department_rank',
+            )),
+            'rollups': sorted(TermRollup.objects.values_list(
+                'term', 'department', 'subject', 'count', 'total', 'sum_squares', 'min_marks', 'max_marks',
+                'fail_count',
+            )),
+        }
+
+    def assertMatchesRebuild(self):
+        incremental = self.snapshot()
+        rebuild_student_summaries()
+        rebuild_ranks()
+        rebuild_term_rollups()
+        rebuilt = self.snapshot()
+        for table in rebuilt:
+            self.assertEqual(incremental[table], rebuilt[table], table)
+
+    def test_after_creates(self):
+        self.assertEqual(StudentRank.objects.count(), 30)
+        self.assertMatchesRebuild()
+
+    def test_mark_edits(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            for mark in SubjectMarks.objects.order_by('pk')[:10]:
+                mark.marks = 100 - mark.marks
+                mark.save()
+        self.assertMatchesRebuild()
+
+    def test_mark_edit_to_a_tie(self):
+        top, second = StudentRank.objects.order_by('rank')[:2]
+        mark = SubjectMarks.objects.filter(student=second.student_id).first()
+        with self.captureOnCommitCallbacks(execute=True):
+            mark.marks += top.total_marks - second.total_marks
+            mark.save()
+        self.assertMatchesRebuild()
+
+    def test_mark_deletes(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            SubjectMarks.objects.filter(student__student_name='Student 004').first().delete()
+            for mark in SubjectMarks.objects.filter(student__student_name='Student 005'):
+                mark.delete()
+        self.assertFalse(StudentRank.objects.filter(student__student_name='Student 005').exists())
+        self.assertMatchesRebuild()
+
+    def test_attendance_and_fee_changes(self):
+        student = Student.objects.get(student_name='Student 007')
+        with self.captureOnCommitCallbacks(execute=True):
+            Attendance.objects.filter(student=student).first().delete()
+            FeeRecord.objects.create(
+                student=student, amount_due=Decimal('40.00'), status='late', due_date=datetime.date(2025, 2, 1),
+            )
+        self.assertMatchesRebuild()
+
+    def test_department_moves(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            for student in Student.objects.filter(department=self.departments[0])[:3]:
+                student.department = self.departments[1]
+                student.save()
+        self.assertMatchesRebuild()
+
+    def test_student_deletes(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            StudentRank.objects.order_by('rank').first().student.delete()
+            Student.objects.get(student_name='Student 010').delete()
+        self.assertEqual(StudentRank.objects.count(), 28)
+        self.assertMatchesRebuild()
+
+    def test_new_student(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            student = Student.objects.create(
+                department=self.departments[2], student_id=StudentID.objects.create(student_id='STU-2000'),
+                student_name='Late Joiner', student_email='late@example.com', student_address='Pune',
+            )
+            SubjectMarks.objects.create(student=student, subject=self.subjects[0], marks=100)
+        self.assertMatchesRebuild()
+
+
+class LeaderboardTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        cs, ee = Department.objects.create(department='CS'), Department.objects.create(department='EE')
+        maths, physics = Subject.objects.create(subject_name='Maths'), Subject.objects.create(subject_name='Physics')
+        self.departments = {'CS': cs, 'EE': ee}
+        self.maths = maths
+        for index, (name, department, marks) in enumerate([
+            ('Dev', ee, (50, 50)), ('Bela', cs, (85, 85)), ('Chen', ee, (95, 60)), ('Asha', cs, (90, 80)),
+        ]):
+            student = Student.objects.create(
+                department=department, student_id=StudentID.objects.create(student_id=f'STU-{index}'),
+                student_name=name, student_email=f'{name.lower()}@example.com', student_address='Pune',
+            )
+            SubjectMarks.objects.create(student=student, subject=maths, marks=marks[0])
+            SubjectMarks.objects.create(student=student, subject=physics, marks=marks[1])
+
+    def board(self, **filters):
+        return [
+            (row['student__student_name'], row['total_marks'], row['rank'])
+            for row in leaderboard_queryset(**filters)
+        ]
+
+    def test_ties_share_a_rank(self):
+        self.assertEqual(self.board(), [('Asha', 170, 1), ('Bela', 170, 1), ('Chen', 155, 3), ('Dev', 100, 4)])
+        self.assertEqual(
+            self.board(mode='dense'), [('Asha', 170, 1), ('Bela', 170, 1), ('Chen', 155, 2), ('Dev', 100, 3)],
+        )
+
+    def test_filters_rank_within_the_filtered_population(self):
+        self.assertEqual(self.board(department=self.departments['EE']), [('Chen', 155, 1), ('Dev', 100, 2)])
+        self.assertEqual(
+            self.board(subject=self.maths), [('Chen', 95, 1), ('Asha', 90, 2), ('Bela', 85, 3), ('Dev', 50, 4)],
+        )
+
+    def test_position_follows_the_queryset_order(self):
+        for position, row in enumerate(leaderboard_queryset(), start=1):
+            student = Student.objects.get(pk=row['student'])
+            self.assertEqual(leaderboard_position(student), position)
+
+    def test_jump_to_rank(self):
+        make_school(students=30)
+        rows = list(leaderboard_queryset())
+        target = rows[26]   # on page 2 of 25
+        user = User.objects.create_user('staff', password='pw')
+        Profile.objects.create(user=user, role='staff')
+        self.client.force_login(user)
+        self.client.get('/')
+        response = self.client.get('/leaderboard/', {'student': target['student__student_id__student_id']})
+        self.assertEqual(response.context['page_obj'].number, 2)
+        self.assertEqual(response.context['highlight'], target['student'])
+        row = next(row for row in response.context['leaderboard'] if row['student_pk'] == target['student'])
+        self.assertEqual(row['rank'], target['rank'])
+
+
+class ChartApiTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            make_school(students=3)
+        user = User.objects.create_user('staff', password='pw')
+        Profile.objects.create(user=user, role='staff')
+        self.client.force_login(user)
+        self.url = '/api/charts/?students=STU-1000,STU-1001&from=2025-01-01&to=2025-01-31'
+
+    def get(self, etag=None):
+        headers = {'HTTP_IF_NONE_MATCH': etag} if etag else {}
+        with QueryProfile() as profile:
+            response = self.client.get(self.url, **headers)
+        writes = [query['sql'] for query in profile.queries if query['sql'].lstrip().upper().startswith(
+            ('INSERT', 'UPDATE', 'DELETE'),
+        )]
+        self.assertEqual(writes, [])
+        return response
+
+    def test_unchanged_data_is_not_modified(self):
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        first = response.json()['students'][0]
+        self.assertEqual(first['student_id'], 'STU-1000')
+        self.assertEqual(first['attendance']['total'], 3)
+        self.assertEqual(first['marks']['subjects'], ['English', 'Maths', 'Physics'])
+        self.assertEqual(self.get(response['ETag']).status_code, 304)
+
+    def test_subject_rename_changes_the_etag(self):
+        etag = self.get()['ETag']
+        subject = Subject.objects.get(subject_name='Physics')
+        subject.subject_name = 'Applied Physics'
+        with self.captureOnCommitCallbacks(execute=True):
+            subject.save()
+        response = self.get(etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Applied Physics', response.json()['students'][0]['marks']['subjects'])
+
+    def test_missing_summaries_are_not_built(self):
+        StudentSummary.objects.all().delete()
+        etag = self.get()['ETag']
+        self.assertFalse(StudentSummary.objects.exists())
+        self.assertEqual(self.get(etag).status_code, 304)
+
+
+class MarksImportTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        department = Department.objects.create(department='CS')
+        Subject.objects.create(subject_name='Maths')
+        Student.objects.create(
+            department=department, student_id=StudentID.objects.create(student_id='STU-1'),
+            student_name='Asha', student_email='asha@example.com', student_address='Pune',
+        )
+
+    def test_non_finite_marks_are_row_errors(self):
+        data = "student_id,subject,marks\nSTU-1,Maths,inf\nSTU-1,Maths,1e400\nSTU-1,Maths,nan\nSTU-1,Maths,72\n"
+        result = import_marks(io.BytesIO(data.encode()), 'marks.csv')
+        self.assertEqual(result.error_count, 3)
+        self.assertEqual([error.line for error in result.errors], [2, 3, 4])
+        self.assertIn('not a finite number', result.errors[0].message)
+        self.assertEqual(list(SubjectMarks.objects.values_list('marks', flat=True)), [72])
+
+    def test_unreadable_files_are_import_errors(self):
+        for data, filename, message in [
+            (b"student_id,subject,marks\nSTU-1,Maths,\xff\xfe90\n", 'marks.csv', 'not UTF-8 text'),
+            (b"not a zip", 'marks.xlsx', 'not a valid .xlsx workbook'),
+        ]:
+            with self.subTest(filename), self.assertRaisesMessage(MarksImportError, message):
+                import_marks(io.BytesIO(data), filename)
+
+    def test_admin_reports_an_unreadable_file_on_the_form(self):
+        self.client.force_login(User.objects.create_superuser('admin', password='pw'))
+        upload = SimpleUploadedFile('marks.xlsx', b"not a zip")
+        response = self.client.post('/admin/students/subjectmarks/import/', {'file': upload})
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'not a valid .xlsx workbook')
+
+    def test_repeated_rows_count_once(self):
+        data = "student_id,subject,marks\nSTU-1,Maths,60\nSTU-1,Maths,65\n"
+        result = import_marks(io.BytesIO(data.encode()), 'marks.csv', batch_size=1)
+        self.assertEqual((result.rows, result.imported), (2, 1))
+        self.assertEqual(list(SubjectMarks.objects.values_list('marks', flat=True)), [65])
+
+
+class SubjectAnalyticsTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        make_school(students=12)
+        user = User.objects.create_user('staff', password='pw')
+        Profile.objects.create(user=user, role='staff')
+        self.client.force_login(user)
+        self.client.get('/')   # the session already holds the role, as on any later visit
+
+    def test_cold_request_within_budget(self):
+        # session, user, data versions, profile version, current term and the two grouped queries
+        cache.clear()
+        with assert_max_queries(7):
+            response = self.client.get('/analytics/subjects/')
+        self.assertEqual(response.status_code, 200)
+        maths = next(row for row in response.context['analytics'] if row['subject_name'] == 'Maths')
+        marks = list(SubjectMarks.objects.filter(subject__subject_name='Maths').values_list('marks', flat=True))
+        self.assertEqual(maths['avg_marks'], round(sum(marks) / len(marks), 2))
+
+    @override_settings(SMS_QUERY_PROFILER=True, SMS_QUERY_BUDGET_STRICT=True)
+    def test_first_request_of_a_new_session_within_budget(self):
+        # Logging in stores the role, so the first request costs no role lookup
+        # (the profiler raises past the view's @query_budget)
+        logins = {
+            'login page': lambda client: client.post('/login/', {'username': 'staff', 'password': 'pw'}),
+            'force_login': lambda client: client.force_login(User.objects.get(username='staff')),
+        }
+        for name, login in logins.items():
+            with self.subTest(name):
+                client = Client()
+                login(client)
+                cache.clear()
+                with QueryProfile() as profile:
+                    response = client.get('/analytics/subjects/')
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(profile.count, 7)
+
+    def test_cached_request_skips_the_aggregates(self):
+        self.client.get('/analytics/subjects/')
+        with assert_max_queries(2):
+            self.client.get('/analytics/subjects/')
+
+
+QUERYPLAN_BASELINE = os.path.join(os.path.dirname(__file__), 'testdata', 'queryplan-tests.json')
+
+
+class SeededViewsTests(TestCase):
+    """
+    Every benchmark scenario (students/benchmarks.py) against a small seeded
+    school. After an intended query-plan change, rewrite the baseline with
+    SMS_UPDATE_QUERYPLAN_BASELINE=1 manage.py test students.tests.SeededViewsTests
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cache.clear()
+        seed_dataset(students=120, attendance_days=30, fee_months=3, log=lambda *args: None)
+        cls.fixtures = ensure_fixtures()
+
+    def setUp(self):
+        cache.clear()
+
+    def test_no_query_plan_regressions(self):
+        issues = audit(min_rows=100)
+        if os.environ.get('SMS_UPDATE_QUERYPLAN_BASELINE'):
+            with open(QUERYPLAN_BASELINE, 'w') as handle:
+                json.dump(to_report(issues), handle, indent=2)
+        with open(QUERYPLAN_BASELINE) as handle:
+            baseline = json.load(handle)
+        new = regressions(issues, baseline)
+        self.assertEqual(new, [], "new table scans / temp B-trees:\n" + "\n".join(issue.detail for issue in new))
+
+    @override_settings(SMS_QUERY_PROFILER=True, SMS_QUERY_BUDGET_STRICT=True)
+    def test_cold_requests_within_view_budgets(self):
+        clients = {}
+        for role, user in self.fixtures['users'].items():
+            clients[role] = Client()
+            clients[role].force_login(user)
+            clients[role].get('/')   # stores the role in the session
+        for scenario in SCENARIOS:
+            with self.subTest(scenario.name):
+                cache.clear()
+                # The profiler raises once a view exceeds its @query_budget
+                response = scenario.request(clients[scenario.role], self.fixtures)
+                self.assertEqual(response.status_code, 200)
+
+    def test_cached_dashboards(self):
+        client = Client()
+        client.force_login(self.fixtures['users']['student'])
+        client.get('/dashboard/student/')
+        with assert_max_queries(4, max_similar=1):
+            client.get('/dashboard/student/')
+
+
+class BenchmarkTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        make_school(students=6)
+        self.fixtures = ensure_fixtures()
+        self.client.force_login(self.fixtures['users']['staff'])
+        self.client.get('/')
+
+    def test_reports_the_cold_query_count(self):
+        scenario = next(scenario for scenario in SCENARIOS if scenario.name == 'subject_analytics')
+        cache.clear()
+        with QueryProfile() as cold:
+            scenario.request(self.client, self.fixtures)
+        result = measure(scenario, self.client, self.fixtures, repeat=3)
+        self.assertEqual(result['queries'], cold.count)
+        self.assertLess(result['warm_queries'], result['queries'])
+
+        baseline = {'subject_analytics': dict(result, queries=result['queries'] - 1)}
+        self.assertEqual(compare({'subject_analytics': result}, baseline), [
+            f"subject_analytics: queries {result['queries'] - 1} -> {result['queries']}",
+        ])
+
+
+class BenchmarkReplicaTests(TransactionTestCase):
+    """prepare_tier_database() mirrors the replica onto the tier database; its reads must be counted too."""
+
+    databases = {'default', 'replica'}
+
+    def test_counts_replica_queries(self):
+        cache.clear()
+        make_school(students=6)
+        fixtures = ensure_fixtures()
+        client = Client()
+        client.force_login(fixtures['users']['staff'])
+        client.get('/')
+        scenario = next(scenario for scenario in SCENARIOS if scenario.name == 'student_leaderboard')
+
+        with override_settings(SMS_READ_REPLICA=None):
+            primary = measure(scenario, client, fixtures)
+        # The test mirror is an in-memory database, which replica_alias() would not trust
+        with mock.patch('students.routers.replica_alias', return_value='replica'), QueryProfile() as profile:
+            replica = measure(scenario, client, fixtures)
+        self.assertIn('replica', {query['alias'] for query in profile.queries})
+        self.assertEqual(replica['queries'], primary['queries'])
+        self.assertEqual(replica['warm_queries'], primary['warm_queries'])
+
+
+class StudentListPagingTests(TestCase):
+
+    def setUp(self):
+        department = Department.objects.create(department='CS')
+        for index in range(25):
+            # Longer names score worse (bm25) but sort first by name; ties within each length
+            Student.objects.create(
+                department=department, student_id=StudentID.objects.create(student_id=f'STU-{index:03d}'),
+                student_name=f'{"Aaron " * (index % 4)}Alice {index:03d}', student_email=f'a{index}@example.com',
+                student_address='Pune',
+            )
+        Student.objects.create(
+            department=department, student_id=StudentID.objects.create(student_id='STU-999'),
+            student_name='Bob Rao', student_email='bob@example.com', student_address='Pune',
+        )
+
+    def walk(self, queryset):
+        forward, page = [], cursor_paginate(queryset, per_page=10)
+        pages = [page]
+        forward.extend(page)
+        while page.has_next:
+            page = cursor_paginate(queryset, page.next_cursor, per_page=10)
+            pages.append(page)
+            forward.extend(page)
+        backward = list(page)
+        while page.has_previous:
+            page = cursor_paginate(queryset, page.previous_cursor, per_page=10)
+            backward[:0] = list(page)
+        return [student.pk for student in forward], [student.pk for student in backward]
+
+    def test_search_results_keep_relevance_order(self):
+        results = search_students(Student.objects.all(), 'ali')
+        expected = list(results.values_list('pk', flat=True))
+        self.assertEqual(len(expected), 25)
+        ranks = list(results.values_list('search_rank', flat=True))
+        self.assertEqual(ranks, sorted(ranks))
+        self.assertNotEqual(expected, list(results.order_by('student_name', 'pk').values_list('pk', flat=True)))
+        self.assertEqual(self.walk(results), (expected, expected))
+
+    def test_plain_list_in_name_order(self):
+        expected = list(Student.objects.order_by('student_name', 'pk').values_list('pk', flat=True))
+        self.assertEqual(self.walk(Student.objects.all()), (expected, expected))
+
+
+class ProcessFeesCommandTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def test_invalid_dates_are_command_errors(self):
+        for value in ('2025-02-30', '2025-13-01', 'yesterday', '17/10/2025'):
+            with self.subTest(value), self.assertRaisesMessage(CommandError, 'Invalid --date'):
+                call_command('process_fees', date=value, stdout=io.StringIO())
+
+    def test_marks_overdue_fees_late(self):
+        make_school(students=3)
+        out = io.StringIO()
+        call_command('process_fees', date='2025-03-01', stdout=out)
+        self.assertIn('3 overdue fee records marked late', out.getvalue())
+        self.assertEqual(FeeRecord.objects.filter(status='late').count(), 3)
+
+    def test_overdue_fees_keep_summaries(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            make_school(students=3)
+        summaries = sorted(StudentSummary.objects.values_list('student', *SUMMARY_FIELDS))
+        version = data_versions('feerecord')['feerecord']
+        with mock.patch('students.signals.rebuild_student_summaries') as rebuild, \
+                self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(mark_overdue_fees(today=datetime.date(2025, 3, 1)), 3)
+        rebuild.assert_not_called()
+        self.assertEqual(sorted(StudentSummary.objects.values_list('student', *SUMMARY_FIELDS)), summaries)
+        self.assertGreater(data_versions('feerecord')['feerecord'], version)
+
+
+class SeedingTests(TestCase):
+
+    def test_numbers_continue_after_the_highest_id(self):
+        self.assertEqual(_next_seed_number(), 100000)
+        for student_id in ('STU-1234', 'STU-100004', 'STU-99999', 'STU-100010', 'STU-X1'):
+            StudentID.objects.create(student_id=student_id)
+        self.assertEqual(_next_seed_number(), 100011)
+
+    def test_seeding_twice_after_a_deletion(self):
+        cache.clear()
+        seed_dataset(students=3, attendance_days=2, fee_months=1, log=lambda *args: None, rebuild=False)
+        StudentID.objects.order_by('pk').first().delete()
+        seed_dataset(students=3, attendance_days=2, fee_months=1, log=lambda *args: None, rebuild=False)
+        self.assertEqual(Student.objects.count(), 5)
+
+
+class ExportTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.departments, self.subjects = make_school(students=6)
+        user = User.objects.create_user('staff', password='pw')
+        Profile.objects.create(user=user, role='staff')
+        self.client.force_login(user)
+
+    def export(self, kind, **params):
+        response = self.client.get(f'/exports/{kind}.csv', params)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        chunks = [chunk.decode() for chunk in response.streaming_content]
+        return chunks, list(csv.reader(io.StringIO(''.join(chunks))))
+
+    def test_marks_export_is_a_wide_pivot(self):
+        chunks, rows = self.export('marks')
+        self.assertEqual(chunks[0], 'student_id,student_name,department,Maths,Physics,English,total\r\n')
+        self.assertEqual(len(rows), 7)
+        for row in rows[1:]:
+            marks = dict(SubjectMarks.objects.filter(student__student_id__student_id=row[0]).values_list(
+                'subject__subject_name', 'marks',
+            ))
+            self.assertEqual(row[3:6], [str(marks['Maths']), str(marks['Physics']), str(marks['English'])])
+            self.assertEqual(int(row[6]), sum(marks.values()))
+
+    def test_marks_export_imports_back_unchanged(self):
+        before = sorted(SubjectMarks.objects.values_list('student', 'subject', 'marks'))
+        chunks, _rows = self.export('marks')
+        SubjectMarks.objects.all().delete()
+        result = import_marks(io.BytesIO(''.join(chunks).encode()), 'marks_export.csv')
+        self.assertEqual((result.imported, result.error_count), (18, 0))
+        self.assertEqual(sorted(SubjectMarks.objects.values_list('student', 'subject', 'marks')), before)
+
+    def test_filters(self):
+        _chunks, rows = self.export('attendance', department=self.departments[0].pk, date_from='2025-01-02')
+        self.assertEqual(rows[0], ['student_id', 'student_name', 'department', 'date', 'is_present'])
+        self.assertEqual(len(rows) - 1, 2 * 2)   # two CS students, two days from 2 Jan
+        self.assertEqual({row[2] for row in rows[1:]}, {'CS'})
+        self.assertEqual({row[3] for row in rows[1:]}, {'2025-01-02', '2025-01-03'})
+
+    def test_unknown_export_and_non_staff(self):
+        self.assertEqual(self.client.get('/exports/grades.csv').status_code, 404)
+        other = User.objects.create_user('parent', password='pw')
+        Profile.objects.create(user=other, role='parent')
+        self.client.force_login(other)
+        self.assertEqual(self.client.get('/exports/students.csv').status_code, 302)
+
+
+class RollCallTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.departments, _subjects = make_school(students=6)
+        self.cs = list(Student.objects.filter(department=self.departments[0]).order_by('pk'))
+        self.date = datetime.date(2025, 1, 10)
+
+    def attendance(self):
+        return dict(Attendance.objects.filter(date=self.date).values_list('student', 'is_present'))
+
+    def test_resubmitting_overwrites_the_day(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            result = mark_roll_call(self.departments[0], self.date, [self.cs[0].pk])
+        self.assertEqual(result, {'marked': 2, 'present': 1, 'absent': 1})
+        with self.captureOnCommitCallbacks(execute=True):
+            mark_roll_call(self.departments[0], self.date, [self.cs[1].pk])
+        self.assertEqual(self.attendance(), {self.cs[0].pk: True, self.cs[1].pk: False})
+
+        bitmaps = {row.student_id: row for row in AttendanceMonth.objects.filter(month=datetime.date(2025, 1, 1))}
+        self.assertEqual(bitmaps[self.cs[0].pk].present_mask & day_bit(self.date), day_bit(self.date))
+        self.assertEqual(bitmaps[self.cs[1].pk].present_mask & day_bit(self.date), 0)
+        summary = StudentSummary.objects.get(student=self.cs[1])
+        self.assertEqual(
+            (summary.present_days, summary.total_days),
+            attendance_totals([self.cs[1].pk])[self.cs[1].pk],
+        )
+
+    def test_json_api(self):
+        user = User.objects.create_user('staff', password='pw')
+        Profile.objects.create(user=user, role='staff')
+        self.client.force_login(user)
+        url = '/api/attendance/roll-call/'
+        body = {'department': self.departments[0].pk, 'date': '2025-01-10', 'absent': ['STU-1000']}
+        response = self.client.post(url, json.dumps(body), content_type='application/json')
+        self.assertEqual(response.json(), {'department': self.departments[0].pk, 'date': '2025-01-10',
+                                           'marked': 2, 'present': 1, 'absent': 1})
+        self.assertEqual(self.attendance(), {self.cs[0].pk: False, self.cs[1].pk: True})
+
+        # STU-1001 is in EE
+        response = self.client.post(url, json.dumps(dict(body, absent=['STU-1001'])), content_type='application/json')
+        self.assertEqual((response.status_code, response.json()['student_ids']), (400, ['STU-1001']))
+        response = self.client.post(url, '{"date": "2025-01-10"}', content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+
+class AttendanceBitmapTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.departments, _subjects = make_school(students=6)
+
+    def test_sql_popcount_matches_python(self):
+        rnd = random.Random(9)
+        masks = [0, 1, FULL_MASK, 1 << 30, 0x55555555 & FULL_MASK] + [rnd.getrandbits(31) for _ in range(40)]
+        AttendanceMonth.objects.all().delete()
+        students = list(Student.objects.all())
+        AttendanceMonth.objects.bulk_create([
+            AttendanceMonth(student=students[index % len(students)], month=datetime.date(2000 + index, 1, 1),
+                            present_mask=mask & masks[-index], recorded_mask=mask)
+            for index, mask in enumerate(masks)
+        ])
+        window = 0x0000FFFF
+        for row in AttendanceMonth.objects.annotate(
+            present=popcount('present_mask'), recorded=popcount('recorded_mask'),
+            windowed=popcount(F('recorded_mask').bitand(window)),
+        ):
+            self.assertEqual(row.present, bin(row.present_mask).count('1'))
+            self.assertEqual(row.recorded, bin(row.recorded_mask).count('1'))
+            self.assertEqual(row.windowed, bin(row.recorded_mask & window).count('1'))
+
+    def test_record_day_matches_a_rebuild(self):
+        date = datetime.date(2025, 1, 20)
+        students = Student.objects.filter(department=self.departments[0])
+        absent = list(students.order_by('pk').values_list('pk', flat=True)[:1])
+        # The per-row bitmap refresh waits for a commit that never comes here: only record_day() patches them
+        for student in students:
+            Attendance.objects.create(student=student, date=date, is_present=student.pk not in absent)
+        record_day(students, date, absent)
+        recorded = sorted(AttendanceMonth.objects.values_list('student', 'month', 'present_mask', 'recorded_mask'))
+        rebuild_attendance_bitmaps()
+        self.assertEqual(
+            sorted(AttendanceMonth.objects.values_list('student', 'month', 'present_mask', 'recorded_mask')), recorded,
+        )
+
+    def test_totals_agree_across_storages(self):
+        student_pks = list(Student.objects.values_list('pk', flat=True))
+        rows = attendance_totals(student_pks)
+        with override_settings(SMS_ATTENDANCE_STORAGE='bitmap'):
+            self.assertEqual(attendance_totals(student_pks), rows)
+
+
+class SearchIndexTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.departments, _subjects = make_school(students=6)
+        self.assertTrue(fts_available())
+
+    def found(self, query):
+        return list(search_students(Student.objects.all(), query).values_list('student_name', flat=True))
+
+    def index_rows(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT rowid, student_name, student_id, student_email, department FROM {FTS_TABLE}')
+            return sorted(cursor.fetchall())
+
+    def test_prefix_terms(self):
+        self.assertEqual(self.found('stud stu-1003'), ['Student 003'])
+        self.assertEqual(sorted(self.found('ee')), ['Student 001', 'Student 004'])
+
+    def test_index_follows_saves_renames_and_deletes(self):
+        student = Student.objects.get(student_name='Student 002')
+        student.student_name = 'Zara Khan'
+        student.save()
+        self.assertEqual(self.found('zara'), ['Zara Khan'])
+        self.assertEqual(self.found('student 002'), [])
+
+        student_id = student.student_id
+        student_id.student_id = 'STU-9002'
+        student_id.save()
+        self.assertEqual(self.found('stu-9002'), ['Zara Khan'])
+
+        department = self.departments[2]
+        department.department = 'Mechatronics'
+        department.save()
+        self.assertEqual(sorted(self.found('mechatron')), ['Student 005', 'Zara Khan'])
+
+        Student.objects.get(student_name='Student 005').delete()
+        self.assertEqual(self.found('mechatron'), ['Zara Khan'])
+
+        incremental = self.index_rows()
+        rebuild_search_index()
+        self.assertEqual(self.index_rows(), incremental)
+
+
+class DashboardCacheTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.departments, self.subjects = make_school(students=6)
+        self.student = Student.objects.get(student_name='Student 000')
+        self.clients = {}
+        for role in ('student', 'parent'):
+            user = User.objects.create_user(role, password='pw')
+            Profile.objects.create(
+                user=user, role=role,
+                student=self.student if role == 'student' else None,
+                related_student=self.student if role == 'parent' else None,
+            )
+            self.clients[role] = Client()
+            self.clients[role].force_login(user)
+
+    def dashboard(self, role):
+        return self.clients[role].get(f'/dashboard/{role}/').context
+
+    def test_hits_until_the_student_changes(self):
+        self.dashboard('student')
+        self.dashboard('student')
+        self.assertEqual(dashboard_cache_stats(), {'hits': 1, 'misses': 1, 'hit_rate': 50.0})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            FeeRecord.objects.create(
+                student=self.student, amount_due=Decimal('40.00'), status='pending', due_date=datetime.date(2025, 2, 1),
+            )
+        self.assertEqual(self.dashboard('student')['pending_fees'], Decimal('140.00'))
+        self.assertEqual(dashboard_cache_stats()['misses'], 2)
+
+    def test_other_students_marks_only_retire_ranked_dashboards(self):
+        self.dashboard('student')
+        self.dashboard('parent')
+        other = SubjectMarks.objects.exclude(student=self.student).first()
+        other.marks = 100 if other.marks < 100 else 0
+        with self.captureOnCommitCallbacks(execute=True):
+            other.save()
+        self.dashboard('parent')
+        self.assertEqual(dashboard_cache_stats()['hits'], 1)
+        self.assertEqual(self.dashboard('student')['rank'].rank, StudentRank.objects.get(student=self.student).rank)
+        self.assertEqual(dashboard_cache_stats()['misses'], 3)
+
+    def test_subject_changes_retire_every_dashboard(self):
+        self.dashboard('student')
+        self.dashboard('parent')
+        with self.captureOnCommitCallbacks(execute=True):
+            Subject.objects.create(subject_name='Chemistry')
+        self.dashboard('student')
+        self.dashboard('parent')
+        self.assertEqual(dashboard_cache_stats(), {'hits': 0, 'misses': 4, 'hit_rate': 0})
+
+
+class StudentOverviewTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.departments, _subjects = make_school(students=9)
+            for index, fee in enumerate(FeeRecord.objects.order_by('pk')):
+                fee.status = ('paid', 'late', 'pending')[index % 3]
+                fee.amount_paid = fee.amount_due if fee.status == 'paid' else Decimal('0.00')
+                fee.save()
+
+    def figures(self, overview):
+        return (overview.student.pk, overview.total_marks, overview.attendance_percentage, overview.paid_fees,
+                overview.late_fees, overview.outstanding_fees, overview.rank and overview.rank.rank)
+
+    def test_batch_matches_single_lookups_in_two_queries(self):
+        for students in (Student.objects.filter(department=self.departments[0]), Student.objects.all()):
+            students = students.order_by('-student_name')
+            with QueryProfile() as profile:
+                overviews = student_overviews(students)
+            self.assertEqual(profile.count, 2)
+            self.assertEqual(list(overviews), list(students.values_list('pk', flat=True)))
+            for pk, overview in overviews.items():
+                self.assertEqual(self.figures(overview), self.figures(student_overview(pk)))
+
+        paid = {overview.student.student_name: overview.paid_fees for overview in overviews.values()}
+        self.assertEqual(paid['Student 000'], Decimal('100.00'))
+        self.assertEqual(paid['Student 001'], Decimal('0.00'))
+
+    def test_missing_summaries_are_built(self):
+        StudentSummary.objects.filter(student__student_name='Student 004').delete()
+        overviews = student_overviews(Student.objects.all())
+        student = Student.objects.get(student_name='Student 004')
+        self.assertEqual(
+            overviews[student.pk].total_marks,
+            sum(SubjectMarks.objects.filter(student=student).values_list('marks', flat=True)),
+        )
+        self.assertTrue(StudentSummary.objects.filter(student=student).exists())
+
+    def test_unknown_student_raises(self):
+        with self.assertRaises(Student.DoesNotExist):
+            student_overview(Student.objects.order_by('-pk').first().pk + 1)
+
+
+class AsyncViewTests(TransactionTestCase):
+    """The async views read through worker threads, so their data must be committed."""
+
+    def setUp(self):
+        cache.clear()
+        make_school(students=6)
+        staff = User.objects.create_user('staff', password='pw')
+        Profile.objects.create(user=staff, role='staff')
+        pupil = User.objects.create_user('pupil', password='pw')
+        Profile.objects.create(user=pupil, role='student', student=Student.objects.get(student_name='Student 001'))
+        self.staff, self.pupil = staff, pupil
+
+    def test_run_concurrently_uses_worker_threads(self):
+        results = async_to_sync(run_concurrently)(
+            first=lambda: threading.current_thread().name,
+            students=Student.objects.count,
+        )
+        self.assertTrue(results['first'].startswith('sms-query'))
+        self.assertEqual(results['students'], 6)
+
+    def test_staff_dashboard_matches_the_sync_view(self):
+        client, async_client = Client(), AsyncClient()
+        client.force_login(self.staff)
+        async_client.force_login(self.staff)
+        expected = client.get('/dashboard/staff/').context
+        response = async_to_sync(async_client.get)('/async/dashboard/staff/')
+        self.assertEqual(response.status_code, 200)
+        for key in ('total_students', 'total_departments', 'avg_performance', 'pending_fee_count', 'late_fee_count'):
+            self.assertEqual(response.context[key], expected[key], key)
+        self.assertEqual(list(response.context['departments']), list(expected['departments']))
+
+    def test_attendance_chart_matches_the_sync_view(self):
+        client, async_client = Client(), AsyncClient()
+        client.force_login(self.pupil)
+        async_client.force_login(self.pupil)
+        expected = client.get('/api/attendance/chart/').json()
+        response = async_to_sync(async_client.get)('/async/api/attendance/chart/')
+        self.assertEqual(response.json(), expected)
+
+
+class JobQueueTests(TransactionTestCase):
+    """run_job() releases its connection like a finished request, so these run outside a test transaction."""
+
+    def setUp(self):
+        cache.clear()
+        self.calls = []
+
+    def flaky(self, job, fail=True):
+        self.calls.append(job.attempts)
+        if fail:
+            raise RuntimeError("boom")
+        return "done"
+
+    def test_each_job_is_claimed_once(self):
+        first, second = enqueue('mark_overdue_fees'), enqueue('mark_overdue_fees')
+        self.assertEqual(claim_jobs('w1', 1), [first.pk])
+        self.assertEqual(claim_jobs('w2', 5), [second.pk])
+        self.assertEqual(claim_jobs('w3', 5), [])
+        job = Job.objects.get(pk=first.pk)
+        self.assertEqual((job.status, job.worker, job.attempts), ('running', 'w1', 1))
+
+    def test_failures_are_retried_with_backoff_then_failed(self):
+        with mock.patch.dict(JOB_KINDS, flaky=JobKind('flaky', "Flaky", self.flaky)), \
+                override_settings(SMS_JOB_RETRY_DELAY=60), self.assertLogs('students.jobs', 'ERROR'):
+            job = enqueue('flaky', max_attempts=2)
+            claim_jobs('w1', 1)
+            self.assertEqual(run_job(job.pk), 'queued')
+            job.refresh_from_db()
+            self.assertIn('RuntimeError: boom', job.error)
+            self.assertGreater(job.run_after, timezone.now() + datetime.timedelta(seconds=50))
+            self.assertEqual(claim_jobs('w1', 1), [])  # not due yet
+
+            Job.objects.filter(pk=job.pk).update(run_after=timezone.now())
+            self.assertEqual(claim_jobs('w1', 1), [job.pk])
+            self.assertEqual(run_job(job.pk), 'failed')
+            self.assertEqual(self.calls, [1, 2])
+
+            retried = enqueue('flaky', params={'fail': False})
+            claim_jobs('w1', 1)
+            self.assertEqual(run_job(retried.pk), 'succeeded')
+            self.assertEqual(Job.objects.get(pk=retried.pk).message, "done")
+
+    def test_stale_running_jobs_are_requeued(self):
+        job = enqueue('mark_overdue_fees', max_attempts=2)
+        claim_jobs('w1', 1)
+        stale = timezone.now() - datetime.timedelta(hours=1)
+        Job.objects.filter(pk=job.pk).update(updated_at=stale)
+        self.assertEqual(requeue_stale_jobs(), 1)
+        self.assertEqual(Job.objects.get(pk=job.pk).status, 'queued')
+
+        claim_jobs('w2', 1)
+        Job.objects.filter(pk=job.pk).update(updated_at=stale)
+        requeue_stale_jobs()
+        self.assertEqual(Job.objects.get(pk=job.pk).status, 'failed')
+
+    def test_runworker_runs_the_queue(self):
+        make_school(students=3)
+        with tempfile.TemporaryDirectory() as media, override_settings(MEDIA_ROOT=media):
+            job = enqueue('export', params={'export': 'students'})
+            out = io.StringIO()
+            call_command('runworker', '--burst', '--concurrency', '2', '--poll-interval', '0.05', stdout=out)
+            job.refresh_from_db()
+            self.assertEqual(job.status, 'succeeded', job.error)
+            with job.result.open('r') as result:
+                rows = list(csv.reader(result))
+        self.assertEqual(len(rows), 4)
+        self.assertIn('Queue empty after 1 jobs', out.getvalue())
+
+
+class ReportCardTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.departments, _subjects = make_school(students=7)
+
+    def archive(self, department=None, workers=1, chunk_size=3):
+        progress = []
+        buffer = io.BytesIO()
+        written = write_report_cards(buffer, department, workers=workers, chunk_size=chunk_size,
+                                     progress=lambda done, total: progress.append((done, total)))
+        with zipfile.ZipFile(buffer) as archive:
+            cards = {name: archive.read(name).decode() for name in archive.namelist()}
+        return written, progress, cards
+
+    def test_archive_holds_one_card_per_student_in_chunks(self):
+        written, progress, cards = self.archive()
+        self.assertEqual(written, 7)
+        self.assertEqual(progress, [(3, 7), (6, 7), (7, 7)])
+        self.assertEqual(sorted(cards)[:3], ['CS/STU-1000.html', 'CS/STU-1003.html', 'CS/STU-1006.html'])
+        student = Student.objects.get(student_name='Student 003')
+        card = cards['CS/STU-1003.html']
+        self.assertIn('Student 003', card)
+        for mark in SubjectMarks.objects.filter(student=student):
+            self.assertIn(mark.subject.subject_name, card)
+
+    def test_department_archive_and_process_pool(self):
+        written, _progress, cards = self.archive(self.departments[1])
+        self.assertEqual(written, 2)
+        self.assertEqual(sorted(cards), ['EE/STU-1001.html', 'EE/STU-1004.html'])
+        self.assertEqual(self.archive(self.departments[1], workers=2, chunk_size=1)[2], cards)
+
+    def test_rows_take_three_queries_per_chunk(self):
+        pks = list(report_card_students().values_list('pk', flat=True))
+        with assert_max_queries(3):
+            rows = report_card_rows(pks)
+        self.assertEqual([row['name'] for row in rows], list(report_card_students().values_list(
+            'student_name', flat=True)))
+        self.assertEqual(rows[0]['total_marks'], sum(row['marks'] for row in rows[0]['marks']))
+
+
+class TermTrendTests(TestCase):
+
+    def setUp(self):
+        cache.clear()   # the current term id is cached; each test rolls its term back
+        with self.captureOnCommitCallbacks(execute=True):
+            self.departments, self.subjects = make_school(students=6)
+            self.current = ExamTerm.objects.get(is_current=True)
+            self.previous = ExamTerm.objects.create(name='Earlier Term', start_date=datetime.date(2000, 1, 1))
+            maths = self.subjects[0]
+            for student in Student.objects.order_by('pk')[:4]:
+                SubjectMarks.objects.create(student=student, subject=maths, term=self.previous,
+                                            marks=student.pk * 7 % 100)
+
+    def expected(self, marks):
+        values = list(marks.values_list('marks', flat=True))
+        average = sum(values) / len(values)
+        fails = sum(1 for value in values if value < pass_mark())
+        return {
+            'count': len(values),
+            'avg_marks': round(average, 2),
+            'std_dev': round(statistics.pstdev(values), 2),
+            'min_marks': min(values),
+            'max_marks': max(values),
+            'fail_count': fails,
+            'pass_rate': round((len(values) - fails) / len(values) * 100, 2),
+        }
+
+    def test_trends_match_the_raw_marks(self):
+        trends = term_trends()
+        self.assertEqual(trends['terms'], [self.previous, self.current])
+        for term, stats in zip(trends['terms'], trends['overall']):
+            self.assertEqual(stats, self.expected(SubjectMarks.objects.filter(term=term)))
+        series = {row['subject']: row['terms'] for row in trends['subjects']}
+        self.assertEqual(sorted(series), ['English', 'Maths', 'Physics'])
+        self.assertIsNone(series['English'][0])
+        self.assertEqual(series['Maths'][0], self.expected(SubjectMarks.objects.filter(term=self.previous)))
+
+    def test_department_filter(self):
+        department = self.departments[1]
+        trends = term_trends(department=department)
+        marks = SubjectMarks.objects.filter(student__department=department)
+        for term, stats in zip(trends['terms'], trends['overall']):
+            self.assertEqual(stats, self.expected(marks.filter(term=term)))
+
+    def test_report_page(self):
+        user = User.objects.create_user('staff', password='pw')
+        Profile.objects.create(user=user, role='staff')
+        self.client.force_login(user)
+        self.client.get('/')
+        response = self.client.get('/analytics/terms/', {'subject': self.subjects[0].pk})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['chart']['labels'], ['Earlier Term', self.current.name])
+        self.assertEqual(response.context['selected_subject'], self.subjects[0])
+        self.assertEqual([row['subject'] for row in response.context['trends']['subjects']], ['Maths'])
+
+
+class DepartmentDashboardTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.departments, _subjects = make_school(students=9)
+            paid = FeeRecord.objects.filter(student__department=self.departments[0]).first()
+            paid.status, paid.amount_paid = 'paid', paid.amount_due
+            paid.save()
+            # Outside the attendance window
+            Attendance.objects.create(student=paid.student, date=datetime.date(2024, 6, 1), is_present=True)
+        self.today = datetime.date(2025, 1, 10)
+
+    def expected(self, department):
+        marks = list(current_marks().filter(student__department=department).values_list('marks', flat=True))
+        attendance = Attendance.objects.filter(student__department=department, date__gte=datetime.date(2024, 12, 12))
+        fees = FeeRecord.objects.filter(student__department=department)
+        return {
+            'headcount': Student.objects.filter(department=department).count(),
+            'marks_recorded': len(marks),
+            'avg_marks': round(sum(marks) / len(marks), 2),
+            'fail_count': sum(1 for mark in marks if mark < pass_mark()),
+            'present_days': attendance.filter(is_present=True).count(),
+            'recorded_days': attendance.count(),
+            'fees_due': sum(fees.values_list('amount_due', flat=True)),
+            'fees_collected': sum(fees.values_list('amount_paid', flat=True)),
+            'fees_outstanding': sum(fees.exclude(status='paid').values_list('amount_due', flat=True)),
+        }
+
+    def test_figures_match_the_raw_tables_in_both_attendance_modes(self):
+        for storage in ('rows', 'bitmap'):
+            cache.clear()
+            with self.subTest(storage=storage), override_settings(SMS_ATTENDANCE_STORAGE=storage):
+                statistics = department_statistics(self.today)
+                rows = {row['pk']: row for row in statistics['departments']}
+                for department in self.departments:
+                    expected = self.expected(department)
+                    self.assertEqual({key: rows[department.pk][key] for key in expected}, expected)
+                self.assertEqual(statistics['school']['headcount'], 9)
+                self.assertEqual(statistics['school']['fees_collected'], Decimal('100.00'))
+                self.assertEqual(rows[self.departments[0].pk]['collected_rate'], Decimal('33.33'))
+
+    def test_cached_until_a_write(self):
+        department_statistics(self.today)
+        with assert_max_queries(1):
+            department_statistics(self.today)
+        with self.captureOnCommitCallbacks(execute=True):
+            Student.objects.filter(department=self.departments[2]).first().delete()
+        row = department_statistics(self.today)['departments'][2]
+        self.assertEqual(row['headcount'], 2)
+
+    def test_page(self):
+        user = User.objects.create_user('staff', password='pw')
+        Profile.objects.create(user=user, role='staff')
+        self.client.force_login(user)
+        self.client.get('/')
+        response = self.client.get('/dashboard/departments/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row['department'] for row in response.context['departments']], ['CS', 'EE', 'ME'])
+        self.assertContains(response, 'All departments')
@@ -0,0 +1,118 @@
+# students/versions.py
+#
+# Data versions: a counter per tracked table (DataVersion rows named after the
+# model, e.g. 'subjectmarks') and a 'global' counter, bumped once per
+# transaction after it commits (signals.py, and the bulk-change receiver for
+# writes that bypass post_save). Current values are read from the cache, so a
+# conditional request can be answered without a database query; the cache
+# entry is dropped on every bump and reloaded from the table on a miss. A bump
+# only drops the entries of the cache it can reach, so with a per-process cache
+# (LocMemCache) the entries also expire after SMS_DATA_VERSION_TIMEOUT seconds
+# and other processes pick up new versions within that time.
+#
+# The counters are read from the database the current view reads from: inside
+# @use_replica views that is the replica, and its counters are cached under
+# their own keys. A version then always describes the data read next to it, so
+# a cache entry keyed by versions holds data of exactly those versions whichever
+# database computed it (a lagging replica never fills a key the primary's
+# newer versions point to).
+#
+# @versioned_page('subjectmarks', 'subject') gives a view a strong ETag built
+# from those versions (plus user, role and query string, as the pages are
+# personalised) and a private Cache-Control, and answers 304 before the view
+# runs when the client's copy is current.
+
+import functools
+import hashlib
+
+from django.conf import settings
+from django.contrib import messages
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, router
+from django.db.models import F
+from django.utils import timezone
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
+
+from .models import DataVersion
+
+GLOBAL = 'global'
+TRACKED = ('subjectmarks', 'subject', 'student', 'department', 'examterm', 'attendance', 'feerecord')
+
+
+def _key(name, alias=DEFAULT_DB_ALIAS):
+    return f'data_version:{alias}:{name}'
+
+
+def data_versions(*names):
+    """
+    {name: version} for the given counters of the database reads currently go
+    to (see the module header); cache first, the DataVersion table on a miss.
+    """
+    alias = router.db_for_read(DataVersion)
+    keys = {name: _key(name, alias) for name in names}
+    cached = cache.get_many(keys.values())
+    versions = {name: cached[key] for name, key in keys.items() if key in cached}
+    missing = [name for name in names if name not in versions]
+    if missing:
+        loaded = dict.fromkeys(missing, 0)
+        loaded.update(DataVersion.objects.using(alias).filter(name__in=missing).values_list('name', 'version'))
+        cache.set_many(
+            {keys[name]: version for name, version in loaded.items()},
+            timeout=getattr(settings, 'SMS_DATA_VERSION_TIMEOUT', 5),
+        )
+        versions.update(loaded)
+    return versions
+
+
+def bump_data_versions(names):
+    """Increments the given counters and 'global' (called on commit via signals._schedule)."""
+    names = set(names) | {GLOBAL}
+    bumped = DataVersion.objects.filter(name__in=names).update(version=F('version') + 1, updated_at=timezone.now())
+    if bumped < len(names):
+        existing = set(DataVersion.objects.filter(name__in=names).values_list('name', flat=True))
+        DataVersion.objects.bulk_create(
+            [DataVersion(name=name, version=1) for name in names - existing], ignore_conflicts=True,
+        )
+    cache.delete_many([_key(name) for name in names])
+
+
+def forget_data_versions(alias):
+    """Drops the cached counters of database `alias`, e.g. once a new replica snapshot is in place."""
+    cache.delete_many([_key(name, alias) for name in (*TRACKED, GLOBAL)])
+
+
+def _etag(names, request):
+    if messages.get_messages(request):
+        # Queued messages are shown (and consumed) by the page: render it.
+        return None
+    versions = data_versions(*names)
+    state = '|'.join([
+        *(f'{name}={versions[name]}' for name in names),
+        str(request.user.pk), str(request.role_info.role), request.GET.urlencode(),
+    ])
+    return hashlib.sha1(state.encode()).hexdigest()
+
+
+def versioned_page(*names):
+    """
+    Conditional GET for a page that only changes when the tables `names`
+    change (see the module header). Use below @login_required, and below
+    @use_replica so the ETag is built from the database the page is read from.
+    """
+    def decorator(view_func):
+        conditional = condition(etag_func=lambda request, *args, **kwargs: _etag(names, request))(view_func)
+
+        @functools.wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            response = conditional(request, *args, **kwargs)
+            if request.method in ('GET', 'HEAD') and response.status_code in (200, 304):
+                # Private: the pages are personalised (navbar, own rank);
+                # browsers revalidate after max-age, usually for a 304.
+                patch_cache_control(
+                    response, private=True, must_revalidate=True,
+                    max_age=getattr(settings, 'SMS_VERSIONED_PAGE_MAX_AGE', 0),
+                )
+            return response
+        return wrapper
+    return decorator
@@ -1,21 +1,49 @@
 # students/views.py (COMPLETELY UPDATED FOR RBAC, FEES, and DASHBOARDS)
 
+from asgiref.sync import sync_to_async
 from django.shortcuts import render, redirect, get_object_or_404
+from django.conf import settings
 from django.contrib.auth.models import User
 from django.contrib import messages
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.decorators import login_required
 from django.core.paginator import Paginator
 from django.db.models import Sum, Avg, Max, Min, Count, Q
-from django.http import JsonResponse
+from django.http import FileResponse, Http404, JsonResponse, StreamingHttpResponse
+from django.urls import reverse
+from django.utils.dateparse import parse_date
+from django.views.decorators.http import condition, require_POST
 
 # 🚨 CORRECTED IMPORTS: Ensure all necessary models are imported
-from .models import Department, Student, SubjectMarks, StudentID, Subject, Attendance, Profile, FeeRecord
-
-import datetime # Required for FeeRecord default
-import random # For seeding
-from faker import Faker
-fake = Faker()
+from .models import Department, Student, StudentID, Subject, Attendance, Profile, FeeRecord, StudentRank, Job
+from . import charts
+from .analytics import ANALYTICS_TABLES, pass_mark, subject_statistics
+from .attendance import mark_roll_call
+from .bitmaps import attendance_totals
+from .concurrency import run_concurrently, run_in_worker
+from .dashboard_cache import acached_dashboard, cached_dashboard, dashboard_cache_stats
+from .departments import department_statistics
+from .exports import EXPORTS
+from .fees import fee_collection, fee_status_counts, mark_overdue_fees
+from .jobs import JOB_KINDS, enqueue
+from .profiling import query_budget
+from .roles import role_required
+from .routers import use_replica
+from .pagination import cursor_paginate
+from .ranking import RANK_MODES, leaderboard_position, leaderboard_queryset
+from .search import search_students
+from .services import student_overview
+from .terms import current_marks, term_trends
+from .versions import versioned_page
+
+import datetime
+import json
+import os
+
+# Seeding helpers (seed_db, create_subject_marks, ...) live in students/seeding.py
+# so that Faker is never imported by web workers.
+
+LEADERBOARD_PAGE_SIZE = 25
 
 
 # -------------------------------------------------------------------
@@ -61,8 +89,9 @@ def login_page(request):
             login(request, user)
             
             # --- NEW: ROLE-BASED REDIRECTION ---
-            profile = Profile.objects.filter(user=user).first()
-            
+            # Loaded and remembered in the new session by login() (roles.remember_role_at_login)
+            profile = request.profile
+
             if not profile:
                 # If no profile, they can't access any dashboard
                 messages.error(request, 'No profile assigned. Please contact admin.')
@@ -97,16 +126,17 @@ def home_page(request):
         # Check profile for role-based redirection 
         # (This is a cleaner way to ensure they land on their correct dashboard 
         # if they type the root URL after logging in)
-        profile = request.user.profile
-        if profile.role == 'staff':
+        role = request.role_info.role
+        if role == 'staff':
             return redirect('staff_dashboard')
-        elif profile.role == 'student':
+        elif role == 'student':
             return redirect('student_dashboard')
-        elif profile.role == 'parent':
+        elif role == 'parent':
             return redirect('parent_dashboard')
         
         # Fallback for users with profiles but no recognized role (shouldn't happen)
-        return redirect('student_report') 
+        if role is not None:
+            return redirect('student_report')
         
     # If not authenticated, show the public landing page (home.html)
     return render(request, 'home.html')
@@ -116,190 +146,217 @@ def home_page(request):
 # --- ROLE-BASED DASHBOARDS ---
 # -------------------------------------------------------------------
 
-@login_required
-def student_dashboard(request):
-    """Shows a comprehensive personal dashboard for the logged-in student."""
-    if request.user.profile.role != 'student' or not request.user.profile.student:
-        messages.error(request, "Access denied or Student profile not linked.")
-        logout(request)
-        return redirect('home')
+def _recent_fee_records(student_pk, limit):
+    return list(FeeRecord.objects.filter(student_id=student_pk).order_by('-due_date')[:limit])
+
+
+def _student_dashboard_payload(overview, fee_records):
+    return {
+        'student': overview.student,
+        'summary': overview.summary,
+        'percentage': overview.percentage,
+        'attendance_percentage': overview.attendance_percentage,
+        'total_subjects': overview.total_subjects,
+        'total_marks': overview.total_marks,
+        'rank': overview.rank,
+        'fee_records': fee_records,
+        'pending_fees': overview.pending_fees,
+    }
 
-    student = request.user.profile.student
-    
-    # --- ACADEMIC DATA ---
-    marks_queryset = SubjectMarks.objects.filter(student=student)
-    total_marks_possible = Subject.objects.count() * 100
-    
-    total_marks = marks_queryset.aggregate(total=Sum('marks'))['total'] or 0
-    percentage = round((total_marks / total_marks_possible * 100), 2) if total_marks_possible > 0 else 0
-    
-    # --- ATTENDANCE DATA ---
-    attendance_data = Attendance.objects.filter(student=student)
-    total_days = attendance_data.count()
-    present_days = attendance_data.filter(is_present=True).count()
-    attendance_percentage = round((present_days / total_days * 100), 2) if total_days > 0 else 0
+
+def _parent_dashboard_payload(overview, fee_records):
+    return {
+        'student': overview.student,
+        'summary': overview.summary,
+        'percentage': overview.percentage,
+        'attendance_percentage': overview.attendance_percentage,
+        'pending_fees': overview.pending_fees,
+        'fee_records': fee_records,
+    }
+
+
+def _student_dashboard_context(student_pk):
+    # --- ACADEMIC / ATTENDANCE / FEE TOTALS + RANK (students/services.py) ---
+    overview = student_overview(student_pk)
 
     # --- FEE DATA ---
-    fee_records = FeeRecord.objects.filter(student=student).order_by('-due_date')
-    pending_fees = fee_records.filter(status='pending').aggregate(total=Sum('amount_due'))['total'] or 0
+    return _student_dashboard_payload(overview, _recent_fee_records(student_pk, 5)) # Show only 5 recent records
 
-    context = {
-        'student': student,
-        'percentage': percentage,
-        'attendance_percentage': attendance_percentage,
-        'total_subjects': Subject.objects.count(),
-        'total_marks': total_marks,
-        'fee_records': fee_records[:5], # Show only 5 recent records
-        'pending_fees': pending_fees,
+
+def _parent_dashboard_context(student_pk):
+    # --- ACADEMIC / ATTENDANCE / FEE TOTALS (Child) ---
+    overview = student_overview(student_pk)
+
+    # --- FEE DATA (Child) ---
+    return _parent_dashboard_payload(overview, _recent_fee_records(student_pk, 3))
+
+
+def _staff_dashboard_payload(total_students, total_departments, avg_performance, fee_counts, departments,
+                             cache_stats):
+    return {
+        'departments': departments,
+        'total_students': total_students,
+        'total_departments': total_departments,
+        'avg_performance': round(avg_performance, 2) if avg_performance else 0,
+        'pending_fee_count': fee_counts['pending'],
+        'late_fee_count': fee_counts['late'],
+        'dashboard_cache': cache_stats,
     }
+
+
+@login_required
+@role_required('student', linked=True, message="Access denied or Student profile not linked.", logout_user=True)
+@query_budget(max_queries=12, max_similar=3)
+def student_dashboard(request):
+    """Shows a comprehensive personal dashboard for the logged-in student."""
+    student_pk = request.role_info.student_id
+
+    # Served from the dashboard cache until this student's data changes
+    context = cached_dashboard('student', student_pk, lambda: _student_dashboard_context(student_pk))
     return render(request, 'dashboards/student_dashboard.html', context)
 
 
 @login_required
+@role_required('parent', linked=True, message="Access denied or Parent profile not linked to a student.",
+               logout_user=True)
+@query_budget(max_queries=12, max_similar=3)
 def parent_dashboard(request):
     """Shows a summary dashboard for the parent's linked student."""
-    if request.user.profile.role != 'parent' or not request.user.profile.related_student:
-        messages.error(request, "Access denied or Parent profile not linked to a student.")
-        logout(request)
-        return redirect('home')
-        
-    student = request.user.profile.related_student # The student associated with the parent
-    
-    # --- ACADEMIC DATA (Child) ---
-    marks_queryset = SubjectMarks.objects.filter(student=student)
-    total_marks_possible = Subject.objects.count() * 100
-    total_marks = marks_queryset.aggregate(total=Sum('marks'))['total'] or 0
-    percentage = round((total_marks / total_marks_possible * 100), 2) if total_marks_possible > 0 else 0
-
-    # --- ATTENDANCE DATA (Child) ---
-    attendance_data = Attendance.objects.filter(student=student)
-    total_days = attendance_data.count()
-    present_days = attendance_data.filter(is_present=True).count()
-    attendance_percentage = round((present_days / total_days * 100), 2) if total_days > 0 else 0
-
-    # --- FEE DATA (Child) ---
-    fee_records = FeeRecord.objects.filter(student=student).order_by('-due_date')
-    pending_fees = fee_records.filter(status='pending').aggregate(total=Sum('amount_due'))['total'] or 0
-    
-    context = {
-        'student': student,
-        'percentage': percentage,
-        'attendance_percentage': attendance_percentage,
-        'pending_fees': pending_fees,
-        'fee_records': fee_records[:3],
-    }
+    # The student associated with the parent (cached per student, see dashboard_cache.py)
+    student_pk = request.role_info.related_student_id
+    context = cached_dashboard('parent', student_pk, lambda: _parent_dashboard_context(student_pk))
     return render(request, 'dashboards/parent_dashboard.html', context)
 
 
 @login_required
+@role_required('staff', message="Access denied. Only Staff can view this dashboard.", logout_user=True)
+@query_budget(max_queries=12, max_similar=3)
+@use_replica
 def staff_dashboard(request):
     """A simple entry point for staff to access admin tools and reports."""
-    if request.user.profile.role != 'staff':
-        messages.error(request, "Access denied. Only Staff can view this dashboard.")
-        logout(request)
-        return redirect('home')
-
     # Quick overview stats for the staff dashboard
     total_students = Student.objects.count()
     total_departments = Department.objects.count()
     # Use Count from SubjectMarks to avoid error if no marks exist
-    avg_performance = SubjectMarks.objects.aggregate(avg=Avg('marks'))['avg']
-    pending_fee_count = FeeRecord.objects.filter(status='pending').count()
-    
-    context = {
-        'total_students': total_students,
-        'total_departments': total_departments,
-        'avg_performance': round(avg_performance, 2) if avg_performance else 0,
-        'pending_fee_count': pending_fee_count,
-    }
+    avg_performance = current_marks().aggregate(avg=Avg('marks'))['avg']
+    fee_counts = fee_status_counts()
+
+    context = _staff_dashboard_payload(
+        total_students, total_departments, avg_performance, fee_counts, Department.objects.all(),
+        dashboard_cache_stats(),
+    )
     return render(request, 'dashboards/staff_dashboard.html', context)
 
 
+@login_required
+@role_required('staff', 'admin', message="You do not have permission to view department statistics.")
+@query_budget(max_queries=10, max_similar=3)
+@use_replica
+def department_dashboard(request):
+    """Headcount, marks, attendance and fees per department, from a few cached GROUP BY queries."""
+    return render(request, 'dashboards/department_dashboard.html', department_statistics())
+
+
 # -------------------------------------------------------------------
 # --- CORE STUDENT REPORTS (Mainly Staff/Admin) ---
 # -------------------------------------------------------------------
 
 @login_required
+@role_required('staff', 'admin', message="You do not have permission to view the full student list.")
+@query_budget(max_queries=8, max_similar=3)
 def student_report(request):
-    # 🚨 SECURITY NOTE: Ideally, limit this view to Staff/Admin role only
-    if request.user.profile.role not in ['staff', 'admin']:
-        messages.error(request, "You do not have permission to view the full student list.")
-        return redirect('home')
-
     student_list = Student.objects.all().select_related('department', 'student_id')
+
+    # Drill-down from the department dashboard
+    department = _selected(Department.objects.all(), request.GET.get('department'))
+    if department is not None:
+        student_list = student_list.filter(department=department)
     
-    # ... (Search and Pagination logic remains the same) ...
+    # Prefix search over name, ID, email and department, best matches first
     search_query = request.GET.get('search')
     if search_query:
-        student_list = student_list.filter(student_name__icontains=search_query) | \
-                        student_list.filter(student_id__student_id__icontains=search_query)
-
-    paginator = Paginator(student_list, 10) 
-    page_number = request.GET.get("page")
-    page_obj = paginator.get_page(page_number)
-    
-    context = {
-        "page_obj": page_obj,
-        "search_query": search_query
-    }
+        student_list = search_students(student_list, search_query)
+
+    context = {"search_query": search_query, "selected_department": department}
+    if getattr(settings, 'SMS_STUDENT_LIST_PAGINATION', 'cursor') == 'cursor':
+        # Keyset pages in (name, id) order, search results by relevance; no OFFSET/COUNT(*)
+        context["page_obj"] = cursor_paginate(
+            student_list, request.GET.get("cursor"), per_page=10,
+            count=getattr(settings, 'SMS_STUDENT_LIST_COUNT', 'estimate'),
+        )
+        context["paging"] = "cursor"
+    else:
+        paginator = Paginator(student_list, 10)
+        page_obj = paginator.get_page(request.GET.get("page"))
+        context["page_obj"] = page_obj
+        context["page_range"] = paginator.get_elided_page_range(page_obj.number, on_each_side=2, on_ends=1)
+        context["paging"] = "offset"
     return render(request, "students.html", context)
 
 
 @login_required
+@query_budget(max_queries=10, max_similar=3)
 def student_profile(request, student_id):
     """
     Shows a comprehensive profile page for a single student (viewable by Staff/Parent).
     """
-    student = get_object_or_404(Student, student_id__student_id=student_id)
-    marks_queryset = SubjectMarks.objects.filter(student=student).select_related('subject')
-    total_marks = marks_queryset.aggregate(total=Sum('marks'))['total'] or 0
+    student_pk = get_object_or_404(Student.objects.values_list('pk', flat=True), student_id__student_id=student_id)
+    overview = student_overview(student_pk)
+    student = overview.student
+    marks_queryset = current_marks().filter(student=student).select_related('subject')
 
     # NEW: Fetch Attendance Data
     attendance_data = Attendance.objects.filter(student=student).order_by('-date')
-    
-    # Calculate Attendance Percentage
-    total_days = attendance_data.count()
-    present_days = attendance_data.filter(is_present=True).count()
-    attendance_percentage = (present_days / total_days * 100) if total_days > 0 else 0
 
     context = {
         'student': student,
         'marks_queryset': marks_queryset,
-        'total_marks': total_marks,
+        'total_marks': overview.total_marks,
         'attendance_data': attendance_data,
-        'attendance_percentage': round(attendance_percentage, 2),
+        'attendance_percentage': overview.attendance_percentage,
     }
     # Uses the student_profile.html template
     return render(request, 'student_profile.html', context)
 
 
 @login_required
+@query_budget(max_queries=15, max_similar=3)
+@use_replica
+@versioned_page('subjectmarks', 'subject', 'student', 'department')
 def student_leaderboard(request):
-    """Calculates overall performance and ranks all students."""
-    all_students_totals = (
-        SubjectMarks.objects.values(
-            'student__student_id__student_id',
-            'student__student_name',
-            'student__department__department'
-        )
-        .annotate(
-            total_marks=Sum('marks'),
-            subject_count=Count('subject')
-        )
-        .order_by('-total_marks')
-    )
+    """Ranks students in the database and shows one page of the leaderboard."""
+    departments = Department.objects.all()
+    subjects = Subject.objects.all()
+
+    department = _selected(departments, request.GET.get('department'))
+    subject = _selected(subjects, request.GET.get('subject'))
+    mode = request.GET.get('mode') if request.GET.get('mode') in RANK_MODES else 'competition'
+
+    ranked = leaderboard_queryset(department=department, subject=subject, mode=mode)
+    paginator = Paginator(ranked, LEADERBOARD_PAGE_SIZE)
+
+    # "Jump to my rank": students/parents jump to their own row, staff can pass ?student=STU-1234
+    me = None
+    page_number = request.GET.get('page')
+    if request.GET.get('me') or request.GET.get('student'):
+        me = _leaderboard_student(request)
+        position = leaderboard_position(me, department=department, subject=subject) if me else None
+        if position:
+            page_number = (position - 1) // LEADERBOARD_PAGE_SIZE + 1
+        elif me:
+            messages.info(request, f"{me.student_name} has no marks in this leaderboard.")
+    page_obj = paginator.get_page(page_number)
+
+    max_total_marks = 100 if subject else subjects.count() * 100
 
     leaderboard = []
-    max_total_marks = Subject.objects.count() * 100 
-    
-    for idx, data in enumerate(all_students_totals, 1):
+    for data in page_obj:
         total = data['total_marks']
-        # count = data['subject_count'] # Not used directly in loop, but useful for verification
-        
         percentage = (total / max_total_marks * 100) if max_total_marks > 0 else 0
-        
+
         leaderboard.append({
-            'rank': idx,
+            'rank': data['rank'],
+            'student_pk': data['student'],
             'student_id': data['student__student_id__student_id'],
             'student_name': data['student__student_name'],
             'department': data['student__department__department'],
@@ -307,119 +364,475 @@ def student_leaderboard(request):
             'percentage': round(percentage, 2),
         })
 
-    return render(request, 'leaderboard.html', {'leaderboard': leaderboard})
+    context = {
+        'leaderboard': leaderboard,
+        'page_obj': page_obj,
+        'departments': departments,
+        'subjects': subjects,
+        'selected_department': department,
+        'selected_subject': subject,
+        'mode': mode,
+        'highlight': me.pk if me else None,
+    }
+    return render(request, 'leaderboard.html', context)
+
+
+def _selected(queryset, pk):
+    """Returns the object with the given pk from a filter dropdown, or None."""
+    if not pk or not str(pk).isdigit():
+        return None
+    return queryset.filter(pk=pk).first()
+
+
+def _leaderboard_student(request):
+    student_id = request.GET.get('student')
+    if student_id:
+        return Student.objects.filter(student_id__student_id=student_id).first()
+    student_pk = request.role_info.linked_student_id
+    return Student.objects.filter(pk=student_pk).first() if student_pk else None
 
 @login_required
+@query_budget(max_queries=7, max_similar=3)
+@use_replica
+@versioned_page(*ANALYTICS_TABLES)
 def subject_analytics(request):
-    """Provides statistics (avg, highest, lowest, fail rate) per subject."""
-    all_subjects = Subject.objects.all()
-    
-    analytics = []
-    
-    for subject in all_subjects:
-        stats = SubjectMarks.objects.filter(subject=subject).aggregate(
-            avg_marks=Avg('marks'),
-            max_marks=Max('marks'),
-            min_marks=Min('marks'),
-            total_count=Count('marks')
+    """Provides statistics (avg, median, p90, spread, fail rate, histogram) per subject."""
+    threshold = request.GET.get('pass_mark')
+    threshold = int(threshold) if threshold and threshold.isdigit() and int(threshold) <= 100 else pass_mark()
+
+    context = {
+        'analytics': subject_statistics(threshold),
+        'pass_mark': threshold,
+    }
+    return render(request, 'subject_analytics.html', context)
+
+
+@login_required
+@role_required('staff', 'admin', message="You do not have permission to view term trends.")
+@query_budget(max_queries=12, max_similar=3)
+@use_replica
+@versioned_page('subjectmarks', 'subject', 'department', 'examterm')
+def term_trend_report(request):
+    """Term-over-term marks statistics, read from the TermRollup table rather than raw marks."""
+    departments = Department.objects.all()
+    subjects = Subject.objects.all()
+    department = _selected(departments, request.GET.get('department'))
+    subject = _selected(subjects, request.GET.get('subject'))
+
+    trends = term_trends(department=department, subject=subject)
+    chart = {
+        'labels': [term.name for term in trends['terms']],
+        'overall': [stats['avg_marks'] if stats else None for stats in trends['overall']],
+        'pass_rate': [stats['pass_rate'] if stats else None for stats in trends['overall']],
+        'subjects': [
+            {'label': series['subject'], 'data': [stats['avg_marks'] if stats else None for stats in series['terms']]}
+            for series in trends['subjects']
+        ],
+    }
+    context = {
+        'trends': trends,
+        'overall_rows': list(zip(trends['terms'], trends['overall'])),
+        'chart': chart,
+        'departments': departments,
+        'subjects': subjects,
+        'selected_department': department,
+        'selected_subject': subject,
+    }
+    return render(request, 'term_trends.html', context)
+
+
+# -------------------------------------------------------------------
+# --- BULK ATTENDANCE (Staff) ---
+# -------------------------------------------------------------------
+
+@login_required
+@role_required('staff', 'admin', message="Only staff can mark attendance.")
+@query_budget(max_queries=12, max_similar=3)
+def bulk_attendance(request):
+    """Roll call for a whole department on one date: tick the absentees, everyone else is present."""
+    departments = Department.objects.all()
+    params = request.POST if request.method == "POST" else request.GET
+    department = _selected(departments, params.get('department'))
+    date = _parse_date(params.get('date')) or datetime.date.today()
+
+    if request.method == "POST" and department:
+        absent = [int(pk) for pk in request.POST.getlist('absent') if pk.isdigit()]
+        result = mark_roll_call(department, date, absent)
+        messages.success(
+            request,
+            f"Attendance saved for {department.department} on {date}: "
+            f"{result['present']} present, {result['absent']} absent.",
         )
-        
-        fail_count = SubjectMarks.objects.filter(subject=subject, marks__lt=35).count()
-        
-        analytics.append({
-            'subject_name': subject.subject_name,
-            'avg_marks': round(stats['avg_marks'], 2) if stats['avg_marks'] else 0,
-            'max_marks': stats['max_marks'] or 0,
-            'min_marks': stats['min_marks'] or 0,
-            'total_students': stats['total_count'] or 0,
-            'fail_count': fail_count,
-            'pass_rate': round(((stats['total_count'] - fail_count) / stats['total_count'] * 100), 2) if stats['total_count'] > 0 else 0
-        })
+        return redirect(f"{request.path}?department={department.pk}&date={date.isoformat()}")
+
+    students = []
+    absent_pks = set()
+    if department:
+        students = Student.objects.filter(department=department).select_related('student_id')
+        absent_pks = set(
+            Attendance.objects.filter(student__department=department, date=date, is_present=False)
+            .values_list('student', flat=True)
+        )
+
+    context = {
+        'departments': departments,
+        'selected_department': department,
+        'date': date,
+        'students': students,
+        'absent_pks': absent_pks,
+    }
+    return render(request, 'bulk_attendance.html', context)
+
+
+@login_required
+@role_required('staff', 'admin', message='Only staff can mark attendance', json=True)
+@require_POST
+def bulk_attendance_api(request):
+    """
+    JSON roll call. Body: {"department": <id>, "date": "YYYY-MM-DD", "absent": ["STU-1234", ...]}.
+    Responds with {"marked": n, "present": n, "absent": n}.
+    """
+    try:
+        payload = json.loads(request.body)
+        department = Department.objects.get(pk=int(payload['department']))
+        date = _parse_date(payload.get('date')) if payload.get('date') else datetime.date.today()
+        absent_ids = [str(student_id) for student_id in payload.get('absent', [])]
+    except (ValueError, TypeError, KeyError, Department.DoesNotExist):
+        return JsonResponse({'error': 'Expected {"department": <id>, "date": "YYYY-MM-DD", "absent": [...]}'}, status=400)
+    if date is None:
+        return JsonResponse({'error': 'Invalid date'}, status=400)
+
+    absent = dict(
+        Student.objects.filter(department=department, student_id__student_id__in=absent_ids)
+        .values_list('student_id__student_id', 'pk')
+    )
+    unknown = sorted(set(absent_ids) - set(absent))
+    if unknown:
+        return JsonResponse({'error': f'Not students of {department.department}', 'student_ids': unknown}, status=400)
+
+    result = mark_roll_call(department, date, absent.values())
+    return JsonResponse({'department': department.pk, 'date': date.isoformat(), **result})
+
+
+# -------------------------------------------------------------------
+# --- FEE COLLECTION (Staff) ---
+# -------------------------------------------------------------------
+
+@login_required
+@role_required('staff', 'admin', message="Only staff can view fee collection.")
+@query_budget(max_queries=12, max_similar=3)
+@use_replica
+def fee_report(request):
+    """Collection rollups by department and by month; POST marks overdue pending fees as late."""
+    if request.method == "POST":
+        changed = mark_overdue_fees()
+        messages.success(request, f"{changed} overdue fee records marked late.")
+        return redirect('fee_report')
+
+    departments = Department.objects.all()
+    department = _selected(departments, request.GET.get('department'))
+    date_from = _parse_date(request.GET.get('date_from'))
+    date_to = _parse_date(request.GET.get('date_to'))
 
-    return render(request, 'subject_analytics.html', {'analytics': analytics})
+    context = {
+        'departments': departments,
+        'selected_department': department,
+        'date_from': date_from,
+        'date_to': date_to,
+        'by_department': fee_collection('department', date_from, date_to, department),
+        'by_month': fee_collection('month', date_from, date_to, department),
+        'status_counts': fee_status_counts(),
+    }
+    return render(request, 'fee_report.html', context)
+
+
+# -------------------------------------------------------------------
+# --- CSV EXPORTS (Staff) ---
+# -------------------------------------------------------------------
+
+@login_required
+@role_required('staff', 'admin', message="Only staff can export data.")
+@use_replica
+def export_csv(request, kind):
+    """
+    Streams a CSV export (students, marks, attendance or fees). Optional filters:
+    ?department=<id>&date_from=YYYY-MM-DD&date_to=YYYY-MM-DD (dates apply to
+    attendance dates and fee due dates).
+    """
+    if kind not in EXPORTS:
+        raise Http404(f"Unknown export '{kind}'.")
+
+    department = request.GET.get('department')
+    rows = EXPORTS[kind](
+        department=department if department and department.isdigit() else None,
+        date_from=_parse_date(request.GET.get('date_from')),
+        date_to=_parse_date(request.GET.get('date_to')),
+    )
+    response = StreamingHttpResponse(rows, content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename={kind}_export.csv'
+    return response
+
+
+def _parse_date(value):
+    try:
+        return parse_date(value or '')
+    except ValueError:
+        return None
+
+
+# -------------------------------------------------------------------
+# --- BACKGROUND JOBS (Staff) ---
+# -------------------------------------------------------------------
+
+JOB_LIST_SIZE = 50
+
+
+@login_required
+@role_required('staff', 'admin', message="Only staff can run background jobs.")
+@query_budget(max_queries=10, max_similar=3)
+def job_list(request):
+    """Recent jobs with progress and downloads; POST queues an export, report cards, a fee sweep or a summary rebuild."""
+    if request.method == "POST":
+        kind = request.POST.get('kind')
+        params = _job_params(request.POST, kind)
+        if params is None:
+            messages.error(request, "Unknown job or export.")
+        else:
+            job = enqueue(kind, params, user=request.user)
+            messages.success(request, f"Job #{job.pk} queued: {JOB_KINDS[kind].label}.")
+        return redirect('job_list')
+
+    jobs = list(Job.objects.select_related('created_by')[:JOB_LIST_SIZE])
+    context = {
+        'jobs': jobs,
+        'exports': sorted(EXPORTS),
+        'departments': Department.objects.all(),
+        'refresh': any(job.is_active for job in jobs),
+    }
+    return render(request, 'jobs.html', context)
+
+
+def _job_params(data, kind):
+    """JSON params for a job queued from the jobs page, or None if the form is invalid."""
+    if kind == 'export':
+        if data.get('export') not in EXPORTS:
+            return None
+        department = data.get('department')
+        date_from, date_to = _parse_date(data.get('date_from')), _parse_date(data.get('date_to'))
+        return {
+            'export': data['export'],
+            'department': int(department) if department and department.isdigit() else None,
+            'date_from': date_from and date_from.isoformat(),
+            'date_to': date_to and date_to.isoformat(),
+        }
+    if kind == 'report_cards':
+        department = data.get('department')
+        return {'department': int(department) if department and department.isdigit() else None}
+    if kind in ('mark_overdue_fees', 'rebuild_summaries'):
+        return {}
+    return None
+
+
+@login_required
+@role_required('staff', 'admin', message="Only staff can view jobs.", json=True)
+def job_status(request, pk):
+    """Progress of one job as JSON, for polling."""
+    job = get_object_or_404(Job, pk=pk)
+    return JsonResponse({
+        'id': job.pk,
+        'kind': job.kind,
+        'status': job.status,
+        'attempts': job.attempts,
+        'progress': {'done': job.progress_done, 'total': job.progress_total, 'percentage': job.percentage},
+        'message': job.message,
+        'error': job.error_summary,
+        'result_url': reverse('job_result', args=[job.pk]) if job.status == 'succeeded' and job.result else None,
+    })
+
+
+@login_required
+@role_required('staff', 'admin', message="Only staff can download job results.")
+def job_result(request, pk):
+    job = get_object_or_404(Job, pk=pk)
+    if job.status != 'succeeded' or not job.result:
+        raise Http404("This job has no result file.")
+    return FileResponse(job.result.open('rb'), as_attachment=True, filename=os.path.basename(job.result.name))
 
 
 # -------------------------------------------------------------------
 # --- API FOR CHARTS ---
 # -------------------------------------------------------------------
 
+def _own_chart_freshness(request):
+    # Shared by the ETag and Last-Modified functions of @condition: one query per request
+    if not hasattr(request, '_chart_freshness'):
+        request._chart_freshness = charts.chart_freshness([request.role_info.student_id], 'pie')
+    return request._chart_freshness
+
+
 @login_required
+@role_required('student', linked=True, message='Unauthorized or Student not linked', json=True)
+@condition(etag_func=lambda request: _own_chart_freshness(request)[0],
+           last_modified_func=lambda request: _own_chart_freshness(request)[1])
 def get_student_attendance_chart_data(request):
     """Generates JSON data for the currently logged-in student's attendance pie chart."""
-    # Ensure the user is a student and linked
-    if not request.user.profile.student or request.user.profile.role != 'student':
-        return JsonResponse({'error': 'Unauthorized or Student not linked'}, status=403)
-        
-    student = request.user.profile.student
-    
-    attendance_stats = student.attendances.aggregate(
-        present_count=Count('pk', filter=Q(is_present=True)),
-        absent_count=Count('pk', filter=Q(is_present=False)),
-    )
-    
-    data = {
+    student_pk = request.role_info.student_id
+
+    # Reads the month bitmaps or the daily rows, per settings.SMS_ATTENDANCE_STORAGE
+    present_count, total_count = attendance_totals([student_pk]).get(student_pk, (0, 0))
+    return JsonResponse(_attendance_chart_payload(present_count, total_count))
+
+
+def _chart_request(request, student_id=None):
+    """
+    Parses the chart API parameters once per request (the @condition
+    functions and the view all need them):
+        ?students=STU-1,STU-2 (or repeated ?student=), ?from= / ?to= (ISO
+        dates, default: the last twelve months), ?buckets=daily,monthly.
+    Staff and admins may ask for any students; students and parents only
+    get their linked student.
+    """
+    if hasattr(request, '_chart_request'):
+        return request._chart_request
+
+    ids = [student_id] if student_id else []
+    ids += request.GET.getlist('student')
+    ids += [part.strip() for value in request.GET.getlist('students') for part in value.split(',')]
+    ids = [value for value in ids if value]
+
+    default_from, default_to = charts.default_range()
+    date_from = _parse_date(request.GET.get('from')) if request.GET.get('from') else default_from
+    date_to = _parse_date(request.GET.get('to')) if request.GET.get('to') else default_to
+    buckets = [part for part in request.GET.get('buckets', ','.join(charts.BUCKETS)).split(',') if part]
+
+    chart = {'error': None}
+    if date_from is None or date_to is None or date_from > date_to:
+        chart['error'] = "'from' and 'to' must be ISO dates (YYYY-MM-DD), 'from' not after 'to'."
+    elif not set(buckets) <= set(charts.BUCKETS):
+        chart['error'] = f"'buckets' must be a comma-separated subset of {', '.join(charts.BUCKETS)}."
+    elif len(ids) > charts.max_students():
+        chart['error'] = f"At most {charts.max_students()} students per request."
+    else:
+        info = request.role_info
+        only_pk = None if info.role in ('staff', 'admin') else info.linked_student_id
+        if only_pk is None and not ids:
+            chart['error'] = "Pass one or more student IDs in 'students'."
+        else:
+            students, missing = charts.resolve_students(ids, only_pk=only_pk)
+            chart.update(students=students, missing=missing, date_from=date_from, date_to=date_to, buckets=buckets)
+            if students:
+                chart['freshness'] = charts.chart_freshness(
+                    [student['pk'] for student in students], date_from, date_to, ','.join(sorted(buckets)), missing,
+                )
+
+    request._chart_request = chart
+    return chart
+
+
+def _chart_etag(request, student_id=None):
+    return _chart_request(request, student_id).get('freshness', (None, None))[0]
+
+
+def _chart_last_modified(request, student_id=None):
+    return _chart_request(request, student_id).get('freshness', (None, None))[1]
+
+
+@login_required
+@role_required('staff', 'admin', 'student', 'parent', message='Unauthorized', json=True)
+@query_budget(max_queries=10, max_similar=3)
+@condition(etag_func=_chart_etag, last_modified_func=_chart_last_modified)
+def chart_data_api(request, student_id=None):
+    """
+    Attendance (daily / monthly) and per-subject marks for one or many
+    students in one response, built in a fixed number of queries. Sends an
+    ETag and Last-Modified, so unchanged data is answered with 304.
+    """
+    chart = _chart_request(request, student_id)
+    if chart['error']:
+        return JsonResponse({'error': chart['error']}, status=400)
+    if not chart['students']:
+        return JsonResponse({'error': 'No matching students.', 'missing': chart['missing']}, status=404)
+
+    return JsonResponse({
+        'from': chart['date_from'].isoformat(),
+        'to': chart['date_to'].isoformat(),
+        'buckets': chart['buckets'],
+        'students': charts.chart_data(chart['students'], chart['date_from'], chart['date_to'], chart['buckets']),
+        'missing': chart['missing'],
+    })
+
+
+def _attendance_chart_payload(present_count, total_count):
+    return {
         'labels': ['Present', 'Absent'],
-        'counts': [attendance_stats['present_count'], attendance_stats['absent_count']],
+        'counts': [present_count, total_count - present_count],
     }
-    return JsonResponse(data)
 
 
 # -------------------------------------------------------------------
-# --- SEEDING UTILITIES (Keep at the bottom) ---
+# --- ASYNC DASHBOARDS & CHART API (served concurrently under ASGI) ---
 # -------------------------------------------------------------------
+# Same pages and JSON as the views above. Their independent queries run at
+# the same time in worker threads (students/concurrency.py), so a dashboard
+# waits for its slowest aggregate instead of the sum of them. Templates are
+# rendered through sync_to_async because they read request.user lazily.
+
+async def _astudent_dashboard_context(student_pk):
+    results = await run_concurrently(
+        overview=lambda: student_overview(student_pk),
+        fee_records=lambda: _recent_fee_records(student_pk, 5),
+    )
+    return _student_dashboard_payload(results['overview'], results['fee_records'])
 
-def seed_subjects():
-    subjects = ["Data Structures and Algorithm", "Database Management System", "Object Oriented Programming", "Operating Systems", "Computer Networks", "Software Engineering"]
-    for sub in subjects:
-        Subject.objects.get_or_create(subject_name=sub)
-    print("✅ Technical Subjects created successfully.") 
-    
-# ... (seed_db and create_subject_marks remain the same) ...
 
+async def _aparent_dashboard_context(student_pk):
+    results = await run_concurrently(
+        overview=lambda: student_overview(student_pk),
+        fee_records=lambda: _recent_fee_records(student_pk, 3),
+    )
+    return _parent_dashboard_payload(results['overview'], results['fee_records'])
 
-def seed_db(n=10) -> None:
-    departments_objs = Department.objects.all()
 
-    if not departments_objs.exists():
-        print("⚠️ No departments found. Please add departments via /admin/ before seeding.")
-        return
+@login_required
+@role_required('student', linked=True, message="Access denied or Student profile not linked.", logout_user=True)
+@query_budget(max_queries=12, max_similar=3)
+async def student_dashboard_async(request):
+    student_pk = request.role_info.student_id
+    context = await acached_dashboard('student', student_pk, lambda: _astudent_dashboard_context(student_pk))
+    return await sync_to_async(render)(request, 'dashboards/student_dashboard.html', context)
 
-    for i in range(n):
-        try:
-            department = random.choice(departments_objs)
-            student_id_str = f"STU-{random.randint(1000, 9999)}"
-            while StudentID.objects.filter(student_id=student_id_str).exists():
-                student_id_str = f"STU-{random.randint(1000, 9999)}"
 
-            student_id_obj = StudentID.objects.create(student_id=student_id_str)
-            
-            Student.objects.create(
-                department=department,
-                student_id=student_id_obj,
-                student_name=fake.name(),
-                student_email=fake.unique.email(),
-                student_age=random.randint(18, 25),
-                student_address=fake.address(),
-            )
+@login_required
+@role_required('parent', linked=True, message="Access denied or Parent profile not linked to a student.",
+               logout_user=True)
+@query_budget(max_queries=12, max_similar=3)
+async def parent_dashboard_async(request):
+    student_pk = request.role_info.related_student_id
+    context = await acached_dashboard('parent', student_pk, lambda: _aparent_dashboard_context(student_pk))
+    return await sync_to_async(render)(request, 'dashboards/parent_dashboard.html', context)
 
-        except Exception as e:
-            print(f" Error creating student {i+1}: {e}")
 
+@login_required
+@role_required('staff', message="Access denied. Only Staff can view this dashboard.", logout_user=True)
+@query_budget(max_queries=12, max_similar=3)
+@use_replica
+async def staff_dashboard_async(request):
+    results = await run_concurrently(
+        total_students=Student.objects.count,
+        total_departments=Department.objects.count,
+        avg_performance=lambda: current_marks().aggregate(avg=Avg('marks'))['avg'],
+        fee_counts=fee_status_counts,
+        departments=lambda: list(Department.objects.all()),
+        cache_stats=dashboard_cache_stats,
+    )
+    context = _staff_dashboard_payload(**results)
+    return await sync_to_async(render)(request, 'dashboards/staff_dashboard.html', context)
 
-def create_subject_marks(n=None):
-    try:
-        student_objs = Student.objects.all()
-        if n:
-            student_objs = student_objs[:n]
-
-        subjects = Subject.objects.all()
-
-        for student in student_objs:
-            for subject in subjects:
-                SubjectMarks.objects.get_or_create(
-                    subject=subject,
-                    student=student,
-                    defaults={'marks': random.randint(0, 100)}
-                )
-    except Exception as e:
-        print(f" Error creating subject marks: {e}")
\ No newline at end of file
+
+@login_required
+@role_required('student', linked=True, message='Unauthorized or Student not linked', json=True)
+async def student_attendance_chart_async(request):
+    student_pk = request.role_info.student_id
+    totals = await run_in_worker(attendance_totals, [student_pk])
+    present_count, total_count = totals.get(student_pk, (0, 0))
+    return JsonResponse(_attendance_chart_payload(present_count, total_count))